@@ -0,0 +1,309 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+ann_index.py
+============
+
+Approximate nearest-neighbour search over policy chunk embeddings.
+
+:class:`IVFIndex` is an inverted-file (IVF) index for cosine similarity. Rows
+are L2-normalized, a k-means coarse quantizer splits them into ``n_lists``
+cells, and vectors are stored contiguously cell by cell. A query is compared
+only against the ``n_probe`` cells whose centroids are closest to it, which
+trades a little recall for a large reduction in work; ``n_probe = n_lists``
+gives exact search.
+
+The index is saved as a directory of ``.npy`` files and memory-mapped on
+load, so it opens instantly even for hundreds of thousands of chunks.
+:meth:`IVFIndex.self_join` finds the neighbours of every indexed row with one
+matrix product per cell, which is the basis for cross-policy overlap and
+duplicate detection.
+
+Example
+-------
+
+.. code-block:: python
+
+    from ann_index import IVFIndex
+
+    index = IVFIndex(n_probe=8).build(X)
+    index.save('dat/existing_policy_keyword_ann')
+
+    index = IVFIndex.load('dat/existing_policy_keyword_ann')
+    ids, sims = index.query(X[:3], k=5)  # each of shape (3, 5)
+
+"""
+
+import json
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+
+import config
+
+SEED = config.SEED
+ANN_N_LISTS = config.ANN_N_LISTS
+ANN_N_PROBE = config.ANN_N_PROBE
+ANN_K = config.ANN_K
+
+__all__ = ['IVFIndex']
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+
+    """L2-normalize rows as float32, leaving all-zero rows at zero."""
+
+    X = np.asarray(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+
+    return X / np.where(norms == 0, 1, norms)
+
+
+def _top_k(sims: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+
+    """Best ``k`` columns per row of ``sims``, padded with id ``-1`` and similarity ``-inf``."""
+
+    n = sims.shape[0]
+    out_ids = np.full((n, k), -1, dtype=np.int64)
+    out_sims = np.full((n, k), -np.inf, dtype=np.float32)
+    kk = min(k, sims.shape[1])
+
+    if kk:
+        part = np.argpartition(-sims, kk - 1, axis=1)[:, :kk]
+        part_sims = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-part_sims, axis=1, kind='stable')
+        out_ids[:, :kk] = ids[np.take_along_axis(part, order, axis=1)]
+        out_sims[:, :kk] = np.take_along_axis(part_sims, order, axis=1)
+
+    return out_ids, out_sims
+
+
+class IVFIndex:
+
+    """
+    Inverted-file cosine-similarity index.
+
+    Parameters
+    ----------
+    n_lists : int, optional
+        Number of k-means cells. ``0`` (default, :data:`config.ANN_N_LISTS`)
+        picks about ``2 * sqrt(N)`` at build time.
+    n_probe : int, optional
+        Cells scanned per query. Defaults to :data:`config.ANN_N_PROBE`.
+    seed : int, optional
+        Random state of the k-means quantizer. Defaults to
+        :data:`config.SEED`.
+
+    Attributes
+    ----------
+    centroids : numpy.ndarray
+        ``(n_lists, p)`` normalized cell centroids.
+    vectors : numpy.ndarray
+        ``(N, p)`` normalized vectors, grouped by cell.
+    ids : numpy.ndarray
+        Original row number of each entry of :attr:`vectors`.
+    offsets : numpy.ndarray
+        Cell ``c`` occupies ``vectors[offsets[c]:offsets[c + 1]]``.
+    """
+
+    _ARRAYS = ('centroids', 'vectors', 'ids', 'offsets')
+
+    def __init__(self, n_lists: int = ANN_N_LISTS, n_probe: int = ANN_N_PROBE, seed: int = SEED):
+
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids = self.vectors = self.ids = self.offsets = None
+
+    def __len__(self) -> int:
+
+        return 0 if self.ids is None else len(self.ids)
+
+    def build(self, X: np.ndarray) -> 'IVFIndex':
+
+        """
+        Index the rows of ``X``.
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            ``(N, p)`` embedding matrix; it is normalized internally, so
+            raw or normalized embeddings both work.
+
+        Returns
+        -------
+        IVFIndex
+            ``self``, to allow chaining.
+        """
+
+        X = _normalize(X)
+        n = X.shape[0]
+        n_lists = self.n_lists or max(1, int(round(2 * np.sqrt(n))))
+        n_lists = min(n_lists, n)
+
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.seed, n_init=3,
+                                 batch_size=max(1024, 4 * n_lists))
+        assign = kmeans.fit_predict(X)
+
+        order = np.argsort(assign, kind='stable')
+        self.n_lists = n_lists
+        self.centroids = _normalize(kmeans.cluster_centers_)
+        self.vectors = np.ascontiguousarray(X[order])
+        self.ids = order.astype(np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+
+        return self
+
+    def _cells(self, Q: np.ndarray, n_probe: int) -> np.ndarray:
+
+        """Indices of the ``n_probe`` cells closest to each row of ``Q``."""
+
+        n_probe = min(n_probe, self.n_lists)
+        sims = Q @ self.centroids.T
+
+        return np.argpartition(-sims, n_probe - 1, axis=1)[:, :n_probe]
+
+    def _candidates(self, cells: np.ndarray) -> np.ndarray:
+
+        """Positions in :attr:`vectors` covered by ``cells``."""
+
+        return np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in cells])
+
+    def query(self, Q: np.ndarray, k: int = ANN_K, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+
+        """
+        Find the ``k`` most similar indexed rows for each query.
+
+        Parameters
+        ----------
+        Q : numpy.ndarray
+            ``(m, p)`` or ``(p,)`` query embeddings.
+        k : int, optional
+            Neighbours per query. Defaults to :data:`config.ANN_K`.
+        n_probe : int, optional
+            Overrides the index's :attr:`n_probe` for this call.
+
+        Returns
+        -------
+        tuple of (numpy.ndarray, numpy.ndarray)
+            ``(m, k)`` original row ids and cosine similarities, best first.
+            Missing neighbours are reported as id ``-1``.
+        """
+
+        Q = _normalize(np.atleast_2d(Q))
+        cells = self._cells(Q, n_probe or self.n_probe)
+        out_ids = np.empty((Q.shape[0], k), dtype=np.int64)
+        out_sims = np.empty((Q.shape[0], k), dtype=np.float32)
+
+        for i in range(Q.shape[0]):
+            cand = self._candidates(cells[i])
+            ids, sims = _top_k(Q[i:i + 1] @ self.vectors[cand].T, self.ids[cand], k)
+            out_ids[i], out_sims[i] = ids[0], sims[0]
+
+        return out_ids, out_sims
+
+    def self_join(self, k: int = ANN_K, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+
+        """
+        Find the ``k`` nearest other rows for every indexed row.
+
+        Rows of one cell share their candidate cells (those closest to the
+        cell's centroid), so each cell costs a single matrix product.
+
+        Parameters
+        ----------
+        k : int, optional
+            Neighbours per row. Defaults to :data:`config.ANN_K`.
+        n_probe : int, optional
+            Overrides the index's :attr:`n_probe` for this call.
+
+        Returns
+        -------
+        tuple of (numpy.ndarray, numpy.ndarray)
+            ``(N, k)`` neighbour ids and similarities, indexed by original row
+            id. A row is never its own neighbour.
+        """
+
+        n = len(self)
+        out_ids = np.full((n, k), -1, dtype=np.int64)
+        out_sims = np.full((n, k), -np.inf, dtype=np.float32)
+        cells = self._cells(self.centroids, n_probe or self.n_probe)
+
+        for c in range(self.n_lists):
+            lo, hi = self.offsets[c], self.offsets[c + 1]
+            if lo == hi:
+                continue
+            cand = self._candidates(cells[c])
+            sims = self.vectors[lo:hi] @ self.vectors[cand].T
+            sims[self.ids[lo:hi, None] == self.ids[cand][None, :]] = -np.inf  # exclude self matches
+            ids, best = _top_k(sims, self.ids[cand], k)
+            ids[np.isneginf(best)] = -1
+            out_ids[self.ids[lo:hi]], out_sims[self.ids[lo:hi]] = ids, best
+
+        return out_ids, out_sims
+
+    def save(self, path: str) -> None:
+
+        """
+        Write the index to directory ``path``.
+
+        Parameters
+        ----------
+        path : str
+            Output directory; created if needed.
+        """
+
+        os.makedirs(path, exist_ok=True)
+        for name in self._ARRAYS:
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(path, 'params.json'), 'w', encoding='utf-8') as f:
+            json.dump({'n_lists': self.n_lists, 'n_probe': self.n_probe, 'seed': self.seed}, f)
+
+    @classmethod
+    def load(cls, path: str, *, mmap_mode: Optional[str] = 'r') -> 'IVFIndex':
+
+        """
+        Open an index written by :meth:`save`.
+
+        Parameters
+        ----------
+        path : str
+            Index directory.
+        mmap_mode : str, optional
+            Passed to :func:`numpy.load`; the default memory-maps the arrays
+            read-only.
+
+        Returns
+        -------
+        IVFIndex
+            The loaded index.
+        """
+
+        with open(os.path.join(path, 'params.json'), 'r', encoding='utf-8') as f:
+            index = cls(**json.load(f))
+        for name in cls._ARRAYS:
+            setattr(index, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode))
+
+        return index
@@ -26,214 +26,51 @@
 
 ### imports and configs #######################################################
 
-from logging_utils import get_logger
+from logging_utils import get_logger, track
 logger = get_logger(__name__)
 
+from keywords import KEYWORD_LIST, KeywordTagger, keyword_counts, save_incidence
 import os
 import pandas as pd
-import sys
-from wordcloud import WordCloud
+from profiling import counts_frame
 
 pd.set_option('display.max_rows', None)
 
 ### set keywords ##############################################################
 
-keyword_list = [
-    'academic',
-    'acceptable',
-    'accessibility',
-    'activity',
-    'adapt',
-    'administrative',
-    'adobe',
-    'aggregate',
-    'applicable',
-    'approval',
-    'artificialintelligence',
-    'assignment',
-    'assistance',
-    'attendees',
-    'authorize',
-    'barrier',
-    'capability',
-    'chat',
-    'chatbots',
-    'chatgpt',
-    'class',
-    'classification',
-    'classroom',
-    'cloud',
-    'collaboration',
-    'communicate',
-    'companion',
-    'compliance',
-    'computer',
-    'consultation',
-    'context',
-    'control',
-    'create',
-    'custody',
-    'cybersecurity',
-    'data',
-    'device',
-    'digital',
-    'draft',
-    'electronic',
-    'employee',
-    'encryption',
-    'ethic',
-    'evaluate',
-    'evaluation',
-    'event',
-    'excellence',
-    'expectation',
-    'explore',
-    'facility',
-    'faculty',
-    'final',
-    'gai',
-    'gelmangwu',
-    'genai',
-    'generative',
-    'guidance',
-    'guide',
-    'guideline',
-    'gwid',
-    'gws',
-    'host',
-    'human',
-    'ias',
-    'idea',
-    'identity',
-    'install',
-    'instructors',
-    'integrity',
-    'intellectual',
-    'invite',
-    'it',
-    'ithelpgwu',
-    'knowledge',
-    'language',
-    'languagemodels',
-    'law',
-    'learn',
-    'legitimate',
-    'level',
-    'library',
-    'loss',
-    'measure',
-    'mobile',
-    'model',
-    'objective',
-    'office',
-    'output',
-    'owned',
-    'permitted',
-    'personal',
-    'phone',
-    'physical',
-    'pii',
-    'platform',
-    'policy',
-    'practice',
-    'prints',
-    'privacy',
-    'product',
-    'program',
-    'prompt',
-    'protect',
-    'protection',
-    'provost',
-    'public',
-    'quality',
-    'quiz',
-    'record',
-    'regulate',
-    'requirement',
-    'research',
-    'researcher',
-    'resource',
-    'restrict',
-    'review',
-    'risk',
-    'room',
-    'scan',
-    'school',
-    'secure',
-    'security',
-    'sensitivity',
-    'session',
-    'skill',
-    'software',
-    'step',
-    'strongly',
-    'student',
-    'style',
-    'success',
-    'system',
-    'teach',
-    'technology',
-    'telehealth',
-    'tls',
-    'tool',
-    'transmit',
-    'unacceptable',
-    'unauthorized',
-    'university',
-    'usiness',
-    'verify',
-    'violation',
-    'virtual',
-    'workshop',
-    'write',
-    'zoom'
-
-]
+keyword_list = KEYWORD_LIST
 
 ### load data #################################################################
 
-lemmatized_data_fname = f'out{os.sep}_raw_lower_rgx_entity_stemmed_stopped_long_freq0.txt'
-lemmatized_data = pd.read_csv(lemmatized_data_fname, header=None, skip_blank_lines=False)
-logger.info(f'Loaded: {lemmatized_data_fname}.')
-logger.info(lemmatized_data.head())
-
 chunks_fname = f'dat{os.sep}chunk{os.sep}existing_policy_combined.csv'
 chunk_data = pd.read_csv(chunks_fname)
 logger.info(f'Loaded: {chunks_fname}.')
 logger.info(chunk_data.head())
 
-if chunk_data.shape[0] == lemmatized_data.shape[0]:
-        logger.info('Loaded sets have same N.')
-else:
-    logger.error('Loaded sets have different N.')
-    logger.info(f'lemmatized_data N: {lemmatized_data.shape[0]}.')
-    logger.info(f'chunk_data N: {chunk_data.shape[0]}.')
-    sys.exit(-1)
-
-### keyword tagging ###########################################################
-
-big_list = []
-chunk_data['Keywords'] = ''
-for i in range(0, chunk_data.shape[0]):
+# normalized text written by lemmatize.py, joined on the chunk keys
+lemmas_fname = f'dat{os.sep}existing_policy_lemmas.csv'
+lemmas = pd.read_csv(lemmas_fname, keep_default_na=False)
+logger.info(f'Loaded: {lemmas_fname}.')
 
-    row_string = ''
+chunk_data = chunk_data.merge(lemmas, on=['Type', 'ID'], how='left', validate='one_to_one')
+n_missing = chunk_data['Lemmas'].isna().sum()
+if n_missing:
+    logger.warning(f'{n_missing} chunks have no lemmas; rerun lemmatize.py. They get no keywords.')
+chunk_data['Lemmas'] = chunk_data['Lemmas'].fillna('')
 
-    for kw in keyword_list:
-        if kw in str(lemmatized_data.iloc[i, 0]).split(' '):
-            big_list.append(kw)
-            row_string += kw
-            row_string += ', '
+### keyword tagging ###########################################################
 
-    row_string = row_string[:-2]  # remove trailing comma
-    chunk_data.loc[i, 'Keywords'] = row_string
-    text = chunk_data.loc[i, 'Text']
-    kws = chunk_data.loc[i, 'Keywords']
+# tokenize each row once and intersect with the prebuilt keyword set
+tagger = KeywordTagger(keyword_list)
+with track('tagging'):
+    row_keywords = tagger.tag_many(chunk_data.pop('Lemmas'))
+chunk_data['Keywords'] = [', '.join(kws) for kws in row_keywords]
 
-    if (i + 1) % 100 == 0:
-        logger.info('----------- -----------')
-        logger.info(f'Row: {str(i + 1)}/{chunk_data.shape[0]}')
-        logger.info(f'Chunk text: {text}')
-        logger.info(f'Chunk topics: {kws}')
+for i in range(99, chunk_data.shape[0], 100):
+    logger.info('----------- -----------')
+    logger.info(f'Row: {str(i + 1)}/{chunk_data.shape[0]}')
+    logger.info(f"Chunk text: {chunk_data.loc[i, 'Text']}")
+    logger.info(f"Chunk topics: {chunk_data.loc[i, 'Keywords']}")
 
 ### save output data ##########################################################
 
@@ -241,23 +78,18 @@ chunk_data_fname = f'dat{os.sep}existing_policy_keyword.csv'
 chunk_data.to_csv(chunk_data_fname, index=False)
 logger.info(f'Saved: {chunk_data_fname}.')
 
-### word cloud ################################################################
-
-logger.info('Generating word cloud ...')
-
-wc_text = ' '.join(big_list)
-
-wordcloud = WordCloud(
-    width=4000,
-    height=2000,
-    max_words=100,       # maximum number of words shown
-    min_font_size=7,     # minimum font size
-    background_color='white',
-    colormap='Set2',  # pastel colormap
-    collocations=False
-).generate(wc_text)
-
-# save to file
-wc_fname = f'out{os.sep}res{os.sep}existing_policy_key_word_cloud_hi_4k.png'
-wordcloud.to_file(wc_fname)
-logger.info(f'Saved: {wc_fname}.')
\ No newline at end of file
+# sparse chunk x keyword incidence matrix; rows line up with chunk_data
+incidence = tagger.incidence(row_keywords)
+incidence_prefix = f'dat{os.sep}existing_policy_keyword_incidence'
+save_incidence(incidence_prefix, incidence, tagger.vocabulary)
+logger.info(f'Saved: {incidence_prefix}.npz and {incidence_prefix}_vocab.txt ({incidence.nnz} entries).')
+logger.info(f'Most frequent keywords: {keyword_counts(incidence, tagger.vocabulary).nlargest(10).to_dict()}.')
+
+### keyword counts ############################################################
+
+# item,count table; render_clouds.py draws its word cloud
+counts = keyword_counts(incidence, tagger.vocabulary)
+counts_df = counts_frame(counts[counts > 0])
+counts_fname = f'out{os.sep}res{os.sep}existing_policy_key_word_counts.csv'
+counts_df.to_csv(counts_fname, index=False)
+logger.info(f'Saved: {counts_fname}.')
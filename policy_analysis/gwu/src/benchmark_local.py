@@ -0,0 +1,73 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Python 3.10
+# (.venv) patrickh@patrickh-lambda-workstation:~/Workspace/gwsb_caio/policy_analysis/gwu$ 
+# /home/patrickh/Workspace/gwsb_caio/.venv/bin/python 
+# /home/patrickh/Workspace/gwsb_caio/policy_analysis/gwu/src/benchmark_local.py
+
+### imports and configs #######################################################
+
+import config
+
+from logging_utils import get_logger
+logger = get_logger(__name__)
+
+from llms import local_client
+import os
+import pandas as pd
+import time
+
+SEED = config.SEED
+N_PROMPTS = 32       # chunks sampled as benchmark prompts
+MAX_NEW_TOKENS = 64
+
+tic = time.time()
+
+### sample prompts ############################################################
+
+chunk_fname = f'dat{os.sep}chunk{os.sep}existing_policy_combined.csv'
+chunks = pd.read_csv(chunk_fname)
+sample = chunks['Text'].dropna().sample(n=min(N_PROMPTS, len(chunks)), random_state=SEED)
+prompts = [f'Summarize the following policy text in one sentence: {text}' for text in sample]
+logger.info(f'Sampled {len(prompts)} prompts from {chunk_fname}.')
+
+### compare inference profiles ################################################
+
+logger.info('----------- -----------')
+logger.info(f'Benchmarking {config.FALLBACK_MODEL} on profiles {local_client.PROFILES} ...')
+
+results = local_client.benchmark(prompts, max_new_tokens=MAX_NEW_TOKENS)
+
+report = pd.DataFrame.from_dict(results, orient='index').rename_axis('Profile').reset_index()
+for row in report.itertuples():
+    logger.info(f'{row.Profile}: {row.tokens_per_s:.1f} tokens/s ({row.speedup:.2f}x {report["Profile"].iat[0]}), '
+                f'mean latency {row.mean_latency_s:.2f} s. per batch.')
+
+report_fname = f'out{os.sep}res{os.sep}local_benchmark.csv'
+report.to_csv(report_fname, index=False)
+logger.info(f'Saved: {report_fname}.')
+
+# end timer
+toc = time.time() - tic
+logger.info(f'All tasks performed in {toc:.2f} s.')
@@ -0,0 +1,371 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+chunking.py
+===========
+
+Chunking engine used by :mod:`txt2chunk` and :mod:`concat_csv`.
+
+Text is cleaned line by line with precompiled patterns into one flat list of
+words, and overlapping windows over that list become chunk records. Records
+are collected in plain lists and turned into a single
+:class:`pandas.DataFrame` per document with the columns ``Type``, ``ID`` and
+``Text``.
+
+Each chunk holds ``length + 1`` words and starts ``overlap`` words before the
+end of the previous chunk; the last chunk holds whatever words remain. This
+reproduces the output of the original token-accumulator loop exactly.
+
+In token mode (:func:`chunk_token_files`) the cleaned words of several
+documents are encoded in one ``encode_ordinary_batch`` call of a
+:mod:`tiktoken` encoding, and windows of exactly ``length`` model tokens,
+overlapping by ``overlap`` tokens, are decoded back to text. Chunk sizes then
+match the token limits of the embedding and completion APIs.
+
+:mod:`concat_csv` combines the per-document chunk files with
+:func:`iter_chunk_frames`, which reads them in blocks of rows against a fixed
+schema, and optionally :func:`write_parquet_parts`, which writes the blocks
+as a Parquet dataset; neither holds more than one block in memory.
+
+Example
+-------
+
+.. code-block:: python
+
+    from chunking import chunk_file
+
+    chunks = chunk_file('dat/txt/policy.txt', 'policy')
+    chunks.to_csv('dat/chunk/policy.csv', index=False)
+
+"""
+
+import os
+import re
+from typing import Iterable, Iterator, List, Sequence
+
+import pandas as pd
+
+import config
+
+LENGTH = config.CHUNK_LENGTH
+OVERLAP = config.CHUNK_OVERLAP
+TOKEN_LENGTH = config.CHUNK_TOKENS
+TOKEN_OVERLAP = config.CHUNK_TOKEN_OVERLAP
+CONCAT_CHUNK_ROWS = config.CONCAT_CHUNK_ROWS
+CONCAT_PARQUET_ROWS = config.CONCAT_PARQUET_ROWS
+MIN_TOKEN_LEN = 1
+MAX_TOKEN_LEN = 24
+
+COLS = ['Type', 'ID', 'Text']
+DTYPES = {'Type': str, 'ID': 'int64', 'Text': str}
+
+_BLANK = re.compile(r'^\s*$')
+_NON_ALPHA = re.compile(r'[^a-zA-Z]')
+_URL = re.compile(r'https?\:\/\/[^\s]*?(\s|$)', flags=re.I)
+_SPACE = re.compile(r'\s')
+
+__all__ = ['COLS', 'DTYPES', 'clean_lines', 'chunk_words', 'chunk_records', 'chunk_file',
+           'token_windows', 'chunk_token_files', 'iter_chunk_frames', 'write_parquet_parts']
+
+
+def clean_lines(lines: Iterable[str]) -> List[str]:
+
+    """
+    Turn raw text lines into a flat list of cleaned, lower-case words.
+
+    Blank lines and lines that are mostly numbers or symbols are skipped, URLs
+    are removed, apostrophes are dropped, and words that are too short, too
+    long, start with ``www`` or are a lone ``s`` are filtered out.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Lines of text, for example an open file.
+
+    Returns
+    -------
+    list of str
+        Cleaned words in document order.
+    """
+
+    words = []
+
+    for line in lines:
+
+        if _BLANK.match(line):  # skip blank lines
+            continue
+
+        if len(_NON_ALPHA.findall(line)) > len(line) / 2:  # skip lines of numbers or symbols
+            continue
+
+        line = _URL.sub(' ', line.rstrip().lower())  # remove urls
+        words.extend(
+            token for token in (t.replace("'", '') for t in _SPACE.split(line))
+            if MIN_TOKEN_LEN < len(token) < MAX_TOKEN_LEN and token != 's' and not token.startswith('www')
+        )
+
+    return words
+
+
+def chunk_words(words: List[str], length: int = LENGTH, overlap: int = OVERLAP) -> List[str]:
+
+    """
+    Join overlapping windows of ``words`` into chunk strings.
+
+    Parameters
+    ----------
+    words : list of str
+        Cleaned words, as returned by :func:`clean_lines`.
+    length : int, optional
+        Chunk length; each full chunk holds ``length + 1`` words. Defaults to
+        :data:`config.CHUNK_LENGTH`.
+    overlap : int, optional
+        Number of words shared by consecutive chunks. Defaults to
+        :data:`config.CHUNK_OVERLAP`.
+
+    Returns
+    -------
+    list of str
+        Chunk texts. A document without words yields one empty chunk.
+    """
+
+    size = length + 1
+    step = size - overlap
+    if step < 1:
+        raise ValueError('overlap must be smaller than length + 1.')
+
+    starts = range(0, max(len(words) - size, 0), step)  # each full window is followed by another word
+    texts = [' '.join(words[s:s + size]) for s in starts]
+    last = (starts[-1] + step) if len(starts) else 0
+    texts.append(' '.join(words[last:]))
+
+    return texts
+
+
+def chunk_records(stem: str, texts: List[str]) -> pd.DataFrame:
+
+    """
+    Build the ``Type, ID, Text`` table for one document in a single step.
+
+    Parameters
+    ----------
+    stem : str
+        Document name stored in the ``Type`` column.
+    texts : list of str
+        Chunk texts; ``ID`` numbers them from ``1``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per chunk.
+    """
+
+    return pd.DataFrame({'Type': [stem] * len(texts),
+                         'ID': range(1, len(texts) + 1),
+                         'Text': texts}, columns=COLS)
+
+
+def chunk_file(in_file: str, stem: str, length: int = LENGTH, overlap: int = OVERLAP) -> pd.DataFrame:
+
+    """
+    Read and chunk a text file.
+
+    Parameters
+    ----------
+    in_file : str
+        Path to a UTF-8 text file.
+    stem : str
+        Document name stored in the ``Type`` column.
+    length, overlap : int, optional
+        Passed to :func:`chunk_words`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per chunk with columns :data:`COLS`.
+    """
+
+    with open(in_file, 'r', encoding='utf-8') as f:
+        words = clean_lines(f)
+
+    return chunk_records(stem, chunk_words(words, length, overlap))
+
+
+def token_windows(ids: Sequence[int], length: int = TOKEN_LENGTH, overlap: int = TOKEN_OVERLAP) -> List[Sequence[int]]:
+
+    """
+    Split a token id sequence into overlapping windows.
+
+    Parameters
+    ----------
+    ids : sequence of int
+        Token ids of one document.
+    length : int, optional
+        Maximum tokens per window. Defaults to :data:`config.CHUNK_TOKENS`.
+    overlap : int, optional
+        Tokens shared by consecutive windows. Defaults to
+        :data:`config.CHUNK_TOKEN_OVERLAP`.
+
+    Returns
+    -------
+    list of sequence of int
+        Windows in document order; an empty document yields one empty window.
+    """
+
+    step = length - overlap
+    if step < 1:
+        raise ValueError('overlap must be smaller than length.')
+
+    starts = range(0, max(len(ids) - overlap, 1), step)
+
+    return [ids[s:s + length] for s in starts]
+
+
+def chunk_token_files(in_files: List[str], stems: List[str], encoding,
+                      length: int = TOKEN_LENGTH, overlap: int = TOKEN_OVERLAP) -> List[pd.DataFrame]:
+
+    """
+    Chunk several text files into windows of model tokens.
+
+    Files are cleaned with :func:`clean_lines`, encoded together with one
+    ``encoding.encode_ordinary_batch`` call, windowed with
+    :func:`token_windows` and decoded with ``encoding.decode_batch``.
+
+    Parameters
+    ----------
+    in_files : list of str
+        Paths to UTF-8 text files.
+    stems : list of str
+        Document names stored in the ``Type`` column, one per file.
+    encoding : tiktoken.Encoding
+        Encoding of the model the chunks are sized for.
+    length, overlap : int, optional
+        Passed to :func:`token_windows`.
+
+    Returns
+    -------
+    list of pandas.DataFrame
+        One ``Type, ID, Text`` table per file, in input order.
+    """
+
+    texts = []
+    for in_file in in_files:
+        with open(in_file, 'r', encoding='utf-8') as f:
+            texts.append(' '.join(clean_lines(f)))
+
+    out = []
+    for stem, ids in zip(stems, encoding.encode_ordinary_batch(texts)):
+        chunk_texts = [t.strip() for t in encoding.decode_batch(token_windows(ids, length, overlap))]
+        out.append(chunk_records(stem, chunk_texts))
+
+    return out
+
+
+def iter_chunk_frames(paths: Iterable[str], *, chunksize: int = CONCAT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+
+    """
+    Read chunk CSVs in blocks of rows, validating the fixed schema.
+
+    Every file must have exactly the columns :data:`COLS`; values are read
+    with the types in :data:`DTYPES`, and empty text stays an empty string,
+    so blocks can be appended to one output without re-inferring types.
+
+    Parameters
+    ----------
+    paths : iterable of str
+        Chunk CSVs, as written by :mod:`txt2chunk`.
+    chunksize : int, optional
+        Rows per block. Defaults to :data:`config.CONCAT_CHUNK_ROWS`.
+
+    Yields
+    ------
+    pandas.DataFrame
+        Blocks of at most ``chunksize`` rows, file by file.
+
+    Raises
+    ------
+    ValueError
+        If a file's header differs from :data:`COLS`.
+    """
+
+    for path in paths:
+
+        header = list(pd.read_csv(path, nrows=0).columns)
+        if header != COLS:
+            raise ValueError(f'{path} has columns {header}; expected {COLS}.')
+
+        yield from pd.read_csv(path, dtype=DTYPES, keep_default_na=False, chunksize=chunksize)
+
+
+def write_parquet_parts(frames: Iterable[pd.DataFrame], out_dir: str, *,
+                        rows_per_file: int = CONCAT_PARQUET_ROWS) -> List[str]:
+
+    """
+    Write blocks of chunk rows as a Parquet dataset of numbered part files.
+
+    Blocks are written as row groups and a new ``part-NNNNN.parquet`` file is
+    started every ``rows_per_file`` rows, so memory holds one block at a time
+    however large the corpus. ``pandas.read_parquet(out_dir)`` or
+    :mod:`pyarrow.dataset` read the parts back as one table. Requires the
+    optional :mod:`pyarrow` dependency.
+
+    Parameters
+    ----------
+    frames : iterable of pandas.DataFrame
+        Blocks with the columns :data:`COLS`, e.g. from
+        :func:`iter_chunk_frames`.
+    out_dir : str
+        Dataset directory; it must not contain other part files.
+    rows_per_file : int, optional
+        Rows per part file. Defaults to :data:`config.CONCAT_PARQUET_ROWS`.
+
+    Returns
+    -------
+    list of str
+        Paths of the part files written.
+    """
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover
+        raise ImportError('Parquet output requires pyarrow; install it or set CONCAT_PARQUET = False.') from exc
+
+    schema = pa.schema([('Type', pa.string()), ('ID', pa.int64()), ('Text', pa.string())])
+    os.makedirs(out_dir, exist_ok=True)
+    parts, writer, rows = [], None, 0
+
+    try:
+        for frame in frames:
+            if writer is None or rows >= rows_per_file:
+                if writer is not None:
+                    writer.close()
+                parts.append(os.path.join(out_dir, f'part-{len(parts):05d}.parquet'))
+                writer, rows = pq.ParquetWriter(parts[-1], schema), 0
+            writer.write_table(pa.Table.from_pandas(frame[COLS], schema=schema, preserve_index=False))
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return parts
@@ -21,28 +21,30 @@
 
 ### imports and configs #######################################################
 
-from collections import Counter
+import config
 
-from logging_utils import get_logger
+from logging_utils import get_logger, track
 logger = get_logger(__name__)
 
+from embed_store import load_embeddings
 import matplotlib.cm as cm
 from matplotlib import MatplotlibDeprecationWarning
 import matplotlib.pyplot as plt
+import numpy as np
 import os
-import pandas as pd
+from profiling import counts_frame, group_profiles, keyword_table
 from sklearn.preprocessing import normalize
 import time
-import umap
+from umap_model import UMAPModel
 
 import warnings
 warnings.simplefilter(action="ignore", category=FutureWarning)
 warnings.simplefilter(action="ignore", category=UserWarning)
 warnings.simplefilter(action="ignore", category=MatplotlibDeprecationWarning)
 
-from wordcloud import WordCloud
-
-embedding_p = 1536
+POLICY_LABELS = config.POLICY_LABELS
+UMAP_MODE = config.UMAP_MODE
+UMAP_REFIT_FRACTION = config.UMAP_REFIT_FRACTION
 
 tic = time.time()
 
@@ -51,31 +53,26 @@ tic = time.time()
 logger.info('----------- -----------')
 logger.info(f'Loading data ...')
 
-embedding_names = ['dim_' + str(i) for i in range(0, embedding_p)]
-valid_cols = ['Type', 'ID', 'Keywords'] + embedding_names
-
-all_fname = f'dat{os.sep}existing_policy_keyword_embed.csv'
-all_ = pd.read_csv(all_fname)
-logger.info(f'Loaded: {all_fname}.')
+# metadata table plus memory-mapped float32 embedding matrix, reduced by reduce_embed.py if enabled
+all_prefix = f'dat{os.sep}existing_policy_keyword_embed' + ('_reduced' if config.REDUCE_DIMS else '')
+all_, X = load_embeddings(all_prefix)
+logger.info(f'Loaded: {all_prefix}.')
 
 all_['Keywords'] = all_['Keywords'].fillna('')
 logger.info(f'Any missing values: {all_.isna().any().any()}.')
 all_['Keywords'] = all_['Keywords'].str.split(',')
 
-N = all_.shape[0]
-logger.info(f'Correct data shape: {all_.shape == (792, 1539)}.')
+N, embedding_p = X.shape
+logger.info(f'Correct data shape: {all_.shape[0] == N}.')
 
 ### extract embeddings and normalize ##########################################
 
 logger.info('----------- -----------')
 logger.info(f'Extracting and normalizing embeddings ...')
 
-# extract
-X = all_[embedding_names].values
-
 # handle 0's
 eps = 0.000000001
-X[X == 0.0] = eps
+X = np.where(X == 0.0, np.float32(eps), X)
 
 # normalize
 X = normalize(X, norm="l2", axis=1)
@@ -88,16 +85,30 @@ logger.info(f'Embeddings correct shape: {str(X.shape == (N, embedding_p))}')
 ### perform umap ##############################################################
 
 logger.info('----------- -----------')
-logger.info('Performing UMAP ... ')
-
-reducer = umap.UMAP(
-    n_neighbors=15,
-    min_dist=0.1,
-    metric='cosine',
-    random_state=0
-)
-
-X_2d = reducer.fit_transform(X)  # shape (n, 2)
+model_fname = f'dat{os.sep}existing_policy_keyword_embed_umap.joblib'
+
+# place new chunks on the saved map unless a refit is asked for or needed
+model = UMAPModel.load(model_fname) if UMAP_MODE != 'fit' and os.path.exists(model_fname) else None
+if model is not None and model.n_features != embedding_p:
+    logger.info(f'Saved map was fitted on {model.n_features}-d embeddings; refitting.')
+    model = None
+if model is not None and UMAP_MODE == 'auto' and model.new_rows(X, all_).mean() > UMAP_REFIT_FRACTION:
+    logger.info(f'More than {UMAP_REFIT_FRACTION:.0%} of chunks are new or changed; refitting.')
+    model = None
+if model is None and UMAP_MODE == 'incremental':
+    raise FileNotFoundError(f'UMAP_MODE is incremental, but no usable map in {model_fname}.')
+
+with track('umap'):
+    if model is None:
+        logger.info('Performing UMAP ... ')
+        model = UMAPModel().fit(X, all_)
+        logger.info('UMAP phases: ' + ', '.join(f'{k} {v:.2f} s' for k, v in model.timings.items()) + '.')
+        model.save(model_fname)
+        logger.info(f'Saved: {model_fname}.')
+        X_2d = model.embedding  # shape (n, 2)
+    else:
+        X_2d, is_new = model.place(X, all_)
+        logger.info(f'Placed {is_new.sum()} new or changed of {N} chunks on the saved map {model_fname}.')
 
 logger.info('UMAP results head:')
 logger.info(X_2d[0:5, :])
@@ -116,33 +127,17 @@ logger.info(f'Saved: {umap_fname}.')
 logger.info('----------- -----------')
 logger.info('Plotting ...')
 
-# nice names
-legend_dict = {
-    'Acceptable Use of IT Resources Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'Acceptable Use (OECR)',
-    'additional_guidance_for_generative_ai_-_august_2023': 'Provost 2',
-    'AI Guidance and Best Practices _ GW Information Technology _ The George Washington University': 'AI Guidance and Best Pratice (IT)',
-    'Artificial Intelligence (AI) Evaluation & Status _ GW Information Technology _ The George Washington University': 'Tool Evaluation (IT)',
-    'Communicating Your GenAI Expectations to Your Students _ Libraries & Academic Innovation': 'Communicating Expecations (Libraries)',
-    'Cybersecurity Risk Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'Cybersecurity Risk (OECR)',
-    'Data Classification Guide _ GW Information Technology _ The George Washington University': 'Data Classification (IT)',
-    'Data Protection Guide _ GW Information Technology _ The George Washington University': 'Data Protection (IT)',
-    'Deciding on Appropriate Use of GenAI in Academic Classes _ Libraries & Academic Innovation': 'Deciding on Use (Libraries)',
-    'Explore Tools & Services _ GW Information Technology _ The George Washington University': 'Approved Tools (IT)',
-    'Generative Artificial Intelligence (GenAI) _ Libraries & Academic Innovation': 'Generative AI (Libraries)',
-    'generative-artificial-intelligence-guidelines-april-2023': 'Provost 1', 
-    'Identity and Access Management Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'IAM (OECR)',
-    'Privacy Considerations when using Virtual Meeting and Collaboration Platforms _ GW Privacy Office _ The George Washington University': 'Privacy Guidance: Meetings',
-    'Privacy Guidance for use of Artificial Intelligence _ GW Privacy Office _ The George Washington University': 'Privacy Guidance',
-    'Teaching with Generative AI _ Libraries & Academic Innovation': 'Teaching with Gen AI (Libraries)'
-}
-all_['Type'] = all_['Type'].map(legend_dict)
+# nice names; documents without one in config.POLICY_LABELS keep their file name
+unlabelled = sorted(set(all_['Type']) - set(POLICY_LABELS))
+if unlabelled:
+    logger.warning(f'No label in config.POLICY_LABELS for: {", ".join(unlabelled)}; using their file names.')
+all_['Type'] = all_['Type'].map(POLICY_LABELS).fillna(all_['Type'])
 
 # init plotting
 clusters = all_['Type'].unique()
 colors = cm.get_cmap("Set2", len(clusters))  # Set2 palette
 centroids = {}
 fig, ax = plt.subplots(figsize=(20, 16))
-profile_dict = {}
 
 # plot all clusters
 for i, cl in enumerate(clusters):
@@ -163,16 +158,6 @@ for i, cl in enumerate(clusters):
     cy = all_.loc[mask, 'UMAP_D2'].median()
     centroids[cl] = (cx, cy)
 
-    # capture profiling information
-    profile_dict[cl] = {'cl_non_unique_keyword_list': None,
-                        'cl_non_unique_keyword_set': None}
-    profile_dict[cl]['cl_non_unique_keyword_list'] = sum(all_.loc[mask, 'Keywords'], [])
-    profile_dict[cl]['cl_non_unique_keyword_list'] = [w.strip() for w in profile_dict[cl]['cl_non_unique_keyword_list']]
-    profile_dict[cl]['cl_non_unique_keyword_list'] = sorted([w for w in profile_dict[cl]['cl_non_unique_keyword_list'] if w != ''])
-    logger.info(f"{cl} list: {profile_dict[cl]['cl_non_unique_keyword_list']}")
-    profile_dict[cl]['cl_non_unique_keyword_set'] = set(profile_dict[cl]['cl_non_unique_keyword_list'])
-    logger.info(f"{cl} set: {profile_dict[cl]['cl_non_unique_keyword_set']}")
-
 # annotate centroids with a small text box
 for _, cl in enumerate(clusters):
     cx, cy = centroids[cl]
@@ -199,7 +184,8 @@ ax.set_title('Visual Map of GWU AI Policies', fontsize=25)
 # save
 plt.tight_layout()
 plot_fname = f'out{os.sep}res{os.sep}doc_clus_legend.png'
-plt.savefig(plot_fname, dpi=300, bbox_inches='tight')
+with track('savefig'):
+    plt.savefig(plot_fname, dpi=300, bbox_inches='tight')
 logger.info(f'Saved: {plot_fname}.')
 
 
@@ -208,95 +194,24 @@ logger.info(f'Saved: {plot_fname}.')
 logger.info('----------- -----------')
 logger.info('Profiling and saving results ...')
 
-### understand what is in each large cluster, but not in sn
-
-legend_dict = {
-    'Acceptable Use of IT Resources Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'Acceptable Use (OECR)',
-    'additional_guidance_for_generative_ai_-_august_2023': 'Provost 2',
-    'AI Guidance and Best Practices _ GW Information Technology _ The George Washington University': 'AI Guidance and Best Pratice (IT)',
-    'Artificial Intelligence (AI) Evaluation & Status _ GW Information Technology _ The George Washington University': 'Tool Evaluation (IT)',
-    'Communicating Your GenAI Expectations to Your Students _ Libraries & Academic Innovation': 'Communicating Expecations (Libraries)',
-    'Cybersecurity Risk Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'Cybersecurity Risk (OECR)',
-    'Data Classification Guide _ GW Information Technology _ The George Washington University': 'Data Classification (IT)',
-    'Data Protection Guide _ GW Information Technology _ The George Washington University': 'Data Protection (IT)',
-    'Deciding on Appropriate Use of GenAI in Academic Classes _ Libraries & Academic Innovation': 'Deciding on Use (Libraries)',
-    'Explore Tools & Services _ GW Information Technology _ The George Washington University': 'Approved Tools (IT)',
-    'Generative Artificial Intelligence (GenAI) _ Libraries & Academic Innovation': 'Generative AI (Libraries)',
-    'generative-artificial-intelligence-guidelines-april-2023': 'Provost 1', 
-    'Identity and Access Management Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'IAM (OECR)',
-    'Privacy Considerations when using Virtual Meeting and Collaboration Platforms _ GW Privacy Office _ The George Washington University': 'Privacy Guidance: Meetings',
-    'Privacy Guidance for use of Artificial Intelligence _ GW Privacy Office _ The George Washington University': 'Privacy Guidance',
-    'Teaching with Generative AI _ Libraries & Academic Innovation': 'Teaching with Gen AI (Libraries)'
-}
-
-
-
-
-provost_list = profile_dict['Provost 1']['cl_non_unique_keyword_list'] +\
-               profile_dict['Provost 2']['cl_non_unique_keyword_list'] 
-provost_set = set(provost_list)
-
-libraries_list = profile_dict['Communicating Expecations (Libraries)']['cl_non_unique_keyword_list'] + \
-                 profile_dict['Deciding on Use (Libraries)']['cl_non_unique_keyword_list'] +\
-                 profile_dict['Teaching with Gen AI (Libraries)']['cl_non_unique_keyword_list'] +\
-                 profile_dict['Generative AI (Libraries)']['cl_non_unique_keyword_list']
-libraries_set = set(libraries_list)
-
-eval_approved_list = profile_dict['Tool Evaluation (IT)']['cl_non_unique_keyword_list'] + \
-                     profile_dict['Approved Tools (IT)']['cl_non_unique_keyword_list']
-eval_approved_set = set(eval_approved_list)
-
-guidance_list = profile_dict['AI Guidance and Best Pratice (IT)']['cl_non_unique_keyword_list'] + \
-                profile_dict['Privacy Guidance']['cl_non_unique_keyword_list']
-guidance_set = set(guidance_list)
-
-data_list = profile_dict['Data Classification (IT)']['cl_non_unique_keyword_list'] + \
-            profile_dict['Data Protection (IT)']['cl_non_unique_keyword_list']
-data_set = set(data_list)
-
-oecr_list = profile_dict['Acceptable Use (OECR)']['cl_non_unique_keyword_list'] + \
-            profile_dict['Cybersecurity Risk (OECR)']['cl_non_unique_keyword_list'] +\
-            profile_dict['IAM (OECR)']['cl_non_unique_keyword_list']
-oecr_set = set(oecr_list)
-
-meetings_list = profile_dict['Privacy Guidance: Meetings']['cl_non_unique_keyword_list']
-meetings_set = set(meetings_list)
-
-### create count list, convert each to csv, and save
-### create word clouds
-
-prefix_list = ['provost', 'libraries', 'eval_approved', 'guidance', 'data', 'oecr', 'meetings']
-list_list = [provost_list, libraries_list, eval_approved_list, guidance_list, data_list, oecr_list, meetings_list]
-
-for i, list_ in enumerate(list_list):
-
-    logger.info(f'Generating {prefix_list[i]} count list ...')
-    counts = Counter(list_)
-    counts_df = pd.DataFrame.from_dict(counts, orient='index', columns=['count']).reset_index()
-    counts_df.rename(columns={'index': 'item'}, inplace=True)
-    counts_df_fname = f'out{os.sep}res{os.sep}{prefix_list[i]}_unique_counts.csv'
-    counts_df.to_csv(counts_df_fname, index=False)
-    logger.info(f'Saved: {counts_df_fname}.')
-
-    logger.info(f'Generating {prefix_list[i]} word cloud ...')
+# label x keyword counts in one pass, then summed over each group in config.PROFILE_GROUPS
+with track('profile'):
+    table = keyword_table(all_)
+n_chunks = all_['Type'].value_counts()
+for cl, counts in table.iterrows():
+    top = counts[counts > 0].sort_values(ascending=False).head(10)
+    logger.info(f'{cl}: {n_chunks.get(cl, 0)} chunks, {(counts > 0).sum()} distinct keywords; '
+                f'top: {", ".join(top.index)}.')
 
-    wc_text = ' '.join(list_)
+### create count tables, and save; render_clouds.py draws their word clouds
 
-    wordcloud = WordCloud(
-        width=4000,
-        height=2000,
-        max_words=200,       # maximum number of words shown
-        min_font_size=7,     # minimum font size
-        background_color='white',
-        colormap='Set2',  # pastel colormap
-        collocations=False
-    ).generate(wc_text)
-
-    # save to file
-    wc_fname = f'out{os.sep}res{os.sep}{prefix_list[i]}_unique_key_word_cloud_hi_4k.png'
-    wordcloud.to_file(wc_fname)
-    logger.info(f'Saved: {wc_fname}.')
+for name, counts in group_profiles(table).items():
 
+    logger.info(f'Generating {name} count list ...')
+    counts_df = counts_frame(counts)
+    counts_df_fname = f'out{os.sep}res{os.sep}{name}_unique_counts.csv'
+    counts_df.to_csv(counts_df_fname, index=False)
+    logger.info(f'Saved: {counts_df_fname}.')
 
 # end timer
 toc = time.time() - tic
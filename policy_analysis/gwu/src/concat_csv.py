@@ -26,25 +26,61 @@
 
 ### imports
 
+import config
+
 from logging_utils import get_logger
 logger = get_logger(__name__)
 
+from chunking import COLS, iter_chunk_frames, write_parquet_parts
+from manifest import Manifest
 from pathlib import Path
-import pandas as pd
 import os
+import shutil
+
+CONCAT_PARQUET = config.CONCAT_PARQUET
 
-### stack input txt files into a dataframe ####################################
+### stream chunk csv files into one file ######################################
 
 in_dir = Path(f'dat{os.sep}chunk')
 out_csv = Path(f'dat{os.sep}chunk{os.sep}existing_policy_combined.csv')
+out_parquet = Path(f'dat{os.sep}chunk_parquet')  # outside in_dir, which holds only chunk csvs
 
-files = sorted(in_dir.glob('*.csv'))
+files = sorted(f for f in in_dir.glob('*.csv') if f != out_csv)  # never re-read our own output
 if not files:
     raise FileNotFoundError(f'No CSV files found in {in_dir}')
 
-dfs = [pd.read_csv(f) for f in files]
-combined = pd.concat(dfs, ignore_index=True)
-combined.to_csv(out_csv, index=False)
+# only rebuild when a document's chunk file changed or disappeared since the last run
+manifest = Manifest('concat_csv', params={'parquet': CONCAT_PARQUET})
+removed = [p for p in manifest.entries if Path(p) not in files]
+manifest.prune([str(f) for f in files])
+changed = [f for f in files if not manifest.is_current(str(f), [str(out_csv)])]
+
+if not changed and not removed and (not CONCAT_PARQUET or out_parquet.exists()):
+    logger.info(f'All {len(files)} files unchanged; keeping {out_csv}.')
+else:
+    # append blocks of rows in file order; memory holds one block at a time
+    tmp_csv = out_csv.with_suffix('.csv.tmp')
+    n_rows = 0
+    with open(tmp_csv, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(COLS) + '\n')
+        for frame in iter_chunk_frames(files):
+            frame.to_csv(f, header=False, index=False)
+            n_rows += len(frame)
+    os.replace(tmp_csv, out_csv)
+
+    if CONCAT_PARQUET:
+        tmp_parquet = out_parquet.with_name(out_parquet.name + '.tmp')
+        shutil.rmtree(tmp_parquet, ignore_errors=True)
+        parts = write_parquet_parts(iter_chunk_frames(files), str(tmp_parquet))
+        shutil.rmtree(out_parquet, ignore_errors=True)
+        os.replace(tmp_parquet, out_parquet)
+        logger.info(f'Wrote {len(parts)} Parquet part files -> {out_parquet}')
+
+    # every input now maps to the new output
+    for f in files:
+        manifest.record(str(f), [str(out_csv)])
+    manifest.save()
 
-logger.info(f'Combined {len(files)} files -> {out_csv}')
-logger.info(f'Total rows: {len(combined):,}')
\ No newline at end of file
+    logger.info(f'Rebuilt after {len(changed)} changed and {len(removed)} removed documents.')
+    logger.info(f'Combined {len(files)} files -> {out_csv}')
+    logger.info(f'Total rows: {n_rows:,}')
@@ -35,9 +35,113 @@ import os
 SEED: int               = 12345 
 EMBEDDING_P: int        = 1536
 CHUNK_LENGTH: int       = 64
+CHUNK_OVERLAP: int      = 16
+CHUNK_MODE: str         = 'words'  # 'words' (CHUNK_LENGTH words) or 'tokens' (CHUNK_TOKENS model tokens)
+CHUNK_TOKENS: int       = 256
+CHUNK_TOKEN_OVERLAP: int = 32
 REMOTE_MODEL: str       = 'gpt-4o'
 EMBEDDING_MODEL: str    = 'text-embedding-ada-002'
 FALLBACK_MODEL: str     = 'h2oai/h2o-danube3.1-4b-chat'
+LOCAL_MAX_MODELS: int   = 1       # local pipelines kept loaded; least recently used are unloaded
+LOCAL_BATCH_SIZE: int   = 8       # prompts per forward pass of danube_complete_batch
+LOCAL_PROFILE: str      = os.environ.get('LOCAL_PROFILE', 'bf16')  # 'bf16' or 'cpu' (dynamic int8, CPU threads)
+LOCAL_NUM_THREADS: int  = os.cpu_count() or 1  # torch intra-op threads of the 'cpu' profile
+LOCAL_PREFIX_CACHE: bool = True   # reuse the system-prompt KV cache across single-prompt calls
+
+# combined chunk file
+CONCAT_CHUNK_ROWS: int  = 10000    # rows read and appended at a time
+CONCAT_PARQUET: bool    = False    # also write a Parquet dataset (needs pyarrow)
+CONCAT_PARQUET_ROWS: int = 1000000 # rows per Parquet part file
+
+# pdf extraction
+TIKA_SERVER_ENDPOINTS: list = ['http://localhost:9998']  # workers are spread round-robin
+PDF_WORKERS: int        = 2 * (os.cpu_count() or 1)
+TIKA_TIMEOUT: int       = 120  # seconds per file
+
+# streaming mode
+STREAM_PREFETCH: int    = 2     # documents extracted ahead of the one being chunked and tagged
+STREAM_SINK_ROWS: int   = 1000  # records buffered per CSV write
+STREAM_SOURCE: str      = 'pdf' # 'pdf' (extract with Tika) or 'txt' (read dat/txt)
+
+# incremental ingest
+MANIFEST_DIR: str       = f'dat{os.sep}manifest'  # one JSON manifest per stage
+PIPELINE_WORKERS: int   = 2  # pipeline stages run at the same time, each in its own process
+METRICS_PATH: str       = f'out{os.sep}metrics.jsonl'  # one JSON record per stage run: time, peak RSS, phases, counters
+
+# lemmatization
+LEMMA_MIN_LEN: int      = 3     # shorter lemmas are dropped
+LEMMA_MIN_FREQ: int     = 0     # lemmas seen fewer times in the corpus are dropped
+LEMMA_WORKERS: int      = os.cpu_count() or 1
+
+# embedding batches
+EMBED_BATCH_SIZE: int   = 512     # max inputs per embeddings request
+EMBED_BATCH_TOKENS: int = 100000  # max total input tokens per embeddings request
+EMBED_MAX_TOKENS: int   = 8191    # per-input token limit of EMBEDDING_MODEL
+EMBED_ASYNC: bool       = False   # send batches concurrently through llms.async_client
+
+# embedding cache
+EMBED_CACHE_ENABLED: bool  = True
+EMBED_CACHE_PATH: str      = f'dat{os.sep}cache{os.sep}embeddings.sqlite'
+EMBED_CACHE_MAX_BYTES: int = 2 * 1024**3  # evict least recently used vectors beyond this
+
+# completion cache
+COMPLETION_CACHE_MODE: str      = os.environ.get('COMPLETION_CACHE_MODE', 'readwrite')  # 'readwrite', 'replay' (read-only, misses fail) or 'off'
+COMPLETION_CACHE_PATH: str      = f'dat{os.sep}cache{os.sep}completions.sqlite'
+COMPLETION_CACHE_TTL: float     = 30 * 24 * 3600  # seconds; None keeps entries until evicted
+COMPLETION_CACHE_MAX_BYTES: int = 512 * 1024**2
+
+# dimensionality reduction
+REDUCE_DIMS: int        = 0       # e.g. 128-256 to run UMAP and ANN search on reduced embeddings; 0 disables
+REDUCE_METHOD: str      = 'auto'  # 'pca', 'truncate' (Matryoshka models) or 'auto'
+REDUCE_FIT_ROWS: int    = 100000  # rows sampled to fit PCA
+
+# umap map
+UMAP_N_NEIGHBORS: int   = 15
+UMAP_MIN_DIST: float    = 0.1
+UMAP_MODE: str          = 'auto'  # 'fit' refits, 'incremental' places new chunks on the saved map, 'auto' picks
+UMAP_REFIT_FRACTION: float = 0.2  # 'auto' refits when more than this share of chunks is new
+UMAP_DETERMINISTIC: bool = True   # seeded single-threaded layout; False runs it on UMAP_N_JOBS threads
+UMAP_N_JOBS: int        = -1      # threads of the kNN graph (and of the layout when not deterministic); -1 is all
+UMAP_KNN_CACHE_DIR: str = f'dat{os.sep}cache{os.sep}umap_knn'  # cached kNN graphs, only the newest per
+                                                               # (n_neighbors, random_state) is kept; '' disables
+
+# cluster profiling
+POLICY_LABELS: dict     = {  # document Type -> short label on the map
+    'Acceptable Use of IT Resources Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'Acceptable Use (OECR)',
+    'additional_guidance_for_generative_ai_-_august_2023': 'Provost 2',
+    'AI Guidance and Best Practices _ GW Information Technology _ The George Washington University': 'AI Guidance and Best Pratice (IT)',
+    'Artificial Intelligence (AI) Evaluation & Status _ GW Information Technology _ The George Washington University': 'Tool Evaluation (IT)',
+    'Communicating Your GenAI Expectations to Your Students _ Libraries & Academic Innovation': 'Communicating Expecations (Libraries)',
+    'Cybersecurity Risk Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'Cybersecurity Risk (OECR)',
+    'Data Classification Guide _ GW Information Technology _ The George Washington University': 'Data Classification (IT)',
+    'Data Protection Guide _ GW Information Technology _ The George Washington University': 'Data Protection (IT)',
+    'Deciding on Appropriate Use of GenAI in Academic Classes _ Libraries & Academic Innovation': 'Deciding on Use (Libraries)',
+    'Explore Tools & Services _ GW Information Technology _ The George Washington University': 'Approved Tools (IT)',
+    'Generative Artificial Intelligence (GenAI) _ Libraries & Academic Innovation': 'Generative AI (Libraries)',
+    'generative-artificial-intelligence-guidelines-april-2023': 'Provost 1',
+    'Identity and Access Management Policy _ Office of Ethics, Compliance, and Risk _ The George Washington University': 'IAM (OECR)',
+    'Privacy Considerations when using Virtual Meeting and Collaboration Platforms _ GW Privacy Office _ The George Washington University': 'Privacy Guidance: Meetings',
+    'Privacy Guidance for use of Artificial Intelligence _ GW Privacy Office _ The George Washington University': 'Privacy Guidance',
+    'Teaching with Generative AI _ Libraries & Academic Innovation': 'Teaching with Gen AI (Libraries)',
+}
+
+PROFILE_GROUPS: dict    = {  # profile name -> labels whose keywords are counted together
+    'provost': ['Provost 1', 'Provost 2'],
+    'libraries': ['Communicating Expecations (Libraries)', 'Deciding on Use (Libraries)',
+                  'Teaching with Gen AI (Libraries)', 'Generative AI (Libraries)'],
+    'eval_approved': ['Tool Evaluation (IT)', 'Approved Tools (IT)'],
+    'guidance': ['AI Guidance and Best Pratice (IT)', 'Privacy Guidance'],
+    'data': ['Data Classification (IT)', 'Data Protection (IT)'],
+    'oecr': ['Acceptable Use (OECR)', 'Cybersecurity Risk (OECR)', 'IAM (OECR)'],
+    'meetings': ['Privacy Guidance: Meetings'],
+}
+WORDCLOUD_WORKERS: int  = os.cpu_count() or 1  # word clouds rendered at the same time
+
+# nearest-neighbour index
+ANN_N_LISTS: int        = 0     # inverted lists (k-means cells); 0 picks about 2 * sqrt(N)
+ANN_N_PROBE: int        = 8     # lists scanned per query
+ANN_K: int              = 10
+DUPLICATE_SIMILARITY: float = 0.95  # cosine similarity treated as a near-duplicate
 
 # UI
 CLIENT_NAME             = 'The George Washington School of Business'
@@ -45,5 +149,14 @@ CLIENT_NAME             = 'The George Washington School of Business'
 ### Open AI API
 API_KEY: str            = os.environ['OPENAI_API_KEY']
 OPENAI_API_TIMEOUT: int = 600
-OPENAI_API_RETRIES: int = 0
+OPENAI_API_RETRIES: int = 5
+OPENAI_API_MAX_DELAY: float = 60    # cap on the backoff delay
+OPENAI_API_MAX_HINT: float = 120    # cap on server wait hints (Retry-After, rate-limit resets) of a 429
+OPENAI_API_DEADLINE: float = 900    # overall seconds for one call including retries; 0 disables
+OPENAI_CIRCUIT_THRESHOLD: int = 5   # consecutive failures that pause every worker
+OPENAI_CIRCUIT_COOLDOWN: float = 30 # seconds of that pause
+OPENAI_BASE_URL: str    = os.environ.get('OPENAI_BASE_URL')  # e.g. a local mock server; None uses the OpenAI API
+OPENAI_RPM: int         = 3000     # requests per minute allowed by our quota
+OPENAI_TPM: int         = 1000000  # tokens per minute allowed by our quota
+OPENAI_MAX_CONCURRENCY: int = 16   # in-flight requests of the async client
 
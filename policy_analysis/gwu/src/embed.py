@@ -28,17 +28,48 @@
 
 import config
 
-from logging_utils import get_logger
+from logging_utils import get_logger, track
 logger = get_logger(__name__)
 
+import embed_store
 import os
 import numpy as np
 import pandas as pd
+import tiktoken
 import time
 from tqdm import tqdm
-from llms import openai_client
+from llms import async_client, openai_client
 
 embedding_p = config.EMBEDDING_P
+batch_size = config.EMBED_BATCH_SIZE
+batch_tokens = config.EMBED_BATCH_TOKENS
+max_tokens = config.EMBED_MAX_TOKENS
+window_size = 4 * config.OPENAI_MAX_CONCURRENCY  # async batches in flight between checkpoints
+
+encoding = tiktoken.encoding_for_model(config.EMBEDDING_MODEL)
+
+### utility functions #########################################################
+
+def make_batches(texts_, start_):
+
+    """ Yield (start, stop) row ranges that fit the request size and token budget. """
+
+    i = start_
+    n_tokens = [len(t) for t in encoding.encode_ordinary_batch(
+        [t if isinstance(t, str) else '' for t in texts_[start_:]])]
+
+    while i < len(texts_):
+
+        j, total = i, 0
+        while j < len(texts_) and (j - i) < batch_size:
+            row_tokens = min(n_tokens[j - start_], max_tokens)
+            if j > i and total + row_tokens > batch_tokens:
+                break
+            total += row_tokens
+            j += 1
+
+        yield i, j
+        i = j
 
 ### load data #################################################################
 
@@ -54,36 +85,74 @@ logger.info(f'Columns = {data.columns}')
 
 ### embed text ################################################################
 
-logger.info(f'Initializing embeddings for {N} rows ...')
+# append-only checkpoint: completed batches are never rewritten
+output_prefix = f'dat{os.sep}existing_policy_keyword_embed'
+checkpoint_fname = output_prefix + '.f32'
+n_done = embed_store.count_checkpoint_rows(checkpoint_fname, embedding_p)
+if n_done > N:
+    raise ValueError(f'{checkpoint_fname} has {n_done} rows, but {data_fname} has only {N}.')
+logger.info(f'Resuming after {n_done} completed rows.' if n_done else f'Initializing embeddings for {N} rows ...')
 
-embedding_names = ['dim_' + str(i) for i in range(0, embedding_p)]
+texts = data['Keywords'].tolist()
+batches = list(make_batches(texts, n_done))
 
-for i in tqdm(range(0, N)):
+def batch_rows(start_, stop_):
 
-    # for saving each iteration in case of API crash
-    output_fname = f'dat{os.sep}existing_policy_keyword_embed.csv'
-    if os.path.exists(output_fname):
-        data_ = pd.read_csv(output_fname, low_memory=True)
-    else:
-        data_ = data
+    """ Rows with keyword text; empty keyword strings get zero vectors. """
+
+    return [k for k in range(start_, stop_) if isinstance(texts[k], str) and texts[k] != '']
 
-    # extract text and embed
-    content = data_.loc[i, 'Keywords']
-    if content is not np.nan:
-        row_embedding = np.array(openai_client.gpt_embed(content)).reshape(1, embedding_p)
-        data_.loc[i, embedding_names] = row_embedding[0]
+def save_window(window_, window_vectors_, progress_):
+
+    """ Fill zero vectors for empty rows and append batches to the checkpoint in order. """
+
+    for (start_, stop_), vectors_ in zip(window_, window_vectors_):
+        batch_embeddings = np.zeros((stop_ - start_, embedding_p), dtype=np.float32)
+        rows = batch_rows(start_, stop_)
+        if rows:
+            batch_embeddings[[k - start_ for k in rows]] = vectors_
+        embed_store.append_checkpoint(checkpoint_fname, batch_embeddings)  # save each batch in case of API crash
+        progress_.update(stop_ - start_)
+
+async def embed_async(progress_):
+
+    """ Embed windows of batches concurrently under one shared rate limiter. """
+
+    limiter = async_client.RateLimiter()
+    for w in range(0, len(batches), window_size):
+        window = batches[w:w + window_size]
+        window_vectors = await async_client.embed_batches(
+            [[texts[k] for k in batch_rows(start_, stop_)] for start_, stop_ in window], limiter=limiter)
+        save_window(window, window_vectors, progress_)
+
+with track('embed'), tqdm(total=N, initial=n_done) as progress:
+
+    if config.EMBED_ASYNC:
+        logger.info(f'Embedding {len(batches)} batches with up to {config.OPENAI_MAX_CONCURRENCY} concurrent requests ...')
+        async_client.run(embed_async(progress))
     else:
-        data_.loc[i, embedding_names] = np.zeros((1, embedding_p))
+        for start, stop in batches:
+            rows = batch_rows(start, stop)
+            save_window([(start, stop)], [openai_client.gpt_embed_batch([texts[k] for k in rows])], progress)
+
+### save output ###############################################################
+
+data.to_csv(output_prefix + '_meta.csv', index=False)
+with track('finalize'):
+    embed_store.finalize_checkpoint(checkpoint_fname, output_prefix + '.npy', embedding_p)
+logger.info(f'Saved: {output_prefix}.npy and {output_prefix}_meta.csv.')
 
-    # for saving each iteration in case of API crash
-    data_.to_csv(output_fname, index=False)
+cache = openai_client.get_embedding_cache()
+if cache is not None:
+    cache.log_stats()
 
 ### verify putput ###########################################################
 
-logger.info(f'Correct data shape: {data_.shape == (N, 1539)}.')
+meta, X = embed_store.load_embeddings(output_prefix)
+logger.info(f'Correct data shape: {X.shape == (N, embedding_p)}.')
 
-no_empties = data_.isna().any().any()
-logger.info(f'Any empty data cells: {no_empties}.')
+no_empties = np.isnan(X).any()
+logger.info(f'Any empty embedding cells: {no_empties}.')
 
 # end timer
 toc = time.time() - tic
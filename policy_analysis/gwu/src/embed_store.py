@@ -0,0 +1,186 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+embed_store.py
+==============
+
+Binary storage for embedding matrices.
+
+Embeddings are kept as a ``float32`` ``.npy`` matrix next to a metadata CSV
+(``Type``, ``ID``, ``Text``, ``Keywords``) whose rows line up with the matrix
+rows. While :mod:`embed` is running, finished rows are appended to a raw
+``.f32`` checkpoint file; :func:`finalize_checkpoint` turns that into the
+``.npy`` file once all rows are present. Downstream stages call
+:func:`load_embeddings`, which memory-maps the matrix instead of parsing
+``dim_0 .. dim_1535`` text columns.
+
+Example
+-------
+
+.. code-block:: python
+
+    from embed_store import load_embeddings
+
+    meta, X = load_embeddings('dat/existing_policy_keyword_embed')
+    print(meta.shape, X.shape, X.dtype)  # X is a read-only np.memmap
+
+"""
+
+import os
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+DTYPE = np.float32
+
+__all__ = ['append_checkpoint', 'count_checkpoint_rows', 'finalize_checkpoint', 'load_embeddings']
+
+
+def count_checkpoint_rows(fname: str, p: int) -> int:
+
+    """
+    Count complete rows in a raw checkpoint, dropping any partially written tail.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the ``.f32`` checkpoint file.
+    p : int
+        Embedding dimension.
+
+    Returns
+    -------
+    int
+        Number of complete ``p``-dimensional rows in the file, ``0`` if the file
+        does not exist.
+    """
+
+    if not os.path.exists(fname):
+        return 0
+
+    row_bytes = p * np.dtype(DTYPE).itemsize
+    size = os.path.getsize(fname)
+    if size % row_bytes:
+        with open(fname, 'rb+') as f:
+            f.truncate(size - size % row_bytes)
+
+    return size // row_bytes
+
+
+def append_checkpoint(fname: str, X: np.ndarray) -> None:
+
+    """
+    Append rows to a raw checkpoint and flush them to disk.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the ``.f32`` checkpoint file.
+    X : numpy.ndarray
+        Matrix of shape ``(n, p)``; converted to ``float32``.
+    """
+
+    with open(fname, 'ab') as f:
+        f.write(np.ascontiguousarray(X, dtype=DTYPE).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def finalize_checkpoint(fname: str, npy_fname: str, p: int, *, block_rows: int = 65536) -> None:
+
+    """
+    Convert a complete raw checkpoint into a ``.npy`` file and remove it.
+
+    Rows are copied in blocks so peak memory stays bounded by ``block_rows``.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the ``.f32`` checkpoint file.
+    npy_fname : str
+        Destination ``.npy`` path.
+    p : int
+        Embedding dimension.
+    block_rows : int, optional
+        Number of rows copied per block. Defaults to ``65536``.
+    """
+
+    n = count_checkpoint_rows(fname, p)
+    src = np.memmap(fname, dtype=DTYPE, mode='r', shape=(n, p)) if n else np.zeros((0, p), dtype=DTYPE)
+    tmp_fname = npy_fname + '.tmp'
+    dst = np.lib.format.open_memmap(tmp_fname, mode='w+', dtype=DTYPE, shape=(n, p))
+
+    for i in range(0, n, block_rows):
+        dst[i:i + block_rows] = src[i:i + block_rows]
+
+    dst.flush()
+    del dst, src
+    os.replace(tmp_fname, npy_fname)
+    os.remove(fname)
+
+
+def load_embeddings(prefix: str, *, mmap_mode: str = 'r') -> Tuple[pd.DataFrame, np.ndarray]:
+
+    """
+    Load an embedding matrix and its metadata table.
+
+    Reads ``<prefix>_meta.csv`` and memory-maps ``<prefix>.npy``. For runs
+    produced before the binary format existed, falls back to ``<prefix>.csv``
+    with ``dim_*`` columns.
+
+    Parameters
+    ----------
+    prefix : str
+        Path prefix shared by the embedding files, for example
+        ``'dat/existing_policy_keyword_embed'``.
+    mmap_mode : str, optional
+        Passed to :func:`numpy.load`. Defaults to read-only ``'r'``.
+
+    Returns
+    -------
+    tuple of (pandas.DataFrame, numpy.ndarray)
+        Metadata table and the ``(N, p)`` embedding matrix.
+
+    Raises
+    ------
+    ValueError
+        If the metadata and matrix disagree on the number of rows.
+    """
+
+    npy_fname = prefix + '.npy'
+    meta_fname = prefix + '_meta.csv'
+
+    if os.path.exists(npy_fname):
+        meta = pd.read_csv(meta_fname)
+        X = np.load(npy_fname, mmap_mode=mmap_mode)
+    else:
+        legacy = pd.read_csv(prefix + '.csv')
+        dim_cols = [c for c in legacy.columns if c.startswith('dim_')]
+        X = legacy[dim_cols].to_numpy(dtype=DTYPE)
+        meta = legacy.drop(columns=dim_cols)
+
+    if meta.shape[0] != X.shape[0]:
+        raise ValueError(f'{prefix}: metadata has {meta.shape[0]} rows, embeddings have {X.shape[0]}.')
+
+    return meta, X
@@ -0,0 +1,208 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+extract.py
+==========
+
+Concurrent PDF text extraction through one or more Tika servers.
+
+:func:`extract_pdfs` fans files out over a thread pool (requests to Tika are
+I/O-bound), spreading them round-robin across the configured server
+endpoints. Every file gets its own timeout, a failure in one file never stops
+the others, and each file produces an :class:`ExtractResult` that can be
+summarized with :func:`summarize`.
+
+Example
+-------
+
+.. code-block:: python
+
+    from extract import extract_pdfs, summarize
+
+    for result in extract_pdfs(['dat/pdf/a.pdf', 'dat/pdf/b.pdf'], workers=4):
+        if result.ok:
+            print(result.path, len(result.text))
+
+    # summarize(results) -> {'files': 2, 'ok': 2, 'failed': 0, ...}
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+import tika
+from tika import parser
+
+import config
+
+tika.TikaClientOnly = True
+
+TIKA_SERVER_ENDPOINTS = config.TIKA_SERVER_ENDPOINTS
+PDF_WORKERS = config.PDF_WORKERS
+TIKA_TIMEOUT = config.TIKA_TIMEOUT
+
+__all__ = ['ExtractResult', 'extract_pdf', 'extract_pdfs', 'summarize']
+
+
+class ExtractResult(NamedTuple):
+
+    """
+    Outcome of extracting one PDF.
+
+    Attributes
+    ----------
+    path : str
+        Input PDF path.
+    text : str or None
+        Extracted text, ``None`` on failure.
+    error : str or None
+        Error description, ``None`` on success.
+    seconds : float
+        Wall-clock time spent on the file.
+    endpoint : str
+        Tika server that handled the file.
+    """
+
+    path: str
+    text: Optional[str]
+    error: Optional[str]
+    seconds: float
+    endpoint: str
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def extract_pdf(path: str, *, endpoint: str = TIKA_SERVER_ENDPOINTS[0],
+                timeout: float = TIKA_TIMEOUT) -> ExtractResult:
+
+    """
+    Extract the text of one PDF, capturing any error instead of raising it.
+
+    Parameters
+    ----------
+    path : str
+        PDF to parse.
+    endpoint : str, optional
+        Tika server URL. Defaults to the first of
+        :data:`config.TIKA_SERVER_ENDPOINTS`.
+    timeout : float, optional
+        Request timeout in seconds. Defaults to :data:`config.TIKA_TIMEOUT`.
+
+    Returns
+    -------
+    ExtractResult
+        The extracted text or the error that prevented extraction.
+    """
+
+    tic = time.time()
+
+    try:
+        contents = parser.from_file(path, serverEndpoint=endpoint, requestOptions={'timeout': timeout})
+        text = contents.get('content')
+        error = None if text else f'no text extracted (status {contents.get("status")})'
+    except Exception as err:
+        text, error = None, f'{type(err).__name__}: {err}'
+
+    return ExtractResult(path, text if error is None else None, error, time.time() - tic, endpoint)
+
+
+def extract_pdfs(paths: List[str], *, workers: int = PDF_WORKERS,
+                 endpoints: List[str] = TIKA_SERVER_ENDPOINTS,
+                 timeout: float = TIKA_TIMEOUT) -> Iterator[ExtractResult]:
+
+    """
+    Extract many PDFs concurrently.
+
+    Parameters
+    ----------
+    paths : list of str
+        PDFs to parse.
+    workers : int, optional
+        Size of the thread pool. Defaults to :data:`config.PDF_WORKERS`.
+    endpoints : list of str, optional
+        Tika server URLs; file ``i`` goes to ``endpoints[i % len(endpoints)]``.
+        Defaults to :data:`config.TIKA_SERVER_ENDPOINTS`.
+    timeout : float, optional
+        Per-file request timeout in seconds. Defaults to
+        :data:`config.TIKA_TIMEOUT`.
+
+    Yields
+    ------
+    ExtractResult
+        One result per input file, in completion order.
+    """
+
+    if not paths:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as pool:
+
+        futures = [pool.submit(extract_pdf, path, endpoint=endpoints[i % len(endpoints)], timeout=timeout)
+                   for i, path in enumerate(paths)]
+
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def summarize(results: List[ExtractResult], wall_seconds: Optional[float] = None) -> dict:
+
+    """
+    Summarize a batch of extraction results.
+
+    Parameters
+    ----------
+    results : list of ExtractResult
+        Results returned by :func:`extract_pdfs`.
+    wall_seconds : float, optional
+        Elapsed wall-clock time of the whole batch, used to report speed-up
+        over serial extraction.
+
+    Returns
+    -------
+    dict
+        ``files``, ``ok``, ``failed``, ``failed_paths``, ``file_seconds``
+        (sum of per-file times), ``slowest`` (path and seconds) and, when
+        ``wall_seconds`` is given, ``wall_seconds`` and ``speedup``.
+    """
+
+    failed = [r for r in results if not r.ok]
+    file_seconds = sum(r.seconds for r in results)
+    slowest = max(results, key=lambda r: r.seconds, default=None)
+
+    summary = {
+        'files': len(results),
+        'ok': len(results) - len(failed),
+        'failed': len(failed),
+        'failed_paths': [r.path for r in failed],
+        'file_seconds': round(file_seconds, 2),
+        'slowest': (slowest.path, round(slowest.seconds, 2)) if slowest else None,
+    }
+
+    if wall_seconds is not None:
+        summary['wall_seconds'] = round(wall_seconds, 2)
+        summary['speedup'] = round(file_seconds / wall_seconds, 2) if wall_seconds else None
+
+    return summary
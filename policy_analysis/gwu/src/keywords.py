@@ -0,0 +1,412 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+keywords.py
+===========
+
+Keyword vocabulary and tagging engine used by :mod:`apply_keywords`.
+
+:class:`KeywordTagger` prebuilds a set of single-word keywords and a table of
+multi-word keywords (phrases) keyed by their word count. Each text is split
+once; single words are found with a set intersection and phrases with one
+n-gram lookup per phrase length, so the cost per text does not grow with the
+number of keywords. Matches are returned in vocabulary order.
+
+:meth:`KeywordTagger.incidence` turns the matches into a SciPy CSR
+chunk × keyword incidence matrix whose columns follow
+:attr:`KeywordTagger.vocabulary`. :func:`save_incidence` and
+:func:`load_incidence` persist the matrix with its vocabulary, and
+:func:`keyword_counts`, :func:`cooccurrence` and :func:`group_counts` do the
+usual counting with sparse matrix products instead of string splitting.
+
+Example
+-------
+
+.. code-block:: python
+
+    from keywords import KEYWORD_LIST, KeywordTagger
+
+    tagger = KeywordTagger(KEYWORD_LIST + ['data protection'])
+    tagger.tag('faculty data protection policy')
+    # ['data', 'faculty', 'policy', 'protection', 'data protection']
+
+    X = tagger.incidence(tagger.tag_many(texts))  # len(texts) x len(tagger.vocabulary)
+    counts = group_counts(X, tagger.vocabulary, document_types)
+
+
+"""
+
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+__all__ = ['KEYWORD_LIST', 'KeywordTagger', 'save_incidence', 'load_incidence',
+           'keyword_counts', 'cooccurrence', 'group_counts']
+
+KEYWORD_LIST = [
+    'academic',
+    'acceptable',
+    'accessibility',
+    'activity',
+    'adapt',
+    'administrative',
+    'adobe',
+    'aggregate',
+    'applicable',
+    'approval',
+    'artificialintelligence',
+    'assignment',
+    'assistance',
+    'attendees',
+    'authorize',
+    'barrier',
+    'capability',
+    'chat',
+    'chatbots',
+    'chatgpt',
+    'class',
+    'classification',
+    'classroom',
+    'cloud',
+    'collaboration',
+    'communicate',
+    'companion',
+    'compliance',
+    'computer',
+    'consultation',
+    'context',
+    'control',
+    'create',
+    'custody',
+    'cybersecurity',
+    'data',
+    'device',
+    'digital',
+    'draft',
+    'electronic',
+    'employee',
+    'encryption',
+    'ethic',
+    'evaluate',
+    'evaluation',
+    'event',
+    'excellence',
+    'expectation',
+    'explore',
+    'facility',
+    'faculty',
+    'final',
+    'gai',
+    'gelmangwu',
+    'genai',
+    'generative',
+    'guidance',
+    'guide',
+    'guideline',
+    'gwid',
+    'gws',
+    'host',
+    'human',
+    'ias',
+    'idea',
+    'identity',
+    'install',
+    'instructors',
+    'integrity',
+    'intellectual',
+    'invite',
+    'it',
+    'ithelpgwu',
+    'knowledge',
+    'language',
+    'languagemodels',
+    'law',
+    'learn',
+    'legitimate',
+    'level',
+    'library',
+    'loss',
+    'measure',
+    'mobile',
+    'model',
+    'objective',
+    'office',
+    'output',
+    'owned',
+    'permitted',
+    'personal',
+    'phone',
+    'physical',
+    'pii',
+    'platform',
+    'policy',
+    'practice',
+    'prints',
+    'privacy',
+    'product',
+    'program',
+    'prompt',
+    'protect',
+    'protection',
+    'provost',
+    'public',
+    'quality',
+    'quiz',
+    'record',
+    'regulate',
+    'requirement',
+    'research',
+    'researcher',
+    'resource',
+    'restrict',
+    'review',
+    'risk',
+    'room',
+    'scan',
+    'school',
+    'secure',
+    'security',
+    'sensitivity',
+    'session',
+    'skill',
+    'software',
+    'step',
+    'strongly',
+    'student',
+    'style',
+    'success',
+    'system',
+    'teach',
+    'technology',
+    'telehealth',
+    'tls',
+    'tool',
+    'transmit',
+    'unacceptable',
+    'unauthorized',
+    'university',
+    'usiness',
+    'verify',
+    'violation',
+    'virtual',
+    'workshop',
+    'write',
+    'zoom'
+
+]
+
+
+class KeywordTagger:
+
+    """
+    Match a fixed keyword vocabulary against whitespace-tokenized text.
+
+    Parameters
+    ----------
+    keywords : iterable of str
+        Vocabulary. Entries containing spaces are matched as consecutive
+        words. Duplicates are ignored.
+    sep : str, optional
+        Token separator used to split texts. Defaults to a single space,
+        matching the lemmatized text format.
+
+    Attributes
+    ----------
+    vocabulary : list of str
+        Keywords in the order matches are reported.
+    """
+
+    def __init__(self, keywords: Iterable[str], *, sep: str = ' '):
+
+        self.vocabulary = list(dict.fromkeys(keywords))
+        self.sep = sep
+        self._rank = {kw: i for i, kw in enumerate(self.vocabulary)}
+        self._words = {kw for kw in self.vocabulary if ' ' not in kw}
+        self._phrases = {}  # phrase length -> {tuple of words: keyword}
+        for kw in self.vocabulary:
+            words = tuple(kw.split())
+            if len(words) > 1:
+                self._phrases.setdefault(len(words), {})[words] = kw
+
+    def tag(self, text: str) -> List[str]:
+
+        """
+        Return the keywords that occur in ``text``.
+
+        Parameters
+        ----------
+        text : str
+            Text to scan; non-strings are converted with :func:`str`.
+
+        Returns
+        -------
+        list of str
+            Distinct matching keywords, in vocabulary order.
+        """
+
+        tokens = str(text).split(self.sep)
+        found = self._words.intersection(tokens)
+
+        for n, phrases in self._phrases.items():
+            found.update(phrases[gram] for gram in zip(*(tokens[i:] for i in range(n))) if gram in phrases)
+
+        return sorted(found, key=self._rank.__getitem__)
+
+    def tag_many(self, texts: Iterable[str]) -> List[List[str]]:
+
+        """
+        Tag many texts.
+
+        Parameters
+        ----------
+        texts : iterable of str
+            Texts to scan.
+
+        Returns
+        -------
+        list of list of str
+            Matches for each text, see :meth:`tag`.
+        """
+
+        return [self.tag(text) for text in texts]
+
+    def incidence(self, row_keywords: Sequence[Sequence[str]]) -> sparse.csr_matrix:
+
+        """
+        Build a binary chunk × keyword incidence matrix.
+
+        Parameters
+        ----------
+        row_keywords : sequence of sequence of str
+            Matches per chunk, as returned by :meth:`tag_many`.
+
+        Returns
+        -------
+        scipy.sparse.csr_matrix
+            ``uint8`` matrix of shape ``(len(row_keywords), len(vocabulary))``
+            with a ``1`` where a keyword occurs in a chunk.
+        """
+
+        indptr = np.zeros(len(row_keywords) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(kws) for kws in row_keywords])
+        indices = np.fromiter((self._rank[kw] for kws in row_keywords for kw in kws),
+                              dtype=np.int32, count=int(indptr[-1]))
+        data = np.ones(len(indices), dtype=np.uint8)
+
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(row_keywords), len(self.vocabulary)))
+
+
+def save_incidence(prefix: str, matrix: sparse.csr_matrix, vocabulary: Sequence[str]) -> None:
+
+    """
+    Save an incidence matrix to ``<prefix>.npz`` and its vocabulary to ``<prefix>_vocab.txt``.
+
+    Parameters
+    ----------
+    prefix : str
+        Output path prefix.
+    matrix : scipy.sparse.csr_matrix
+        Chunk × keyword matrix.
+    vocabulary : sequence of str
+        Column labels, one per matrix column.
+    """
+
+    if matrix.shape[1] != len(vocabulary):
+        raise ValueError(f'matrix has {matrix.shape[1]} columns but vocabulary has {len(vocabulary)} entries.')
+
+    sparse.save_npz(prefix + '.npz', matrix.tocsr())
+    with open(prefix + '_vocab.txt', 'w', encoding='utf-8') as f:
+        f.write('\n'.join(vocabulary) + '\n')
+
+
+def load_incidence(prefix: str) -> Tuple[sparse.csr_matrix, List[str]]:
+
+    """
+    Load a matrix written by :func:`save_incidence`.
+
+    Parameters
+    ----------
+    prefix : str
+        Path prefix used when saving.
+
+    Returns
+    -------
+    tuple of (scipy.sparse.csr_matrix, list of str)
+        The incidence matrix and its column vocabulary.
+    """
+
+    matrix = sparse.load_npz(prefix + '.npz').tocsr()
+    with open(prefix + '_vocab.txt', 'r', encoding='utf-8') as f:
+        vocabulary = [line.rstrip('\n') for line in f if line.rstrip('\n')]
+
+    return matrix, vocabulary
+
+
+def keyword_counts(matrix: sparse.spmatrix, vocabulary: Sequence[str]) -> pd.Series:
+
+    """Number of chunks containing each keyword, indexed by keyword."""
+
+    return pd.Series(np.asarray(matrix.sum(axis=0)).ravel(), index=list(vocabulary), name='count')
+
+
+def cooccurrence(matrix: sparse.spmatrix, vocabulary: Sequence[str]) -> pd.DataFrame:
+
+    """Keyword × keyword counts of chunks containing both keywords; the diagonal holds :func:`keyword_counts`."""
+
+    m = matrix.astype(np.int64)
+
+    return pd.DataFrame((m.T @ m).toarray(), index=list(vocabulary), columns=list(vocabulary))
+
+
+def group_counts(matrix: sparse.spmatrix, vocabulary: Sequence[str], labels: Sequence) -> pd.DataFrame:
+
+    """
+    Count keyword occurrences per group of chunks with one sparse product.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse.spmatrix
+        Chunk × keyword incidence matrix.
+    vocabulary : sequence of str
+        Column labels of ``matrix``.
+    labels : sequence
+        Group label of each chunk, for example the document ``Type``.
+        Chunks with a missing label (``None`` or NaN) are not counted.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Group × keyword counts, groups in order of first appearance.
+    """
+
+    codes, groups = pd.factorize(pd.Series(labels), sort=False)
+    if matrix.shape[0] != len(codes):
+        raise ValueError(f'matrix has {matrix.shape[0]} rows but {len(codes)} labels were given.')
+
+    rows = np.flatnonzero(codes >= 0)  # factorize codes missing labels as -1
+    indicator = sparse.csr_matrix((np.ones(len(rows), dtype=np.int64), (codes[rows], rows)),
+                                  shape=(len(groups), len(codes)))
+
+    return pd.DataFrame((indicator @ matrix.astype(np.int64)).toarray(), index=groups, columns=list(vocabulary))
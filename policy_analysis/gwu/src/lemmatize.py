@@ -0,0 +1,74 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Python 3.10
+# (.venv) patrickh@patrickh-lambda-workstation:~/Workspace/gwsb_caio/policy_analysis/gwu$ 
+# /home/patrickh/Workspace/gwsb_caio/.venv/bin/python 
+# /home/patrickh/Workspace/gwsb_caio/policy_analysis/gwu/src/lemmatize.py
+
+### imports and configs #######################################################
+
+import config
+
+from logging_utils import get_logger, track
+logger = get_logger(__name__)
+
+from lemmatizer import lemmatize_texts
+import os
+import pandas as pd
+import time
+
+LEMMA_WORKERS = config.LEMMA_WORKERS
+LEMMA_MIN_FREQ = config.LEMMA_MIN_FREQ
+
+if __name__ == '__main__':  # worker processes re-import this script under spawn
+
+    tic = time.time()
+
+    ### load data #############################################################
+
+    chunks_fname = f'dat{os.sep}chunk{os.sep}existing_policy_combined.csv'
+    chunk_data = pd.read_csv(chunks_fname)
+    logger.info(f'Loaded: {chunks_fname} ({chunk_data.shape[0]} chunks).')
+
+    ### normalize chunk text ##################################################
+
+    logger.info(f'Lemmatizing with {LEMMA_WORKERS} workers (min. frequency {LEMMA_MIN_FREQ}) ...')
+
+    lemmas = chunk_data[['Type', 'ID']].copy()
+    with track('lemmatize'):
+        lemmas['Lemmas'] = lemmatize_texts(chunk_data['Text'])
+
+    n_empty = (lemmas['Lemmas'] == '').sum()
+    logger.info(f'{n_empty} chunks have no lemmas left; they will carry no keywords.')
+
+    ### save output data ######################################################
+
+    # keyed by Type and ID, so apply_keywords joins on the chunk keys, not on row order
+    lemmas_fname = f'dat{os.sep}existing_policy_lemmas.csv'
+    lemmas.to_csv(lemmas_fname, index=False)
+    logger.info(f'Saved: {lemmas_fname}.')
+
+    # end timer
+    toc = time.time() - tic
+    logger.info(f'All tasks performed in {toc:.2f} s.')
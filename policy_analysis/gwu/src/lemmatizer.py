@@ -0,0 +1,308 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+lemmatizer.py
+=============
+
+Chunk text normalization used by :mod:`lemmatize` before keyword tagging.
+
+Each chunk goes through the steps the keyword vocabulary in
+:data:`keywords.KEYWORD_LIST` was built on:
+
+1. lower-casing and regex clean-up: URLs are removed, e-mail addresses are
+   reduced to ``<user><domain>`` (``ithelp@gwu.edu`` -> ``ithelpgwu``) and
+   everything but letters becomes a space;
+2. entity joining: multi-word names in :data:`ENTITIES` become one token
+   (``artificial intelligence`` and ``ai`` -> ``artificialintelligence``);
+3. lemmatization with suffix rules (``policies`` -> ``policy``,
+   ``outlined`` -> ``outline``, ``exploring`` -> ``explore``). A candidate
+   base form of a past tense or gerund is only accepted when it occurs in the
+   corpus vocabulary or the keyword list; tokens that are keywords are never
+   changed;
+4. stopword removal and dropping tokens shorter than
+   :data:`config.LEMMA_MIN_LEN`;
+5. a corpus frequency filter dropping lemmas seen fewer than
+   :data:`config.LEMMA_MIN_FREQ` times.
+
+:func:`lemmatize_texts` runs steps 1-4 over a process pool. Every worker
+memoizes its token -> lemma lookups, so each distinct token is lemmatized
+once per worker.
+
+Example
+-------
+
+.. code-block:: python
+
+    from lemmatizer import lemmatize_texts, normalize
+
+    normalize('Students explored Artificial Intelligence policies.')
+    # 'student explore artificialintelligence policy'
+
+    lemmas = lemmatize_texts(chunks['Text'], workers=4)
+
+"""
+
+from collections import Counter
+from functools import lru_cache
+from multiprocessing import Pool
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+import config
+from keywords import KEYWORD_LIST
+
+LEMMA_MIN_LEN = config.LEMMA_MIN_LEN
+LEMMA_MIN_FREQ = config.LEMMA_MIN_FREQ
+LEMMA_WORKERS = config.LEMMA_WORKERS
+LEMMA_CACHE_SIZE = 1 << 16
+
+__all__ = ['ENTITIES', 'STOPWORDS', 'tokenize', 'Lemmatizer', 'normalize', 'lemmatize_texts']
+
+ENTITIES = {
+    'artificial intelligence': 'artificialintelligence',
+    'ai': 'artificialintelligence',
+    'gen ai': 'genai',
+    'chat gpt': 'chatgpt',
+    'chat bot': 'chatbot',
+    'chat bots': 'chatbots',
+    'language model': 'languagemodels',
+    'language models': 'languagemodels',
+    'machine learning': 'machinelearning',
+    'gw id': 'gwid',
+}
+
+STOPWORDS = frozenset(ENGLISH_STOP_WORDS)
+
+_URL = re.compile(r'(https?://|www\.)\S*', flags=re.I)
+_EMAIL = re.compile(r'([a-z0-9]+)[._%+-]*[a-z0-9._%+-]*@([a-z0-9]+)(\.[a-z0-9-]+)+', flags=re.I)
+_NON_LETTER = re.compile(r'[^a-z]+')
+
+# (suffix, replacements, plural): a plural falls back to its first candidate
+# even when no candidate is known; other suffixes are then left alone
+_RULES = (
+    ('ies', ('y',), True),
+    ('sses', ('ss',), True),
+    ('ches', ('ch', 'che'), True),
+    ('shes', ('sh', 'she'), True),
+    ('xes', ('x', 'xe'), True),
+    ('ss', (), False),
+    ('us', (), False),
+    ('is', (), False),
+    ('s', ('',), True),
+    ('ied', ('y',), False),
+    ('ed', ('', 'e'), False),
+    ('ing', ('', 'e'), False),
+)
+
+_ENTITY_TABLE: Dict[Tuple[str, ...], str] = {tuple(k.split()): v for k, v in ENTITIES.items()}
+_ENTITY_MAX = max(len(k) for k in _ENTITY_TABLE)
+
+
+def tokenize(text: str) -> List[str]:
+
+    """
+    Lower-case, clean and split ``text``, joining the entities of
+    :data:`ENTITIES` into single tokens (longest match first).
+    """
+
+    text = _URL.sub(' ', str(text).lower())
+    text = _EMAIL.sub(r' \1\2 ', text)
+    words = _NON_LETTER.sub(' ', text).split()
+
+    tokens, i = [], 0
+    while i < len(words):
+        for n in range(min(_ENTITY_MAX, len(words) - i), 0, -1):
+            joined = _ENTITY_TABLE.get(tuple(words[i:i + n]))
+            if joined is not None:
+                tokens.append(joined)
+                i += n
+                break
+        else:
+            tokens.append(words[i])
+            i += 1
+
+    return tokens
+
+
+class Lemmatizer:
+
+    """
+    Memoized suffix-rule lemmatizer with stopword and length filters.
+
+    Parameters
+    ----------
+    vocabulary : iterable of str, optional
+        Tokens seen in the corpus; a past tense or gerund is only reduced to a
+        base form found here or in ``protected``.
+    protected : iterable of str, optional
+        Tokens kept as they are, by default the keyword list, so keywords
+        such as ``attendees`` still match after lemmatization.
+    stopwords : iterable of str, optional
+        Tokens removed before and after lemmatization. Defaults to
+        :data:`STOPWORDS`.
+    min_len : int, optional
+        Shorter lemmas are removed. Defaults to :data:`config.LEMMA_MIN_LEN`.
+    """
+
+    def __init__(self, vocabulary: Iterable[str] = (), *, protected: Iterable[str] = KEYWORD_LIST,
+                 stopwords: Iterable[str] = STOPWORDS, min_len: int = LEMMA_MIN_LEN):
+
+        self.protected = frozenset(protected)
+        self.known = frozenset(vocabulary) | self.protected
+        self.stopwords = frozenset(stopwords)
+        self.min_len = min_len
+        self.lemma = lru_cache(maxsize=LEMMA_CACHE_SIZE)(self._lemma)
+
+    def _lemma(self, token: str) -> str:
+
+        if token in self.protected or len(token) <= 3:
+            return token
+
+        for suffix, replacements, plural in _RULES:
+
+            if not token.endswith(suffix) or len(token) - len(suffix) < 2:
+                continue
+
+            stem = token[:-len(suffix)]
+            candidates = [stem + r for r in replacements]
+            if suffix in ('ed', 'ing') and stem[-1] == stem[-2] and stem[-1] not in 'lsz':
+                candidates.append(stem[:-1])  # planned -> plan
+
+            for candidate in candidates:
+                if candidate in self.known:
+                    return candidate
+
+            return candidates[0] if plural and candidates else token
+
+        return token
+
+    def __call__(self, tokens: Iterable[str]) -> List[str]:
+
+        """Lemmatize ``tokens`` and drop stopwords and short lemmas."""
+
+        out = []
+        for token in tokens:
+            if token in self.stopwords:
+                continue
+            lemma = self.lemma(token)
+            if lemma in self.protected or (len(lemma) >= self.min_len and lemma not in self.stopwords):
+                out.append(lemma)
+
+        return out
+
+
+_default: Optional[Lemmatizer] = None
+
+
+def normalize(text: str, lemmatizer: Optional[Lemmatizer] = None) -> str:
+
+    """
+    Normalize one text without a corpus vocabulary or frequency filter, for
+    example a record in :mod:`stream`.
+
+    Parameters
+    ----------
+    text : str
+        Chunk text.
+    lemmatizer : Lemmatizer, optional
+        Defaults to a shared :class:`Lemmatizer` built on the keyword list.
+
+    Returns
+    -------
+    str
+        Space-separated lemmas.
+    """
+
+    global _default
+
+    if lemmatizer is None:
+        if _default is None:
+            _default = Lemmatizer()
+        lemmatizer = _default
+
+    return ' '.join(lemmatizer(tokenize(text)))
+
+
+# per-worker state of lemmatize_texts
+_worker: Optional[Lemmatizer] = None
+
+
+def _init_worker(vocabulary: Sequence[str], kwargs: dict) -> None:
+
+    global _worker
+    _worker = Lemmatizer(vocabulary, **kwargs)
+
+
+def _lemmatize_tokens(tokens: List[str]) -> List[str]:
+
+    return _worker(tokens)
+
+
+def lemmatize_texts(texts: Iterable[str], *, workers: int = LEMMA_WORKERS, min_freq: int = LEMMA_MIN_FREQ,
+                    chunksize: int = 64, **kwargs) -> List[str]:
+
+    """
+    Normalize many chunk texts.
+
+    Texts are tokenized, the corpus vocabulary is collected, and lemmatization
+    runs over a pool of ``workers`` processes, each holding one memoized
+    :class:`Lemmatizer`. Lemmas seen fewer than ``min_freq`` times in the
+    whole corpus are then dropped.
+
+    Parameters
+    ----------
+    texts : iterable of str
+        Chunk texts; missing values are treated as empty.
+    workers : int, optional
+        Worker processes; ``1`` runs in the calling process. Defaults to
+        :data:`config.LEMMA_WORKERS`.
+    min_freq : int, optional
+        Corpus frequency filter. Defaults to :data:`config.LEMMA_MIN_FREQ`.
+    chunksize : int, optional
+        Texts sent to a worker at a time.
+    **kwargs
+        Passed to :class:`Lemmatizer`.
+
+    Returns
+    -------
+    list of str
+        Space-separated lemmas, aligned with ``texts``.
+    """
+
+    tokens = [tokenize(t) if isinstance(t, str) else [] for t in texts]
+    vocabulary = sorted({t for row in tokens for t in row})
+
+    if workers > 1 and len(tokens) > chunksize:
+        with Pool(processes=workers, initializer=_init_worker, initargs=(vocabulary, kwargs)) as pool:
+            lemmas = pool.map(_lemmatize_tokens, tokens, chunksize=chunksize)
+    else:
+        lemmatizer = Lemmatizer(vocabulary, **kwargs)
+        lemmas = [lemmatizer(row) for row in tokens]
+
+    if min_freq > 1:
+        counts = Counter(lemma for row in lemmas for lemma in row)
+        lemmas = [[lemma for lemma in row if counts[lemma] >= min_freq] for row in lemmas]
+
+    return [' '.join(row) for row in lemmas]
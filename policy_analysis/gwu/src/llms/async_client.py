@@ -0,0 +1,322 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+hr_rag.llms.async_client module
+===============================
+
+Concurrent embeddings and chat completions on :class:`openai.AsyncOpenAI`.
+
+Requests are scheduled by a :class:`RateLimiter`, which holds one token
+bucket for requests per minute and one for tokens per minute, and by a
+semaphore that bounds the number of requests in flight. Failed requests are
+retried by :func:`hr_rag.llms.openai_client.retry_with_exponential_backoff`;
+its circuit breaker is shared with the synchronous client, and a task waiting
+on it does not hold a semaphore slot. Results are always
+returned in input order, so callers can treat :func:`embed_batches` and
+:func:`complete_many` as drop-in, faster versions of looping over
+:func:`hr_rag.llms.openai_client.gpt_embed_batch` and
+:func:`hr_rag.llms.openai_client.gpt_complete`.
+
+Embeddings and completions go through the same persistent caches as the
+synchronous client, see :func:`hr_rag.llms.openai_client.get_embedding_cache`
+and :func:`hr_rag.llms.openai_client.get_completion_cache`.
+
+Setting ``OPENAI_BASE_URL`` (see :data:`config.OPENAI_BASE_URL`) points the
+client at a local mock server for testing.
+
+Example
+-------
+
+.. code-block:: python
+
+    from llms import async_client
+
+    vectors = async_client.run(async_client.embed_batches([['a', 'b'], ['c']]))
+    # [[vec_a, vec_b], [vec_c]]
+
+    responses = async_client.run(async_client.complete_many(['Summarize ...', 'List ...']))
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, List, Optional, Sequence
+
+import openai
+import tiktoken
+
+import config
+from llms import openai_client
+from logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+API_KEY = config.API_KEY
+OPENAI_API_TIMEOUT = config.OPENAI_API_TIMEOUT
+OPENAI_BASE_URL = config.OPENAI_BASE_URL
+OPENAI_RPM = config.OPENAI_RPM
+OPENAI_TPM = config.OPENAI_TPM
+OPENAI_MAX_CONCURRENCY = config.OPENAI_MAX_CONCURRENCY
+EMBEDDING_MODEL = config.EMBEDDING_MODEL
+
+__all__ = ['TokenBucket', 'RateLimiter', 'embed_batches', 'complete_many', 'run']
+
+
+class TokenBucket:
+
+    """
+    Asynchronous token bucket refilled continuously at ``per_minute / 60`` per second.
+
+    Parameters
+    ----------
+    per_minute : float
+        Sustained budget per minute.
+    capacity : float, optional
+        Largest burst; defaults to one minute of budget.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+
+        """
+        Wait until ``amount`` units are available and take them.
+
+        Requests larger than the bucket are clamped to its capacity, so they
+        wait for a full bucket rather than forever. Waiters are served in
+        arrival order.
+        """
+
+        amount = min(amount, self.capacity)
+
+        async with self._lock:
+            self._refill()
+            while self.level < amount:
+                await asyncio.sleep((amount - self.level) / self.rate)
+                self._refill()
+            self.level -= amount
+
+
+class RateLimiter:
+
+    """
+    Requests-per-minute and tokens-per-minute limits applied together.
+
+    Parameters
+    ----------
+    rpm : float, optional
+        Requests per minute. Defaults to :data:`config.OPENAI_RPM`.
+    tpm : float, optional
+        Tokens per minute. Defaults to :data:`config.OPENAI_TPM`.
+    """
+
+    def __init__(self, rpm: float = OPENAI_RPM, tpm: float = OPENAI_TPM):
+
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    async def acquire(self, tokens: int) -> None:
+
+        """Wait for one request slot and ``tokens`` tokens."""
+
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+
+retry = openai_client.retry_with_exponential_backoff(logger=logger)
+
+
+def _new_client() -> openai.AsyncOpenAI:
+
+    return openai.AsyncOpenAI(api_key=API_KEY, timeout=OPENAI_API_TIMEOUT, base_url=OPENAI_BASE_URL,
+                              max_retries=0)
+
+
+async def embed_batches(batches: Sequence[Sequence[str]], *,
+                        limiter: Optional[RateLimiter] = None,
+                        concurrency: int = OPENAI_MAX_CONCURRENCY) -> List[List[List[float]]]:
+
+    """
+    Embed many batches of texts concurrently.
+
+    Parameters
+    ----------
+    batches : sequence of sequence of str
+        Each inner sequence is sent as one embeddings request and must respect
+        the API's per-request limits, see :data:`config.EMBED_BATCH_SIZE`.
+    limiter : RateLimiter, optional
+        Shared rate limiter; a new one with the configured limits is used if
+        omitted.
+    concurrency : int, optional
+        Maximum requests in flight. Defaults to
+        :data:`config.OPENAI_MAX_CONCURRENCY`.
+
+    Returns
+    -------
+    list of list of list of float
+        Embedding vectors per batch, aligned with ``batches``.
+    """
+
+    limiter = limiter or RateLimiter()
+    semaphore = asyncio.Semaphore(concurrency)
+    encoding = tiktoken.encoding_for_model(EMBEDDING_MODEL)
+    cache = openai_client.get_embedding_cache()
+
+    async with _new_client() as client:
+
+        async def one(texts: Sequence[str]) -> List[List[float]]:
+
+            found = cache.get_many(EMBEDDING_MODEL, texts) if cache is not None else {}
+            missing = list(dict.fromkeys(t for t in texts if t not in found))
+
+            if missing:
+                n_tokens = sum(len(ids) for ids in encoding.encode_ordinary_batch(missing))
+
+                @retry
+                async def send():
+                    async with semaphore:
+                        await limiter.acquire(n_tokens)
+                        return await client.embeddings.create(input=missing, model=EMBEDDING_MODEL)
+
+                response = await send()
+                openai_client.count_usage(response)
+                fresh = {t: d.embedding for t, d in zip(missing, sorted(response.data, key=lambda d: d.index))}
+                if cache is not None:
+                    cache.put_many(EMBEDDING_MODEL, fresh)
+                found.update(fresh)
+
+            return [found[t] for t in texts]
+
+        return list(await asyncio.gather(*(one(texts) for texts in batches)))
+
+
+async def complete_many(prompts: Sequence[str], lm_params_: Optional[dict] = None, *,
+                        limiter: Optional[RateLimiter] = None,
+                        concurrency: int = OPENAI_MAX_CONCURRENCY) -> List[Any]:
+
+    """
+    Run chat completions for many prompts concurrently.
+
+    Parameters
+    ----------
+    prompts : sequence of str
+        User prompts, each inserted into a copy of the parameter template by
+        :func:`hr_rag.llms.openai_client.completion_params`.
+    lm_params_ : dict, optional
+        Parameter template; defaults to
+        :data:`hr_rag.llms.openai_client.lm_params`.
+    limiter : RateLimiter, optional
+        Shared rate limiter; a new one with the configured limits is used if
+        omitted.
+    concurrency : int, optional
+        Maximum requests in flight. Defaults to
+        :data:`config.OPENAI_MAX_CONCURRENCY`.
+
+    Returns
+    -------
+    list
+        Chat completion responses aligned with ``prompts``.
+    """
+
+    template = openai_client.lm_params if lm_params_ is None else lm_params_
+    limiter = limiter or RateLimiter()
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        encoding = tiktoken.encoding_for_model(template['model'])
+    except KeyError:
+        encoding = tiktoken.get_encoding('o200k_base')
+
+    async with _new_client() as client:
+
+        async def one(prompt: str) -> Any:
+
+            params = openai_client.completion_params(prompt, template)
+            key, response = openai_client.cached_completion(params)
+            if response is not None:
+                return response
+
+            n_tokens = sum(len(encoding.encode_ordinary(str(m['content']))) for m in params['messages'])
+            n_tokens += params.get('max_tokens') or 0
+
+            @retry
+            async def send():
+                async with semaphore:
+                    await limiter.acquire(n_tokens)
+                    return await client.chat.completions.create(**params)
+
+            response = await send()
+            openai_client.count_usage(response)
+            openai_client.store_completion(key, response)
+
+            return response
+
+        return list(await asyncio.gather(*(one(prompt) for prompt in prompts)))
+
+
+def run(coro):
+
+    """
+    Run a coroutine from synchronous code, for example a pipeline script.
+
+    Code that already runs inside an event loop (a Jupyter notebook, an async
+    application) must ``await`` :func:`embed_batches` or
+    :func:`complete_many` directly instead.
+
+    Parameters
+    ----------
+    coro : coroutine
+        Typically :func:`embed_batches` or :func:`complete_many`.
+
+    Returns
+    -------
+    Any
+        The coroutine's result.
+
+    Raises
+    ------
+    RuntimeError
+        If called while an event loop is running in this thread.
+    """
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    coro.close()  # never awaited; avoids a "coroutine was never awaited" warning
+    raise RuntimeError('async_client.run() cannot be used inside a running event loop; '
+                       'await embed_batches() or complete_many() directly instead.')
@@ -0,0 +1,506 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+hr_rag.llms.cache module
+========================
+
+Persistent, content-addressed caches for OpenAI API results.
+
+:class:`EmbeddingCache` stores embedding vectors in a single SQLite file keyed
+by the embedding model name and the SHA-256 hash of the input text, so
+re-running :mod:`embed` only pays for text that has not been embedded before.
+Vectors are stored as ``float32`` blobs. When the stored vectors exceed a size
+limit, the least recently used entries are evicted.
+
+:class:`CompletionCache` stores chat completion responses keyed by a canonical
+hash of the full request parameters (model, messages, seed, temperature,
+penalties, ...). Entries expire after a time-to-live, the least recently used
+ones are evicted beyond a size limit, and a read-only *replay* mode serves
+offline test runs without ever calling the API.
+
+Example
+-------
+
+.. code-block:: python
+
+    from llms.cache import EmbeddingCache
+
+    cache = EmbeddingCache('dat/cache/embeddings.sqlite')
+    found = cache.get_many('text-embedding-ada-002', ['policy', 'privacy'])
+    cache.put_many('text-embedding-ada-002', {'policy': [0.1, 0.2]})
+    print(cache.stats())
+
+    completions = CompletionCache('dat/cache/completions.sqlite', ttl=86400)
+    key = request_key(params)
+    if (cached := completions.get(key)) is None:
+        completions.put(key, response_json)
+
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from logging_utils import counters, get_logger
+
+logger = get_logger(__name__)
+
+__all__ = ['EmbeddingCache', 'CompletionCache', 'CacheMissError', 'text_hash', 'request_key']
+
+
+def text_hash(text: str) -> str:
+
+    """Return the hex SHA-256 digest of ``text`` encoded as UTF-8."""
+
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def request_key(params: Dict[str, Any]) -> str:
+
+    """
+    Canonical hash of request parameters.
+
+    Keys are sorted and whitespace is normalized before hashing, so
+    equivalent parameter dictionaries always produce the same key.
+
+    Parameters
+    ----------
+    params : dict
+        JSON-serializable request parameters.
+
+    Returns
+    -------
+    str
+        Hex SHA-256 digest.
+    """
+
+    canonical = json.dumps(params, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+
+    return text_hash(canonical)
+
+
+class CacheMissError(LookupError):
+
+    """Raised by a cache in replay mode when a request has no stored response."""
+
+
+class EmbeddingCache:
+
+    """
+    SQLite-backed embedding cache keyed by ``(model, sha256(text))``.
+
+    Parameters
+    ----------
+    path : str
+        Location of the SQLite database file. Parent directories are created
+        if needed.
+    max_bytes : int, optional
+        Upper bound on the total size of stored vectors. When exceeded, the
+        least recently used entries are evicted. ``None`` disables eviction.
+
+    Attributes
+    ----------
+    hits : int
+        Number of lookups answered from the cache since construction.
+    misses : int
+        Number of lookups not found in the cache since construction.
+    evictions : int
+        Number of entries evicted since construction.
+    """
+
+    def __init__(self, path: str, *, max_bytes: Optional[int] = None):
+
+        dir_name = os.path.dirname(path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS embeddings ('
+            'model TEXT NOT NULL, '
+            'hash TEXT NOT NULL, '
+            'vector BLOB NOT NULL, '
+            'nbytes INTEGER NOT NULL, '
+            'last_access REAL NOT NULL, '
+            'PRIMARY KEY (model, hash))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_access)')
+        self._conn.commit()
+        self._size = self._conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM embeddings').fetchone()[0]
+
+    def get_many(self, model: str, texts: Iterable[str]) -> Dict[str, List[float]]:
+
+        """
+        Look up cached vectors for ``texts``.
+
+        Parameters
+        ----------
+        model : str
+            Embedding model name the vectors were produced with.
+        texts : iterable of str
+            Input strings. Duplicates are looked up once.
+
+        Returns
+        -------
+        dict
+            Mapping from each cached input string to its embedding vector.
+            Strings absent from the cache are omitted.
+        """
+
+        by_hash = {text_hash(t): t for t in texts}
+        found = {}
+        hashes = list(by_hash)
+
+        with self._lock:
+
+            for i in range(0, len(hashes), 500):  # stay under SQLite's host parameter limit
+                part = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f'SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({",".join("?" * len(part))})',
+                    [model, *part],
+                ).fetchall()
+                for h, blob in rows:
+                    found[by_hash[h]] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    'UPDATE embeddings SET last_access = ? WHERE model = ? AND hash = ?',
+                    [(now, model, text_hash(t)) for t in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(by_hash) - len(found)
+            counters.incr('embed_cache_hits', len(found))
+            counters.incr('embed_cache_misses', len(by_hash) - len(found))
+
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+
+        """
+        Store embedding vectors and evict old entries if over the size limit.
+
+        Parameters
+        ----------
+        model : str
+            Embedding model name the vectors were produced with.
+        vectors : dict
+            Mapping from input string to embedding vector.
+        """
+
+        if not vectors:
+            return
+
+        now = time.time()
+        rows = []
+        for text, vector in vectors.items():
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((model, text_hash(text), blob, len(blob), now))
+
+        with self._lock:
+
+            for model_, h, _, nbytes, _ in rows:
+                old = self._conn.execute(
+                    'SELECT nbytes FROM embeddings WHERE model = ? AND hash = ?', (model_, h)
+                ).fetchone()
+                self._size += nbytes - (old[0] if old else 0)
+
+            self._conn.executemany('INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)', rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+
+        """Delete least recently used entries until the size limit holds."""
+
+        if self.max_bytes is None or self._size <= self.max_bytes:
+            return
+
+        cursor = self._conn.execute(
+            'SELECT model, hash, nbytes FROM embeddings ORDER BY last_access ASC'
+        )
+        doomed = []
+        for model, h, nbytes in cursor:
+            if self._size <= self.max_bytes:
+                break
+            doomed.append((model, h))
+            self._size -= nbytes
+
+        self._conn.executemany('DELETE FROM embeddings WHERE model = ? AND hash = ?', doomed)
+        self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, float]:
+
+        """
+        Summarize cache usage.
+
+        Returns
+        -------
+        dict
+            ``hits``, ``misses``, ``hit_rate``, ``evictions``, ``entries`` and
+            ``bytes`` (total size of stored vectors).
+        """
+
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+        lookups = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': self._size,
+        }
+
+    def log_stats(self) -> None:
+
+        """Log :meth:`stats` at ``INFO`` level."""
+
+        logger.info(f'Embedding cache: {self.stats()}.')
+
+    def close(self) -> None:
+
+        """Close the underlying database connection."""
+
+        with self._lock:
+            self._conn.close()
+
+
+class CompletionCache:
+
+    """
+    SQLite-backed cache of chat completion responses keyed by :func:`request_key`.
+
+    Parameters
+    ----------
+    path : str
+        Location of the SQLite database file. Parent directories are created
+        if needed.
+    ttl : float, optional
+        Seconds after which an entry is treated as missing and deleted.
+        ``None`` disables expiry.
+    max_bytes : int, optional
+        Upper bound on the total size of stored responses; least recently used
+        entries are evicted beyond it. ``None`` disables eviction.
+    replay : bool, optional
+        Read-only replay mode: nothing is written, expiry is ignored, and
+        :meth:`get` raises :class:`CacheMissError` for unknown requests, so
+        offline runs fail loudly instead of calling the API.
+
+    Attributes
+    ----------
+    hits, misses, expired, evictions : int
+        Counters since construction.
+    """
+
+    def __init__(self, path: str, *, ttl: Optional[float] = None, max_bytes: Optional[int] = None,
+                 replay: bool = False):
+
+        if not replay:
+            dir_name = os.path.dirname(path)
+            if dir_name:
+                os.makedirs(dir_name, exist_ok=True)
+        elif not os.path.exists(path):
+            raise FileNotFoundError(f'Replay mode needs an existing completion cache at {path}.')
+
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        uri = f'file:{path}?mode=ro' if replay else f'file:{path}'
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        if not replay:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS completions ('
+                'key TEXT PRIMARY KEY, '
+                'response TEXT NOT NULL, '
+                'nbytes INTEGER NOT NULL, '
+                'created REAL NOT NULL, '
+                'last_access REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS completions_lru ON completions (last_access)')
+            self._conn.commit()
+        self._size = self._conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM completions').fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+
+        """
+        Return the stored response JSON for ``key``.
+
+        Parameters
+        ----------
+        key : str
+            Request key from :func:`request_key`.
+
+        Returns
+        -------
+        str or None
+            The response serialized as JSON, or ``None`` on a miss.
+
+        Raises
+        ------
+        CacheMissError
+            On a miss in replay mode.
+        """
+
+        now = time.time()
+
+        with self._lock:
+
+            row = self._conn.execute(
+                'SELECT response, nbytes, created FROM completions WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is not None and not self.replay and self.ttl is not None and now - row[2] > self.ttl:
+                self._conn.execute('DELETE FROM completions WHERE key = ?', (key,))
+                self._conn.commit()
+                self._size -= row[1]
+                self.expired += 1
+                row = None
+
+            if row is None:
+                self.misses += 1
+                counters.incr('completion_cache_misses')
+                if self.replay:
+                    raise CacheMissError(f'No cached completion for request {key} in {self.path}.')
+                return None
+
+            self.hits += 1
+            counters.incr('completion_cache_hits')
+            if not self.replay:
+                self._conn.execute('UPDATE completions SET last_access = ? WHERE key = ?', (now, key))
+                self._conn.commit()
+
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+
+        """
+        Store a response; a no-op in replay mode.
+
+        Parameters
+        ----------
+        key : str
+            Request key from :func:`request_key`.
+        response : str
+            The response serialized as JSON.
+        """
+
+        if self.replay:
+            return
+
+        now = time.time()
+        nbytes = len(response.encode('utf-8'))
+
+        with self._lock:
+            old = self._conn.execute('SELECT nbytes FROM completions WHERE key = ?', (key,)).fetchone()
+            self._size += nbytes - (old[0] if old else 0)
+            self._conn.execute('INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)',
+                               (key, response, nbytes, now, now))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+
+        """Delete least recently used entries until the size limit holds."""
+
+        if self.max_bytes is None or self._size <= self.max_bytes:
+            return
+
+        doomed = []
+        for key, nbytes in self._conn.execute('SELECT key, nbytes FROM completions ORDER BY last_access ASC'):
+            if self._size <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self._size -= nbytes
+
+        self._conn.executemany('DELETE FROM completions WHERE key = ?', doomed)
+        self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, float]:
+
+        """
+        Summarize cache usage.
+
+        Returns
+        -------
+        dict
+            ``hits``, ``misses``, ``hit_rate``, ``expired``, ``evictions``,
+            ``entries`` and ``bytes``.
+        """
+
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM completions').fetchone()[0]
+
+        lookups = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'expired': self.expired,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': self._size,
+        }
+
+    def log_stats(self) -> None:
+
+        """Log :meth:`stats` at ``INFO`` level."""
+
+        logger.info(f'Completion cache ({"replay" if self.replay else "read/write"}): {self.stats()}.')
+
+    def close(self) -> None:
+
+        """Close the underlying database connection."""
+
+        with self._lock:
+            self._conn.close()
@@ -29,8 +29,24 @@ but targets self-hosted Hugging Face chat models. The exported helpers are:
 ``build_pipeline``
     Lazily import :mod:`torch` / :mod:`transformers`, load the tokenizer and
     model, and construct a text-generation pipeline with sensible defaults.
+``get_pipeline``
+    Return a pipeline from the process-wide model registry, building it on
+    first use. At most :data:`config.LOCAL_MAX_MODELS` models stay loaded;
+    the least recently used one is unloaded to make room.
 ``danube_complete``
     Apply a Danube-style chat template to the provided prompt.
+``danube_complete_batch``
+    Complete many prompts, padded and batched through the pipeline. Prompts
+    are grouped by length so each batch carries little padding.
+``metrics``
+    Throughput and latency of every local generation in the process.
+``benchmark``
+    Compare tokens per second of the inference profiles on the same prompts.
+
+Two inference profiles are available, selected by :data:`config.LOCAL_PROFILE`:
+``'bf16'`` (BF16 weights, automatic device placement) and ``'cpu'`` (float32
+weights with dynamically int8-quantized ``Linear`` layers and
+:data:`config.LOCAL_NUM_THREADS` torch threads) for CPU-only batch nodes.
 
 Example
 -------
@@ -38,30 +54,50 @@ Example
 .. code-block:: python
 
     result = local_client_module.danube_complete('hello world')
-    cut_idx = result[0]['generated_text'].find('<|answer|>')
-    answer = result[0]['generated_text'][cut_idx + 10:]
+    cut_idx = result.find('<|answer|>')
+    answer = result[cut_idx + 10:]
+
+    results = local_client_module.danube_complete_batch(['hello', 'world'], batch_size=8)
+    local_client_module.metrics.log_stats()
 
 """
 
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from collections import OrderedDict
+import copy
+import gc
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+import weakref
 
-from hr_rag import config
+import config
+from logging_utils import get_logger
 
 FALLBACK_MODEL = config.FALLBACK_MODEL
 CLIENT_NAME = config.CLIENT_NAME
+LOCAL_MAX_MODELS = config.LOCAL_MAX_MODELS
+LOCAL_BATCH_SIZE = config.LOCAL_BATCH_SIZE
+LOCAL_PROFILE = config.LOCAL_PROFILE
+LOCAL_NUM_THREADS = config.LOCAL_NUM_THREADS
+LOCAL_PREFIX_CACHE = config.LOCAL_PREFIX_CACHE
+
+PROFILES = ('bf16', 'cpu')
+
+logger = get_logger(__name__)
 
 torch = None
 transformers = None
 AutoModelForCausalLM = None
 AutoTokenizer = None
 
-__all__ = ['build_pipeline', 'danube_complete']
+__all__ = ['build_pipeline', 'get_pipeline', 'clear_pipelines', 'danube_complete',
+           'danube_complete_batch', 'GenerationMetrics', 'metrics', 'benchmark', 'PROFILES']
 
 
 def _require_dependencies() -> None:
-
     """Import torch/transformers on demand to keep pytest noise low."""
 
     global torch, transformers, AutoModelForCausalLM, AutoTokenizer
@@ -86,7 +122,7 @@ def _require_dependencies() -> None:
     AutoTokenizer = autotokenizer_cls
 
 
-def build_pipeline(model: str = FALLBACK_MODEL):
+def build_pipeline(model: str = FALLBACK_MODEL, profile: str = LOCAL_PROFILE):
 
     """
     Construct a Hugging Face text-generation pipeline.
@@ -97,14 +133,22 @@ def build_pipeline(model: str = FALLBACK_MODEL):
         Repository identifier passed directly to
         :func:`transformers.AutoModelForCausalLM.from_pretrained`. Defaults to
         :data:`hr_rag.config.FALLBACK_MODEL`.
+    profile:
+        ``'bf16'`` for BF16 precision with automatic device placement, or
+        ``'cpu'`` for CPU-only nodes: float32 weights whose ``Linear`` layers
+        are quantized to int8 with :func:`torch.ao.quantization.quantize_dynamic`,
+        run on :data:`config.LOCAL_NUM_THREADS` threads. Defaults to
+        :data:`config.LOCAL_PROFILE`.
 
     Returns
     -------
     ``transformers.Pipeline``
-        A text-generation pipeline configured with BF16 precision and automatic
-        device placement.
+        A text-generation pipeline configured for ``profile``.
     """
 
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown local inference profile {profile!r}; expected one of {PROFILES}.')
+
     _require_dependencies()
 
     hf_tokenizer = AutoTokenizer.from_pretrained(
@@ -118,6 +162,23 @@ def build_pipeline(model: str = FALLBACK_MODEL):
         trust_remote_code=True,
     )
 
+    if profile == 'cpu':
+
+        torch.set_num_threads(LOCAL_NUM_THREADS)
+        hf_model = torch.ao.quantization.quantize_dynamic(
+            hf_model.float().eval(),
+            {torch.nn.Linear},
+            dtype=torch.qint8,
+        )
+
+        return transformers.pipeline(
+            'text-generation',
+            tokenizer=hf_tokenizer,
+            model=hf_model,
+            device='cpu',
+            trust_remote_code=False,
+        )
+
     return transformers.pipeline(
         'text-generation',
         tokenizer=hf_tokenizer,
@@ -128,6 +189,250 @@ def build_pipeline(model: str = FALLBACK_MODEL):
     )
 
 
+"""
+Model registry
+~~~~~~~~~~~~~~
+
+Pipelines built by :func:`get_pipeline`, keyed by model name and profile,
+in least to most recently used order. Guarded by a lock so threads share one
+copy of each model. The system-prompt KV caches of each pipeline are held
+alongside it and dropped with it.
+"""
+
+_pipelines: 'OrderedDict[tuple[str, str], Any]' = OrderedDict()
+_pipelines_lock = threading.Lock()
+_prefix_caches: 'weakref.WeakKeyDictionary[Any, Dict[str, Any]]' = weakref.WeakKeyDictionary()
+
+
+def get_pipeline(model: str = FALLBACK_MODEL, *, profile: str = LOCAL_PROFILE,
+                 max_models: int = LOCAL_MAX_MODELS):
+
+    """
+    Return the shared text-generation pipeline for ``model``.
+
+    The pipeline is built by :func:`build_pipeline` the first time it is
+    requested and reused afterwards, so the tokenizer and weights are loaded
+    once per process. When more than ``max_models`` models are loaded, the
+    least recently used ones are unloaded.
+
+    Parameters
+    ----------
+    model : str, optional
+        Hugging Face repository identifier. Defaults to
+        :data:`config.FALLBACK_MODEL`.
+    profile : str, optional
+        Inference profile, see :func:`build_pipeline`. Defaults to
+        :data:`config.LOCAL_PROFILE`.
+    max_models : int, optional
+        Number of models kept loaded. Defaults to
+        :data:`config.LOCAL_MAX_MODELS`.
+
+    Returns
+    -------
+    ``transformers.Pipeline``
+    """
+
+    with _pipelines_lock:
+
+        key = (model, profile)
+        if key in _pipelines:
+            _pipelines.move_to_end(key)
+            return _pipelines[key]
+
+        tic = time.perf_counter()
+        pipe = build_pipeline(model, profile)
+        logger.info(f'Loaded {model} ({profile}) in {time.perf_counter() - tic:.1f} s.')
+        _pipelines[key] = pipe
+
+        while len(_pipelines) > max(max_models, 1):
+            (evicted, evicted_profile), _ = _pipelines.popitem(last=False)
+            logger.info(f'Unloaded {evicted} ({evicted_profile}).')
+            _release_memory()
+
+        return pipe
+
+
+def clear_pipelines() -> None:
+
+    """Unload every model held by the registry."""
+
+    with _pipelines_lock:
+        _pipelines.clear()
+        _release_memory()
+
+
+def _release_memory() -> None:
+
+    gc.collect()
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class GenerationMetrics:
+
+    """
+    Thread-safe throughput and latency counters for local generation.
+
+    Every call of :func:`danube_complete` and every batch of
+    :func:`danube_complete_batch` is recorded as one forward pass.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+
+        with self._lock:
+            self.prompts = 0
+            self.new_tokens = 0
+            self.batches = 0
+            self.seconds = 0.0
+            self.max_latency = 0.0
+
+    def record(self, prompts: int, new_tokens: int, seconds: float) -> None:
+
+        with self._lock:
+            self.prompts += prompts
+            self.new_tokens += new_tokens
+            self.batches += 1
+            self.seconds += seconds
+            self.max_latency = max(self.max_latency, seconds)
+
+    def stats(self) -> Dict[str, float]:
+
+        """
+        Return totals plus ``prompts_per_s``, ``tokens_per_s`` and the mean
+        and maximum ``latency_s`` of one forward pass.
+        """
+
+        with self._lock:
+            seconds = self.seconds or float('nan')
+            return {
+                'prompts': self.prompts,
+                'new_tokens': self.new_tokens,
+                'batches': self.batches,
+                'seconds': self.seconds,
+                'prompts_per_s': self.prompts / seconds,
+                'tokens_per_s': self.new_tokens / seconds,
+                'mean_latency_s': self.seconds / self.batches if self.batches else float('nan'),
+                'max_latency_s': self.max_latency,
+            }
+
+    def log_stats(self) -> None:
+
+        s = self.stats()
+        logger.info(f'Local generation: {s["prompts"]} prompts, {s["new_tokens"]} new tokens in '
+                    f'{s["seconds"]:.1f} s. ({s["prompts_per_s"]:.2f} prompts/s, {s["tokens_per_s"]:.1f} tokens/s, '
+                    f'mean latency {s["mean_latency_s"]:.2f} s. per batch).')
+
+
+"""
+.. autodata:: hr_rag.llms.local_client.metrics
+
+The :class:`GenerationMetrics` shared by every local generation in the process.
+"""
+
+metrics = GenerationMetrics()
+
+
+def _chat_template(pipe, prompt: str, client_name: str) -> str:
+
+    messages = [
+        {
+            'role': 'system',
+            'content': (
+                f'You are a regulatory analyst at {client_name}. '
+                f'Refer to yourself as we or {client_name}. Respond in a staid and measured tone.'
+            ),
+        },
+        {'role': 'user', 'content': prompt},
+    ]
+
+    return pipe.tokenizer.apply_chat_template(
+        messages,
+        tokenize=False,
+        add_generation_prompt=True,
+    )
+
+
+def _count_new_tokens(pipe, templates: Sequence[str], texts: Sequence[str]) -> int:
+
+    completions = [text[len(template):] if text.startswith(template) else text
+                   for template, text in zip(templates, texts)]
+    return sum(len(ids) for ids in pipe.tokenizer(completions, add_special_tokens=False)['input_ids'])
+
+
+def _prefix_cache(pipe, client_name: str):
+
+    """
+    Return ``(prefix_ids, past_key_values)`` for the chat template up to the
+    user prompt, computed once per pipeline and client name, or ``None`` when
+    the model or tokenizer cannot reuse it.
+    """
+
+    per_pipe = _prefix_caches.setdefault(pipe, {})
+    if client_name in per_pipe:
+        return per_pipe[client_name]
+
+    per_pipe[client_name] = None
+    try:
+        _require_dependencies()
+    except ImportError:
+        return None
+    if not hasattr(transformers, 'DynamicCache'):
+        return None
+
+    # the template text shared by every user prompt
+    prefix = os.path.commonprefix([_chat_template(pipe, '\x00', client_name),
+                                   _chat_template(pipe, '\x01', client_name)])
+    if not prefix:
+        return None
+
+    prefix_ids = pipe.tokenizer(prefix, return_tensors='pt').input_ids
+    with torch.no_grad():
+        past = pipe.model(
+            input_ids=prefix_ids.to(pipe.model.device),
+            past_key_values=transformers.DynamicCache(),
+            use_cache=True,
+        ).past_key_values
+
+    per_pipe[client_name] = (prefix_ids, past)
+    return per_pipe[client_name]
+
+
+def _generate_with_prefix(pipe, template: str, client_name: str, max_new_tokens: int) -> Optional[str]:
+
+    """
+    Generate one completion starting from a copy of the cached system-prompt
+    KV cache, so only the user prompt is prefilled. Returns ``None`` if the
+    template does not tokenize to the cached prefix followed by more tokens.
+    """
+
+    cached = _prefix_cache(pipe, client_name)
+    if cached is None:
+        return None
+
+    prefix_ids, past = cached
+    input_ids = pipe.tokenizer(template, return_tensors='pt').input_ids
+    n = prefix_ids.shape[1]
+    if input_ids.shape[1] <= n or not torch.equal(input_ids[0, :n], prefix_ids[0]):
+        return None
+
+    device = pipe.model.device
+    with torch.no_grad():
+        output = pipe.model.generate(
+            input_ids=input_ids.to(device),
+            attention_mask=torch.ones_like(input_ids).to(device),
+            past_key_values=copy.deepcopy(past),
+            max_new_tokens=max_new_tokens,
+            pad_token_id=pipe.tokenizer.pad_token_id,
+        )
+
+    return template + pipe.tokenizer.decode(output[0, input_ids.shape[1]:], skip_special_tokens=True)
+
+
 def danube_complete(
     prompt: str,
     *,
@@ -135,6 +440,8 @@ def danube_complete(
     client_name: str = CLIENT_NAME,
     pipeline=None,
     max_new_tokens: int = 512,
+    profile: str = LOCAL_PROFILE,
+    prefix_cache: bool = LOCAL_PREFIX_CACHE,
 ) -> str:
     
     """
@@ -150,11 +457,18 @@ def danube_complete(
     client_name:
         Name used in the system prompt when describing the analyst persona.
     pipeline:
-        Optional pre-built Hugging Face pipeline. Supplying a pipeline speeds up
-        repeated calls in environments where model loading is expensive (e.g.,
-        tests or batch scoring). When omitted, :func:`build_pipeline` is used.
+        Optional pre-built Hugging Face pipeline. When omitted, the shared
+        pipeline of ``model`` is taken from :func:`get_pipeline`, so the model
+        is loaded only once per process.
     max_new_tokens:
         Generation limit forwarded to the text-generation pipeline.
+    profile:
+        Inference profile of the shared pipeline, see :func:`build_pipeline`.
+        Ignored when ``pipeline`` is given.
+    prefix_cache:
+        Reuse the KV cache of the system prompt, which is the same for every
+        call, instead of recomputing it. Defaults to
+        :data:`config.LOCAL_PREFIX_CACHE`.
 
     Returns
     -------
@@ -163,32 +477,150 @@ def danube_complete(
 
     """
 
-    if pipeline is None:
-        pipe = build_pipeline(model)
-    else:
-        pipe = pipeline
+    return danube_complete_batch(
+        [prompt],
+        model=model,
+        client_name=client_name,
+        pipeline=pipeline,
+        max_new_tokens=max_new_tokens,
+        batch_size=1,
+        profile=profile,
+        prefix_cache=prefix_cache,
+    )[0]
 
-    messages = [
-        {
-            'role': 'system',
-            'content': (
-                f'You are a regulatory analyst at {client_name}. '
-                f'Refer to yourself as we or {client_name}. Respond in a staid and measured tone.'
-            ),
-        },
-        {'role': 'user', 'content': prompt},
-    ]
 
-    prompt_template = pipe.tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True,
-    )
+def danube_complete_batch(
+    prompts: Sequence[str],
+    *,
+    model: str = FALLBACK_MODEL,
+    client_name: str = CLIENT_NAME,
+    pipeline=None,
+    max_new_tokens: int = 512,
+    batch_size: int = LOCAL_BATCH_SIZE,
+    profile: str = LOCAL_PROFILE,
+    prefix_cache: bool = LOCAL_PREFIX_CACHE,
+) -> List[str]:
 
-    outputs: List[Dict[str, Any]] = pipe(
-        prompt_template,
-        return_full_text=True,
-        max_new_tokens=max_new_tokens,
-    )
+    """
+    Run completions for many prompts through one local pipeline.
+
+    Prompts are templated, ordered by length and sent ``batch_size`` at a
+    time, left-padded, so prompts of similar length share a forward pass and
+    little compute is spent on padding. With ``batch_size=1`` each prompt is
+    instead generated from the cached system-prompt KV cache when
+    ``prefix_cache`` is set. Each batch is recorded in :data:`metrics`.
+
+    Parameters
+    ----------
+    prompts:
+        User prompts to feed into the chat template.
+    model, client_name, pipeline, max_new_tokens, profile, prefix_cache:
+        As for :func:`danube_complete`.
+    batch_size:
+        Prompts per forward pass. Defaults to :data:`config.LOCAL_BATCH_SIZE`.
+
+    Returns
+    -------
+    list of str
+        Completed responses aligned with ``prompts``.
+    """
+
+    pipe = get_pipeline(model, profile=profile) if pipeline is None else pipeline
+
+    tokenizer = pipe.tokenizer
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = 'left'
+
+    templates = [_chat_template(pipe, prompt, client_name) for prompt in prompts]
+    order = sorted(range(len(templates)), key=lambda i: len(templates[i]), reverse=True)
+    results: List[Optional[str]] = [None] * len(templates)
+    batch_size = max(batch_size, 1)
+
+    for start in range(0, len(order), batch_size):
+
+        idx = order[start:start + batch_size]
+        batch = [templates[i] for i in idx]
+
+        tic = time.perf_counter()
+        text = None
+        if prefix_cache and len(batch) == 1:
+            text = _generate_with_prefix(pipe, batch[0], client_name, max_new_tokens)
+
+        if text is not None:
+            texts = [text]
+        else:
+            outputs: List[Any] = pipe(
+                batch,
+                return_full_text=True,
+                max_new_tokens=max_new_tokens,
+                batch_size=len(batch),
+            )
+            texts = [(out[0] if isinstance(out, list) else out).get('generated_text', '') for out in outputs]
+        toc = time.perf_counter() - tic
+
+        metrics.record(len(batch), _count_new_tokens(pipe, batch, texts), toc)
+        for i, text in zip(idx, texts):
+            results[i] = text
+
+    return results
+
+
+def benchmark(
+    prompts: Sequence[str],
+    *,
+    model: str = FALLBACK_MODEL,
+    profiles: Sequence[str] = PROFILES,
+    max_new_tokens: int = 64,
+    batch_size: int = LOCAL_BATCH_SIZE,
+) -> Dict[str, Dict[str, float]]:
+
+    """
+    Compare the throughput of inference profiles on the same prompts.
+
+    Each profile is loaded (load time is excluded), warmed up on one prompt
+    and then run over ``prompts``; models are unloaded between profiles so
+    only one is resident at a time.
+
+    Parameters
+    ----------
+    prompts:
+        User prompts, for example a sample of chunk texts.
+    model:
+        Hugging Face repository identifier. Defaults to
+        :data:`config.FALLBACK_MODEL`.
+    profiles:
+        Profiles to compare, see :func:`build_pipeline`. Defaults to every
+        profile, so the ``'cpu'`` int8 path is measured against ``'bf16'``.
+    max_new_tokens, batch_size:
+        As for :func:`danube_complete_batch`.
+
+    Returns
+    -------
+    dict
+        :meth:`GenerationMetrics.stats` per profile, plus the
+        ``tokens_per_s`` ratio to the first profile as ``speedup``.
+    """
+
+    results = {}
+
+    for profile in profiles:
+
+        clear_pipelines()
+        pipe = get_pipeline(model, profile=profile)
+        danube_complete_batch(prompts[:1], pipeline=pipe, max_new_tokens=4, batch_size=1)
+
+        metrics.reset()
+        danube_complete_batch(prompts, pipeline=pipe, max_new_tokens=max_new_tokens, batch_size=batch_size)
+        results[profile] = metrics.stats()
+        logger.info(f'{profile}: {results[profile]["tokens_per_s"]:.1f} tokens/s, '
+                    f'{results[profile]["prompts_per_s"]:.2f} prompts/s.')
+
+    clear_pipelines()
+    metrics.reset()
+
+    baseline = results[profiles[0]]['tokens_per_s'] if profiles else float('nan')
+    for stats in results.values():
+        stats['speedup'] = stats['tokens_per_s'] / baseline
 
-    return outputs[0].get('generated_text', '')
+    return results
@@ -26,9 +26,12 @@ hr_rag.llms.openai_client module
 High-level helpers for interacting with the OpenAI API, including:
 
 - a shared client instance configured from :mod:`config`,
+- persistent embedding and completion caches consulted before every request,
 - default language model parameters for chat completions,
-- convenience functions for embeddings and completions,
-- a simple retry mechanism with exponential backoff.
+- convenience functions for single and batched embeddings and completions,
+- deduplicated, concurrent or offline-batch completion of many prompts,
+- a retry policy with exponential backoff that honours the server's
+  ``Retry-After`` hints, enforces a deadline and shares a circuit breaker.
 
 This module assumes that the following symbols are defined in a separate
 :mod:`config` module:
@@ -37,9 +40,13 @@ This module assumes that the following symbols are defined in a separate
 - ``OPENAI_API_TIMEOUT``
 - ``CLIENT_NAME``
 - ``EMBEDDING_MODEL``
-- ``OPENAI_API_RETRIES``
+- ``OPENAI_API_RETRIES``, ``OPENAI_API_MAX_DELAY``, ``OPENAI_API_MAX_HINT``,
+  ``OPENAI_API_DEADLINE``
 - ``REMOTE_MODEL``
 - ``SEED``
+- ``EMBED_CACHE_ENABLED``, ``EMBED_CACHE_PATH``, ``EMBED_CACHE_MAX_BYTES``
+- ``COMPLETION_CACHE_MODE``, ``COMPLETION_CACHE_PATH``, ``COMPLETION_CACHE_TTL``,
+  ``COMPLETION_CACHE_MAX_BYTES``
 
 Quickstart
 ----------
@@ -58,6 +65,9 @@ Basic usage for embeddings and completions:
     response = gpt_complete(prompt)
     print(response.choices[0].message.content)
 
+    responses = gpt_complete_many([prompt, prompt, 'Define data custody.'])
+    # two requests; responses[0] is responses[1]
+
 
 Configuration
 -------------
@@ -69,6 +79,8 @@ shared OpenAI client and default completion parameters.
 
 from copy import deepcopy
 from functools import wraps
+import hashlib
+import json
 
 import config
 
@@ -78,13 +90,31 @@ OPENAI_API_TIMEOUT = config.OPENAI_API_TIMEOUT
 CLIENT_NAME = config.CLIENT_NAME
 EMBEDDING_MODEL = config.EMBEDDING_MODEL
 OPENAI_API_RETRIES = config.OPENAI_API_RETRIES
+OPENAI_API_MAX_DELAY = config.OPENAI_API_MAX_DELAY
+OPENAI_API_MAX_HINT = config.OPENAI_API_MAX_HINT
+OPENAI_API_DEADLINE = config.OPENAI_API_DEADLINE
+OPENAI_BASE_URL = config.OPENAI_BASE_URL
+OPENAI_MAX_CONCURRENCY = config.OPENAI_MAX_CONCURRENCY
 REMOTE_MODEL = config.REMOTE_MODEL
 SEED = config.SEED
+EMBED_CACHE_ENABLED = config.EMBED_CACHE_ENABLED
+EMBED_CACHE_PATH = config.EMBED_CACHE_PATH
+EMBED_CACHE_MAX_BYTES = config.EMBED_CACHE_MAX_BYTES
+COMPLETION_CACHE_MODE = config.COMPLETION_CACHE_MODE
+COMPLETION_CACHE_PATH = config.COMPLETION_CACHE_PATH
+COMPLETION_CACHE_TTL = config.COMPLETION_CACHE_TTL
+COMPLETION_CACHE_MAX_BYTES = config.COMPLETION_CACHE_MAX_BYTES
+import asyncio
+import inspect
 import openai
+from openai.types.chat import ChatCompletion
 import random
 import time
 
-from logging_utils import get_logger
+from llms.cache import CompletionCache, EmbeddingCache, request_key
+from llms.retry import (RETRIABLE_ERRORS, CircuitBreaker, circuit_breaker, is_rate_limit,
+                        is_retriable, retry_after)
+from logging_utils import counters, get_logger
 logger = get_logger(__name__)
 
 """ 
@@ -130,10 +160,13 @@ The global OpenAI client instance configured with:
 
 - ``api_key`` from :data:`config.API_KEY`
 - ``timeout`` from :data:`config.OPENAI_API_TIMEOUT`
+- ``base_url`` from :data:`config.OPENAI_BASE_URL` (``None`` uses the OpenAI API)
+- ``max_retries=0``, so every failure reaches :func:`retry_with_exponential_backoff`
+  and the shared circuit breaker instead of the SDK's own retry loop
 
 """
 
-client = openai.OpenAI(api_key=API_KEY, timeout=OPENAI_API_TIMEOUT)
+client = openai.OpenAI(api_key=API_KEY, timeout=OPENAI_API_TIMEOUT, base_url=OPENAI_BASE_URL, max_retries=0)
 
 def retry_with_exponential_backoff(
     func=None,
@@ -143,7 +176,11 @@ def retry_with_exponential_backoff(
     exponential_base:float=2,
     jitter:bool=True,
     max_retries:int=OPENAI_API_RETRIES,
-    errors:tuple=(openai.RateLimitError,),
+    max_delay:float=OPENAI_API_MAX_DELAY,
+    max_hint:float=OPENAI_API_MAX_HINT,
+    deadline:float=OPENAI_API_DEADLINE,
+    errors:tuple=RETRIABLE_ERRORS,
+    breaker:CircuitBreaker=None,
     verbose:bool=False,
 ):
       
@@ -154,7 +191,15 @@ def retry_with_exponential_backoff(
    (``@retry_with_exponential_backoff``) the default logger and retry settings
    are applied. When called with keyword arguments (for example,
    ``@retry_with_exponential_backoff(max_retries=3)``) the returned decorator
-   configures the wrapped function accordingly.
+   configures the wrapped function accordingly. Coroutine functions are
+   wrapped with an ``async`` wrapper that sleeps with :func:`asyncio.sleep`.
+
+   Only retriable errors (see :func:`hr_rag.llms.retry.is_retriable`) are
+   retried; fatal ones are logged and raised at once. When a rate-limited
+   (429) response sends a ``Retry-After`` or ``x-ratelimit-reset-*`` header,
+   its wait, capped at ``max_hint``, replaces the backoff delay; every other
+   retriable error waits the backoff delay. Every attempt first waits on the shared circuit breaker,
+   which rate-limited responses open for all threads and tasks.
 
    Parameters
    ----------
@@ -178,10 +223,24 @@ def retry_with_exponential_backoff(
    max_retries : int, optional
       Maximum number of retry attempts before giving up and raising an
       exception. Defaults to :data:`config.OPENAI_API_RETRIES`.
+   max_delay : float, optional
+      Upper bound, in seconds, of the backoff delay. Defaults to
+      :data:`config.OPENAI_API_MAX_DELAY`.
+   max_hint : float, optional
+      Upper bound, in seconds, of a server wait hint on a rate-limited
+      response. Defaults to :data:`config.OPENAI_API_MAX_HINT`.
+   deadline : float, optional
+      Overall time budget, in seconds, for one call including all retries
+      and waits. A retry that would end past the deadline is not attempted.
+      ``None`` or ``0`` disables it. Defaults to
+      :data:`config.OPENAI_API_DEADLINE`.
    errors : tuple, optional
-      Tuple of exception types that should trigger a retry. Any other
-      exception type is treated as non-retriable but still subject to the
-      same max-retry check. Defaults to ``(openai.RateLimitError,)``.
+      Tuple of exception types that are always retried, in addition to API
+      responses with status 408, 409, 429 or 5xx. Every other exception is
+      fatal. Defaults to :data:`hr_rag.llms.retry.RETRIABLE_ERRORS`.
+   breaker : CircuitBreaker, optional
+      Breaker to wait on and report to. Defaults to the process-wide
+      :data:`hr_rag.llms.retry.circuit_breaker`.
    verbose : bool, optional
       If ``True``, emit informational log messages before each attempt and
       retry, including the current retry count and next delay. Defaults to
@@ -196,48 +255,106 @@ def retry_with_exponential_backoff(
    Raises
    ------
    Exception
-      If the maximum number of retries is exceeded, the original exception is
-      re-raised so stack information is preserved.
+      If the error is fatal, the maximum number of retries is exceeded or
+      the deadline would be passed, the original exception is re-raised so
+      stack information is preserved.
    """
 
    def decorator(f):
       
       log = logger or get_logger(f.__module__)
       retries_allowed = max(max_retries, 0)
+      shared = breaker or circuit_breaker
+
+      def next_delay(err, num_retries, backoff, tic):
+
+         """Return the pause before the next attempt, or re-raise ``err``."""
+
+         toc = time.monotonic() - tic
+
+         if not is_retriable(err, errors):
+            log.error(f'A non-retriable error has occurred after {toc:.2f} s. when using the OpenAI API: "{err}".')
+            raise err
+
+         rate_limited = is_rate_limit(err)
+         hint = retry_after(err) if rate_limited else None
+         if hint is not None:
+            hint = min(hint, max_hint)
+         shared.record_failure(hint, rate_limited=rate_limited)
+
+         if num_retries > retries_allowed:
+            log.error(f'Giving up after {retries_allowed} retries and {toc:.2f} s.: "{err}".')
+            raise err
+
+         delay = hint if hint is not None else min(backoff, max_delay)
+         if deadline and toc + max(delay, shared.remaining()) > deadline:
+            log.error(f'Giving up: the next retry would pass the {deadline:g} s. deadline: "{err}".')
+            raise err
+
+         log.warning(f'{type(err).__name__} after {toc:.2f} s.; retry {num_retries}/{retries_allowed} in {delay:.2f} s.')
+         counters.incr('api_retries')
+         return delay
+
+      if inspect.iscoroutinefunction(f):
+
+         @wraps(f)
+         async def async_wrapper(*args, **kwargs):
+
+            num_retries = 0
+            backoff = initial_delay
+            tic = time.monotonic()
+
+            while True:
+
+               await shared.wait_async()
+
+               try:
+
+                  if verbose:
+                     log.info('Polling OpenAI API ...')
+                     log.info(f'Current retries: {num_retries}/{retries_allowed}; Next delay: {backoff:.2f} s. ...')
+
+                  result = await f(*args, **kwargs)
+                  shared.record_success()
+                  return result
+
+               except Exception as err:
+
+                  num_retries += 1
+                  delay = next_delay(err, num_retries, backoff, tic)
+
+               backoff *= exponential_base * (1 + jitter * random.random())
+               await asyncio.sleep(delay)
+
+         return async_wrapper
 
       @wraps(f)
       def wrapper(*args, **kwargs):
            
          num_retries = 0
-         delay = initial_delay
-         tic = time.time()
+         backoff = initial_delay
+         tic = time.monotonic()
 
          while True:
 
+            shared.wait()
+
             try:
 
                if verbose:
                   log.info('Polling OpenAI API ...')
-                  log.info(f'Current retries: {num_retries}/{retries_allowed}; Next delay: {delay:.2f} s. ...')
-
-               return f(*args, **kwargs)
+                  log.info(f'Current retries: {num_retries}/{retries_allowed}; Next delay: {backoff:.2f} s. ...')
 
-            except errors as err:
-
-               last_exc = err
+               result = f(*args, **kwargs)
+               shared.record_success()
+               return result
 
             except Exception as err:
 
-               last_exc = err
-               toc = time.time() - tic
-               log.error(f'An error has occurred after {toc:.2f} s. when using the OpenAI API: "{err}".')
-
-            num_retries += 1
+               num_retries += 1
+               delay = next_delay(err, num_retries, backoff, tic)
 
-            if num_retries > retries_allowed:
-               raise last_exc
-
-            delay *= exponential_base * (1 + jitter * random.random())
+            backoff *= exponential_base * (1 + jitter * random.random())
             time.sleep(delay)
 
       return wrapper
@@ -247,14 +364,75 @@ def retry_with_exponential_backoff(
 
    return decorator(func)
 
+"""
+
+Embedding cache
+~~~~~~~~~~~~~~~
+
+.. autodata:: hr_rag.llms.openai_client.embedding_cache
+   :annotation: = None
+
+The shared :class:`hr_rag.llms.cache.EmbeddingCache`, opened lazily by
+:func:`get_embedding_cache` at :data:`config.EMBED_CACHE_PATH` when
+:data:`config.EMBED_CACHE_ENABLED` is set. :func:`gpt_embed` and
+:func:`gpt_embed_batch` consult it before calling the API.
+
+"""
+
+embedding_cache = None
+
+def get_embedding_cache():
+
+   """
+   Return the shared embedding cache, opening it on first use.
+
+   Returns
+   -------
+   EmbeddingCache or None
+      The process-wide cache, or ``None`` when
+      :data:`config.EMBED_CACHE_ENABLED` is ``False``.
+   """
+
+   global embedding_cache
+
+   if embedding_cache is None and EMBED_CACHE_ENABLED:
+      embedding_cache = EmbeddingCache(EMBED_CACHE_PATH, max_bytes=EMBED_CACHE_MAX_BYTES)
+
+   return embedding_cache
+
+def count_usage(response) -> None:
+
+   """Add one API call and the response's token usage to :data:`logging_utils.counters`."""
+
+   counters.incr('api_calls')
+   usage = getattr(response, 'usage', None)
+   if usage is not None:
+      counters.incr('api_prompt_tokens', getattr(usage, 'prompt_tokens', 0) or 0)
+      counters.incr('api_completion_tokens', getattr(usage, 'completion_tokens', 0) or 0)
+
 @retry_with_exponential_backoff
+def _embeddings_create(texts:list) -> list:
+
+   """
+   Request embeddings for ``texts`` in one API call, ordered like the input.
+
+   The API tags each returned embedding with its input position; results are
+   sorted by that position. Wrapped by :func:`retry_with_exponential_backoff`.
+   """
+
+   response = client.embeddings.create(input=list(texts), model=EMBEDDING_MODEL)
+   count_usage(response)
+
+   return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
 def gpt_embed(text:str) -> list:
 
    """
    Create an embedding vector for the given text using the configured model.
 
-   This function calls the OpenAI embeddings API via the shared client
-   and returns the embedding vector for the input text. It is wrapped by
+   This function checks the shared embedding cache and otherwise calls the
+   OpenAI embeddings API via the shared client, returning the embedding
+   vector for the input text. API calls are wrapped by
    :func:`retry_with_exponential_backoff`, so transient errors (such as
    rate limits) will be retried according to the configured policy.
 
@@ -270,9 +448,129 @@ def gpt_embed(text:str) -> list:
       embeddings API for the given ``text``.
    """
 
-   return client.embeddings.create(input=text, model=EMBEDDING_MODEL).data[0].embedding
+   return gpt_embed_batch([text])[0]
+
+def gpt_embed_batch(texts:list) -> list:
+
+   """
+   Create embedding vectors for many texts in a single API request.
+
+   Texts already present in the shared embedding cache (see
+   :func:`get_embedding_cache`) are answered from it. The remaining distinct
+   texts are sent in one embeddings request and written back to the cache.
+   Callers are responsible for keeping a batch within the API's input-count
+   and token limits, see :data:`config.EMBED_BATCH_SIZE` and
+   :data:`config.EMBED_BATCH_TOKENS`.
+
+   Parameters
+   ----------
+   texts : list
+      Input strings to be converted into embedding vectors. Must be
+      non-empty strings.
+
+   Returns
+   -------
+   list
+      A list of embedding vectors (lists of floats), one per input text,
+      in the same order as ``texts``.
+   """
+
+   if not texts:
+      return []
+
+   cache = get_embedding_cache()
+   found = cache.get_many(EMBEDDING_MODEL, texts) if cache is not None else {}
+
+   missing = list(dict.fromkeys(t for t in texts if t not in found))
+   if missing:
+      fresh = dict(zip(missing, _embeddings_create(missing)))
+      if cache is not None:
+         cache.put_many(EMBEDDING_MODEL, fresh)
+      found.update(fresh)
+
+   return [found[t] for t in texts]
+
+"""
+
+Completion cache
+~~~~~~~~~~~~~~~~
+
+.. autodata:: hr_rag.llms.openai_client.completion_cache
+   :annotation: = None
+
+The shared :class:`hr_rag.llms.cache.CompletionCache`, opened lazily by
+:func:`get_completion_cache` according to :data:`config.COMPLETION_CACHE_MODE`:
+``'readwrite'`` (default), ``'replay'`` (read-only; uncached requests raise
+:class:`hr_rag.llms.cache.CacheMissError` instead of calling the API) or
+``'off'``. The mode can be set through the ``COMPLETION_CACHE_MODE``
+environment variable, for example for offline test runs.
+
+"""
+
+completion_cache = None
+
+def get_completion_cache():
+
+   """
+   Return the shared completion cache, opening it on first use.
+
+   Returns
+   -------
+   CompletionCache or None
+      The process-wide cache, or ``None`` when
+      :data:`config.COMPLETION_CACHE_MODE` is ``'off'``.
+   """
+
+   global completion_cache
+
+   if completion_cache is None and COMPLETION_CACHE_MODE != 'off':
+      if COMPLETION_CACHE_MODE not in ('readwrite', 'replay'):
+         raise ValueError(f"COMPLETION_CACHE_MODE must be 'readwrite', 'replay' or 'off', not {COMPLETION_CACHE_MODE!r}.")
+      completion_cache = CompletionCache(COMPLETION_CACHE_PATH, ttl=COMPLETION_CACHE_TTL,
+                                         max_bytes=COMPLETION_CACHE_MAX_BYTES,
+                                         replay=COMPLETION_CACHE_MODE == 'replay')
+
+   return completion_cache
+
+def cached_completion(params:dict):
+
+   """
+   Look up the response for request ``params`` in the completion cache.
+
+   Returns
+   -------
+   tuple
+      ``(key, response)``: the cache key (``None`` if caching is off) and the
+      cached :class:`openai.types.chat.ChatCompletion`, or ``None`` on a miss.
+   """
+
+   cache = get_completion_cache()
+   if cache is None:
+      return None, None
+
+   key = request_key(params)
+   cached = cache.get(key)
+
+   return key, (ChatCompletion.model_validate_json(cached) if cached is not None else None)
+
+def store_completion(key, response) -> None:
+
+   """Write ``response`` to the completion cache under ``key`` (no-op if caching is off)."""
+
+   cache = get_completion_cache()
+   if cache is not None and key is not None:
+      cache.put(key, response.model_dump_json())
 
 @retry_with_exponential_backoff
+def _chat_completions_create(params:dict):
+
+   """Send one chat completion request. Wrapped by :func:`retry_with_exponential_backoff`."""
+
+   response = client.chat.completions.create(**params)
+   count_usage(response)
+
+   return response
+
 def gpt_complete(prompt, lm_params_=None):
    
    """
@@ -280,9 +578,10 @@ def gpt_complete(prompt, lm_params_=None):
 
    This function copies either the module-level :data:`lm_params` template
    or the provided ``lm_params_`` so the call can mutate the user-entry
-   message safely. After the prompt is inserted, it calls the OpenAI chat
-   completions API via
-   the shared client. It is wrapped by
+   message safely. After the prompt is inserted, the full request is looked
+   up in the completion cache (see :func:`get_completion_cache`); on a miss
+   it calls the OpenAI chat completions API via the shared client and stores
+   the response. API calls are wrapped by
    :func:`retry_with_exponential_backoff`, so transient errors will be
    retried according to the configured backoff policy.
 
@@ -307,6 +606,40 @@ def gpt_complete(prompt, lm_params_=None):
       or more choices.
    """
 
+   params = completion_params(prompt, lm_params_)
+   key, response = cached_completion(params)
+
+   if response is None:
+      response = _chat_completions_create(params)
+      store_completion(key, response)
+
+   return response
+
+def completion_params(prompt, lm_params_=None) -> dict:
+
+   """
+   Build the request parameters :func:`gpt_complete` sends for ``prompt``.
+
+   Parameters
+   ----------
+   prompt
+      The user prompt, inserted into the copied template's user message
+      (index ``1``).
+   lm_params_ : dict, optional
+      Parameter template. Defaults to the module-level :data:`lm_params`;
+      the template is deep-copied and never mutated.
+
+   Returns
+   -------
+   dict
+      Keyword arguments for ``client.chat.completions.create``.
+
+   Raises
+   ------
+   ValueError
+      If the template does not define a system and a user message.
+   """
+
    params_template = lm_params if lm_params_ is None else lm_params_
    params = deepcopy(params_template)
    messages = params.get('messages')
@@ -317,4 +650,101 @@ def gpt_complete(prompt, lm_params_=None):
    params['messages'] = [dict(message) for message in messages]
    params['messages'][1]['content'] = prompt
 
-   return client.chat.completions.create(**params)
+   return params
+
+def prompt_id(prompt) -> str:
+
+   """Stable request identifier for ``prompt``, used as the batch ``custom_id``."""
+
+   return 'prompt-' + hashlib.sha256(str(prompt).encode('utf-8')).hexdigest()[:24]
+
+def gpt_complete_many(prompts:list, lm_params_=None, *, batch_file:str=None,
+                      concurrency:int=OPENAI_MAX_CONCURRENCY) -> list:
+
+   """
+   Complete many prompts, paying once for each distinct prompt.
+
+   Identical prompts are collapsed before any request is made. The distinct
+   prompts are either sent concurrently through
+   :func:`hr_rag.llms.async_client.complete_many`, which applies the
+   configured rate limits, or, when ``batch_file`` is given, written to an
+   OpenAI Batch API request file for offline bulk submission. The concurrent
+   path starts its own event loop, so async callers (for example a Jupyter
+   notebook) should await :func:`hr_rag.llms.async_client.complete_many`
+   directly instead.
+
+   Parameters
+   ----------
+   prompts : list
+      User prompts. Duplicates are allowed and answered from one request.
+   lm_params_ : dict, optional
+      Parameter template, see :func:`completion_params`.
+   batch_file : str, optional
+      If provided, write one ``/v1/chat/completions`` request per distinct
+      prompt to this JSONL file instead of calling the API.
+   concurrency : int, optional
+      Maximum requests in flight. Defaults to
+      :data:`config.OPENAI_MAX_CONCURRENCY`.
+
+   Returns
+   -------
+   list
+      Chat completion responses aligned with ``prompts``. With
+      ``batch_file``, the request ``custom_id`` of each prompt instead; pass
+      them to :func:`read_batch_results` once the batch has finished.
+   """
+
+   unique = list(dict.fromkeys(prompts))
+   logger.info(f'{len(prompts)} prompts, {len(unique)} distinct.')
+
+   if batch_file is not None:
+
+      with open(batch_file, 'w', encoding='utf-8') as f:
+         for prompt in unique:
+            request = {'custom_id': prompt_id(prompt), 'method': 'POST', 'url': '/v1/chat/completions',
+                       'body': completion_params(prompt, lm_params_)}
+            f.write(json.dumps(request) + '\n')
+      logger.info(f'Wrote {len(unique)} batch requests to {batch_file}.')
+
+      return [prompt_id(prompt) for prompt in prompts]
+
+   from llms import async_client  # imported here: async_client builds on this module
+
+   responses = dict(zip(unique, async_client.run(
+      async_client.complete_many(unique, lm_params_, concurrency=concurrency))))
+
+   cache = get_completion_cache()
+   if cache is not None:
+      cache.log_stats()
+
+   return [responses[prompt] for prompt in prompts]
+
+def read_batch_results(results_file:str, custom_ids:list) -> list:
+
+   """
+   Align an OpenAI Batch API output file with the prompts that produced it.
+
+   Parameters
+   ----------
+   results_file : str
+      Output JSONL downloaded for a batch written by
+      :func:`gpt_complete_many`.
+   custom_ids : list
+      The identifiers returned by :func:`gpt_complete_many`.
+
+   Returns
+   -------
+   list
+      The response ``body`` dictionary for each identifier, or ``None`` where
+      the batch reported an error or no result.
+   """
+
+   bodies = {}
+   with open(results_file, 'r', encoding='utf-8') as f:
+      for line in f:
+         if line.strip():
+            result = json.loads(line)
+            response = result.get('response') or {}
+            bodies[result['custom_id']] = response.get('body') if not result.get('error') else None
+
+   return [bodies.get(custom_id) for custom_id in custom_ids]
@@ -0,0 +1,311 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+"""
+hr_rag.llms.retry module
+========================
+
+Building blocks of the OpenAI retry policy used by
+:func:`hr_rag.llms.openai_client.retry_with_exponential_backoff`:
+
+``is_retriable``
+    Separate transient failures (rate limits, timeouts, connection errors,
+    5xx responses) from fatal ones (bad requests, authentication, missing
+    models, and anything that is not an OpenAI API error), which are raised
+    at once instead of being retried.
+``retry_after``
+    Read the server's wait hint from the ``retry-after-ms``, ``retry-after``
+    and, for rate-limited responses, the ``x-ratelimit-reset-requests`` /
+    ``x-ratelimit-reset-tokens`` headers of an error response.
+``CircuitBreaker``
+    A thread-safe pause shared by every thread and asyncio task of the
+    process. A rate-limit response opens it for as long as the server asks,
+    and a run of consecutive failures opens it for a cool-down period, so a
+    burst of 429s backs off globally instead of each worker hammering the
+    API on its own schedule.
+
+Example
+-------
+
+.. code-block:: python
+
+    from llms.retry import circuit_breaker, is_retriable, retry_after
+
+    try:
+        response = client.chat.completions.create(**params)
+    except Exception as err:
+        if not is_retriable(err):
+            raise
+        circuit_breaker.record_failure(retry_after(err), rate_limited=True)
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+from email.utils import parsedate_to_datetime
+import re
+import threading
+import time
+from typing import Optional
+
+import openai
+
+import config
+
+OPENAI_CIRCUIT_THRESHOLD = config.OPENAI_CIRCUIT_THRESHOLD
+OPENAI_CIRCUIT_COOLDOWN = config.OPENAI_CIRCUIT_COOLDOWN
+
+__all__ = ['CircuitBreaker', 'circuit_breaker', 'is_retriable', 'is_rate_limit', 'retry_after',
+           'parse_duration', 'RETRIABLE_ERRORS']
+
+# transient failures; every other exception is fatal
+RETRIABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    openai.ConflictError,
+)
+
+RETRIABLE_STATUS = {408, 409, 429}
+
+_DURATION = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+def is_rate_limit(err: BaseException) -> bool:
+
+    """Return ``True`` if ``err`` is an HTTP 429 response."""
+
+    return isinstance(err, openai.RateLimitError) or getattr(err, 'status_code', None) == 429
+
+
+def is_retriable(err: BaseException, errors: tuple = RETRIABLE_ERRORS) -> bool:
+
+    """
+    Decide whether a failed request is worth retrying.
+
+    Parameters
+    ----------
+    err : BaseException
+        The exception raised by the request.
+    errors : tuple, optional
+        Exception types that are always retried. Defaults to
+        :data:`RETRIABLE_ERRORS`.
+
+    Returns
+    -------
+    bool
+        ``True`` for the types in ``errors`` and for API responses with status
+        408, 409, 429 or 5xx; ``False`` otherwise.
+    """
+
+    if isinstance(err, errors):
+        return True
+    status = getattr(err, 'status_code', None)
+    return isinstance(err, openai.APIStatusError) and (status in RETRIABLE_STATUS or status >= 500)
+
+
+def parse_duration(value: str) -> Optional[float]:
+
+    """
+    Parse an OpenAI rate-limit reset value such as ``'20ms'``, ``'1s'`` or
+    ``'6m0s'`` into seconds. Bare numbers are read as seconds. Returns
+    ``None`` if ``value`` cannot be parsed.
+    """
+
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts or ''.join(n + u for n, u in parts) != value:
+        return None
+    return sum(float(n) * _UNITS[u] for n, u in parts)
+
+
+def retry_after(err: BaseException) -> Optional[float]:
+
+    """
+    Return the number of seconds the server asked us to wait, if any.
+
+    ``retry-after-ms`` and ``retry-after`` (seconds or an HTTP date) take
+    precedence. Otherwise, for a rate-limited response (see
+    :func:`is_rate_limit`), the ``x-ratelimit-reset-*`` header of each
+    exhausted limit (``x-ratelimit-remaining-* == 0``) is used and the longest
+    wait wins. The reset headers are sent on every response and, for a limit
+    that is not exhausted, give the time until its bucket is full again, which
+    is no reason to wait.
+
+    Parameters
+    ----------
+    err : BaseException
+        Usually an :class:`openai.APIStatusError`; other exceptions carry no
+        headers and yield ``None``.
+
+    Returns
+    -------
+    float or None
+        Seconds to wait, or ``None`` when the response has no usable hint.
+    """
+
+    response = getattr(err, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+
+    if (value := headers.get('retry-after-ms')) is not None:
+        seconds = parse_duration(value)
+        if seconds is not None:
+            return seconds / 1000.0
+
+    if (value := headers.get('retry-after')) is not None:
+        seconds = parse_duration(value)
+        if seconds is None:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(seconds, 0.0)
+
+    if not is_rate_limit(err):
+        return None
+
+    waits = []
+    for limit in ('requests', 'tokens'):
+        if headers.get(f'x-ratelimit-remaining-{limit}') != '0':
+            continue
+        value = headers.get(f'x-ratelimit-reset-{limit}')
+        if value is not None and (seconds := parse_duration(value)) is not None:
+            waits.append(seconds)
+    return max(waits) if waits else None
+
+
+class CircuitBreaker:
+
+    """
+    Process-wide pause in front of the OpenAI API.
+
+    The breaker is *open* until a point in time; callers wait on it before
+    every attempt with :meth:`wait` (threads) or :meth:`wait_async` (asyncio
+    tasks). It opens when a rate-limited response reports how long to wait,
+    and for ``cooldown`` seconds once ``threshold`` failures have happened in
+    a row. Any success, and every trip, resets the failure count.
+
+    Parameters
+    ----------
+    threshold : int, optional
+        Consecutive failures that open the breaker for ``cooldown`` seconds.
+        Defaults to :data:`config.OPENAI_CIRCUIT_THRESHOLD`; ``0`` disables the
+        count-based trip.
+    cooldown : float, optional
+        Pause, in seconds, after ``threshold`` consecutive failures. Defaults
+        to :data:`config.OPENAI_CIRCUIT_COOLDOWN`.
+    """
+
+    def __init__(self, threshold: int = OPENAI_CIRCUIT_THRESHOLD, cooldown: float = OPENAI_CIRCUIT_COOLDOWN):
+
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.trips = 0
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+
+        """Seconds until the breaker closes; ``0.0`` when it is closed."""
+
+        with self._lock:
+            return max(self._open_until - time.monotonic(), 0.0)
+
+    def open_for(self, seconds: float) -> None:
+
+        """Keep the breaker open for at least ``seconds`` from now."""
+
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until > self._open_until:
+                self._open_until = until
+                self.trips += 1
+
+    def record_success(self) -> None:
+
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self, wait: Optional[float] = None, *, rate_limited: bool = False) -> None:
+
+        """
+        Count one failed attempt.
+
+        Parameters
+        ----------
+        wait : float, optional
+            The server's wait hint, see :func:`retry_after`.
+        rate_limited : bool, optional
+            Whether the failure was a 429. Only rate limits open the breaker
+            for ``wait`` seconds, because they apply to every worker.
+        """
+
+        with self._lock:
+            self.failures += 1
+            tripped = self.threshold > 0 and self.failures >= self.threshold
+            if tripped:
+                self.failures = 0
+        if rate_limited and wait:
+            self.open_for(wait)
+        if tripped:
+            self.open_for(self.cooldown)
+
+    def wait(self) -> float:
+
+        """Block the calling thread until the breaker closes; return the time waited."""
+
+        waited = 0.0
+        while (pause := self.remaining()) > 0:
+            time.sleep(pause)
+            waited += pause
+        return waited
+
+    async def wait_async(self) -> float:
+
+        """Suspend the calling task until the breaker closes; return the time waited."""
+
+        waited = 0.0
+        while (pause := self.remaining()) > 0:
+            await asyncio.sleep(pause)
+            waited += pause
+        return waited
+
+
+"""
+.. autodata:: hr_rag.llms.retry.circuit_breaker
+
+The breaker shared by every wrapped OpenAI call in the process.
+"""
+
+circuit_breaker = CircuitBreaker()
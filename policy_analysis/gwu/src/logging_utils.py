@@ -27,10 +27,21 @@ A simple logging configuration utility providing colorized console output
 and safe re-import protection.
 
 This module offers a convenience function :func:`configure_logging` to set up
-logging either to the console (with colored levels) or to a file (plain text).
+logging either to the console (with colored levels) or to a file (plain text),
+optionally mirrored as one JSON object per line by :class:`JSONFormatter`.
 It also provides a helper :func:`get_logger` to safely obtain a configured
 logger instance.
 
+For performance work it adds lightweight run instrumentation:
+
+- :class:`track` times a block or function, wall and CPU seconds plus the
+  process's peak resident set size, and adds the result to the current run.
+- :data:`counters` accumulates named counts such as API calls, tokens and
+  cache hits.
+- :func:`run_metrics` wraps one stage run and appends a record with its
+  phases and counters to a JSON-lines file, ready to load with
+  ``pandas.read_json(path, lines=True)`` and graph over time.
+
 Example
 -------
 
@@ -52,14 +63,37 @@ Example
     # Configure logging to file instead
     # configure_logging(level=logging.INFO, to_file='app.log')
 
+    # Instrument a stage
+    from logging_utils import counters, run_metrics, track
+
+    with run_metrics('embed', path='out/metrics.jsonl'):
+        with track('load'):
+            ...
+        counters.incr('api_calls')
+
 """
 
+from contextlib import ContextDecorator, contextmanager
+from datetime import datetime, timezone
+import json
 import logging
-from typing import Optional
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional
 import sys
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 _CONFIGURED = False  # prevent duplicate handlers
 
+# attributes of every LogRecord; anything else was passed through ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
 class ColorFormatter(logging.Formatter):
 
     """
@@ -109,10 +143,50 @@ class ColorFormatter(logging.Formatter):
          record.levelname = levelname_colored
          return super().format(record)
 
+class JSONFormatter(logging.Formatter):
+
+    """
+    A log formatter that writes each record as one JSON object.
+
+    Every line holds ``time`` (ISO 8601, UTC), ``level``, ``logger`` and
+    ``message``, the formatted exception if there is one, and any fields
+    passed through ``extra=``, so logs can be filtered and aggregated
+    without parsing message text.
+    """
+
+    def format(self, record:logging.LogRecord) -> str:
+
+        """
+        Format the log record as a JSON line.
+
+        Parameters
+        ----------
+        record : logging.LogRecord
+            The log record to format.
+
+        Returns
+        -------
+        str
+            A single-line JSON object.
+        """
+
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': logging.getLevelName(record.levelno),  # levelname may carry ColorFormatter codes
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+
+        return json.dumps(entry, default=str)
+
 def configure_logging(*, # all following args must be passed by keywords
                       level:int=logging.INFO, to_file: Optional[str]=None, 
                       fmt:str='%(asctime)s %(levelname)s [%(name)s]: %(message)s',
-                      datefmt:str='%Y-%m-%d %H:%M:%S') -> None:
+                      datefmt:str='%Y-%m-%d %H:%M:%S',
+                      json_file:Optional[str]=os.environ.get('LOG_JSON_FILE')) -> None:
     
     """
     Configure the root logger once per application run.
@@ -134,6 +208,10 @@ def configure_logging(*, # all following args must be passed by keywords
         ``'%(asctime)s %(levelname)s [%(name)s]: %(message)s'``.
     datefmt : str, optional
         Date format string for timestamps. Defaults to ``'%Y-%m-%d %H:%M:%S'``.
+    json_file : str, optional
+        Path of an additional JSON-lines log written with
+        :class:`JSONFormatter`. Defaults to the ``LOG_JSON_FILE`` environment
+        variable; ``None`` writes no JSON log.
 
     Notes
     -----
@@ -160,6 +238,12 @@ def configure_logging(*, # all following args must be passed by keywords
     handler.setFormatter(formatter)
     logger.addHandler(handler)
 
+    if json_file:
+        json_handler = logging.FileHandler(json_file, encoding='utf-8')
+        json_handler.setLevel(level)
+        json_handler.setFormatter(JSONFormatter())
+        logger.addHandler(json_handler)
+
     _CONFIGURED = True
 
 def get_logger(name:Optional[str]=None) -> logging.Logger:
@@ -188,3 +272,172 @@ def get_logger(name:Optional[str]=None) -> logging.Logger:
         configure_logging()  # default configuration
     
     return logging.getLogger(name)
+
+def peak_rss_mb() -> Optional[float]:
+
+    """
+    Return the peak resident set size of this process so far, in MiB.
+
+    Returns
+    -------
+    float or None
+        High-water mark of physical memory use, or ``None`` where
+        :mod:`resource` is unavailable.
+    """
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024  # bytes on macOS, KiB on Linux
+
+class Counters:
+
+    """
+    Thread-safe named counters, such as API calls, tokens and cache hits.
+
+    Use the module-level :data:`counters` instance so every part of a run
+    adds to the same totals.
+    """
+
+    def __init__(self):
+
+        self._lock = threading.Lock()
+        self._counts: Dict[str, float] = {}
+
+    def incr(self, name:str, n:float=1) -> None:
+
+        """Add ``n`` to counter ``name``."""
+
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def snapshot(self) -> Dict[str, float]:
+
+        """Return a copy of the current counts."""
+
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+
+        """Set every counter back to zero."""
+
+        with self._lock:
+            self._counts.clear()
+
+counters = Counters()
+
+_phases: Dict[str, dict] = {}  # phase name -> totals, for the current run
+_phases_lock = threading.Lock()
+
+class track(ContextDecorator):
+
+    """
+    Time a block of code, as a context manager or a decorator.
+
+    On exit, the wall and CPU seconds and the peak RSS are logged and added to
+    the phases of the current run (see :func:`run_metrics`); repeated phases
+    are summed and counted.
+
+    Parameters
+    ----------
+    name : str
+        Phase name, for example ``'umap'``.
+    logger : logging.Logger, optional
+        Logger for the summary line. Defaults to this module's logger.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        with track('umap'):
+            X_2d = reducer.fit_transform(X)
+
+        @track('extract')
+        def extract(path): ...
+    """
+
+    def __init__(self, name:str, logger:Optional[logging.Logger]=None):
+
+        self.name = name
+        self.logger = logger
+
+    def __enter__(self) -> 'track':
+
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+        return self
+
+    def __exit__(self, *exc) -> bool:
+
+        seconds = time.perf_counter() - self._wall
+        cpu_seconds = time.process_time() - self._cpu
+        rss = peak_rss_mb()
+
+        with _phases_lock:
+            phase = _phases.setdefault(self.name, {'calls': 0, 'seconds': 0.0, 'cpu_seconds': 0.0})
+            phase['calls'] += 1
+            phase['seconds'] += seconds
+            phase['cpu_seconds'] += cpu_seconds
+            phase['peak_rss_mb'] = rss
+
+        rss_text = f', peak RSS {rss:.0f} MiB' if rss is not None else ''
+        (self.logger or get_logger(__name__)).info(
+            f'{self.name}: {seconds:.2f} s (CPU {cpu_seconds:.2f} s){rss_text}.',
+            extra={'phase': self.name, 'seconds': seconds, 'cpu_seconds': cpu_seconds, 'peak_rss_mb': rss})
+
+        return False
+
+@contextmanager
+def run_metrics(stage:str, *, path:str, run_id:Optional[str]=None):
+
+    """
+    Record one run of a stage as a line of a JSON-lines metrics file.
+
+    Counters and phases are reset on entry. On exit, successful or not, one
+    record is appended to ``path`` with the stage name, ``run_id``, start
+    time, status (and error), wall and CPU seconds, peak RSS, the
+    :class:`track` phases and the :data:`counters`.
+
+    Parameters
+    ----------
+    stage : str
+        Stage name.
+    path : str
+        JSON-lines file, created with its directory if missing.
+    run_id : str, optional
+        Identifier shared by the stages of one pipeline run.
+
+    Yields
+    ------
+    dict
+        The record; the block may add fields to it.
+    """
+
+    counters.reset()
+    with _phases_lock:
+        _phases.clear()
+
+    record = {'stage': stage, 'run_id': run_id, 'host': socket.gethostname(), 'pid': os.getpid(),
+              'started': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+    wall, cpu = time.perf_counter(), time.process_time()
+    status = 'failed'
+    try:
+        yield record
+        status = 'ok'
+    except BaseException as err:
+        record['error'] = f'{type(err).__name__}: {err}'
+        raise
+    finally:
+        with _phases_lock:
+            phases = {name: dict(phase) for name, phase in _phases.items()}
+        record.update({'status': status, 'seconds': time.perf_counter() - wall,
+                       'cpu_seconds': time.process_time() - cpu, 'peak_rss_mb': peak_rss_mb(),
+                       'phases': phases, 'counters': counters.snapshot()})
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+        get_logger(__name__).info(f'{stage}: metrics appended to {path}.', extra={'metrics': record})
@@ -0,0 +1,225 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+manifest.py
+===========
+
+Per-stage manifests for incremental ingest.
+
+A :class:`Manifest` remembers, for every input file a stage has processed, the
+input's SHA-256 hash, size and modification time, the parameters the stage
+ran with, and the hashes of the outputs derived from it. A later run asks
+:meth:`Manifest.is_current` whether an input can be skipped: unchanged size
+and mtime are trusted without re-hashing, a touched file is re-hashed, and
+missing or modified outputs force a rebuild.
+
+Manifests are stored as JSON under :data:`config.MANIFEST_DIR`, one file per
+stage, so stages never overwrite each other's records.
+
+Example
+-------
+
+.. code-block:: python
+
+    from manifest import Manifest
+
+    manifest = Manifest('pdf2txt')
+    if not manifest.is_current('dat/pdf/a.pdf', ['dat/txt/a.txt']):
+        ...  # rebuild dat/txt/a.txt
+        manifest.record('dat/pdf/a.pdf', ['dat/txt/a.txt'])
+    manifest.save()
+
+"""
+
+import hashlib
+import json
+import os
+from typing import Iterable, List, Optional
+
+import config
+
+MANIFEST_DIR = config.MANIFEST_DIR
+
+__all__ = ['Manifest', 'file_digest']
+
+
+def file_digest(path: str, *, block_size: int = 1 << 20) -> str:
+
+    """Return the hex SHA-256 digest of a file, read in blocks."""
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _stat(path: str) -> dict:
+
+    st = os.stat(path)
+
+    return {'size': st.st_size, 'mtime': st.st_mtime}
+
+
+class Manifest:
+
+    """
+    Record of inputs processed by one pipeline stage.
+
+    Parameters
+    ----------
+    stage : str
+        Stage name, used as the manifest file name.
+    params : dict, optional
+        Parameters that affect the stage's outputs, for example chunk length.
+        Entries recorded under different parameters are treated as stale.
+    manifest_dir : str, optional
+        Directory holding manifest files. Defaults to
+        :data:`config.MANIFEST_DIR`.
+    """
+
+    def __init__(self, stage: str, *, params: Optional[dict] = None, manifest_dir: str = MANIFEST_DIR):
+
+        self.stage = stage
+        self.params = json.loads(json.dumps(params or {}))  # normalize tuples etc. to their JSON form
+        self.path = os.path.join(manifest_dir, f'{stage}.json')
+        self.entries = {}
+        self._digests = {}
+
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('entries', {})
+
+    def _fresh(self, path: str, recorded: dict) -> bool:
+
+        """Check a file against its recorded stat and hash, refreshing the stat if only it moved."""
+
+        if not os.path.exists(path):
+            return False
+
+        stat = _stat(path)
+        if stat == {'size': recorded['size'], 'mtime': recorded['mtime']}:
+            return True
+
+        if stat['size'] != recorded['size'] or file_digest(path) != recorded['sha256']:
+            return False
+
+        recorded.update(stat)  # touched but identical
+
+        return True
+
+    def is_current(self, input_path: str, outputs: Iterable[str]) -> bool:
+
+        """
+        Decide whether ``input_path`` can be skipped.
+
+        Parameters
+        ----------
+        input_path : str
+            Source file of the stage.
+        outputs : iterable of str
+            Files the stage derives from ``input_path``.
+
+        Returns
+        -------
+        bool
+            ``True`` if the input, the stage parameters and every output are
+            unchanged since :meth:`record` was last called for this input.
+        """
+
+        entry = self.entries.get(input_path)
+        if entry is None or entry.get('params') != self.params:
+            return False
+
+        outputs = list(outputs)
+        if sorted(outputs) != sorted(entry['outputs']):
+            return False
+
+        return self._fresh(input_path, entry) and all(self._fresh(o, entry['outputs'][o]) for o in outputs)
+
+    def _digest(self, path: str, stat: dict) -> str:
+
+        """Hash a file once per (path, size, mtime), since many inputs can share one output."""
+
+        key = (path, stat['size'], stat['mtime'])
+        if key not in self._digests:
+            self._digests[key] = file_digest(path)
+
+        return self._digests[key]
+
+    def record(self, input_path: str, outputs: Iterable[str]) -> None:
+
+        """
+        Remember that ``outputs`` were built from the current ``input_path``.
+
+        Parameters
+        ----------
+        input_path : str
+            Source file of the stage.
+        outputs : iterable of str
+            Files the stage derived from ``input_path``; they must exist.
+        """
+
+        stat = _stat(input_path)
+        output_stats = {o: _stat(o) for o in outputs}
+        self.entries[input_path] = {
+            'sha256': self._digest(input_path, stat),
+            **stat,
+            'params': self.params,
+            'outputs': {o: {'sha256': self._digest(o, st), **st} for o, st in output_stats.items()},
+        }
+
+    def prune(self, existing_inputs: Iterable[str]) -> List[str]:
+
+        """
+        Forget inputs that no longer exist.
+
+        Parameters
+        ----------
+        existing_inputs : iterable of str
+            Inputs currently present.
+
+        Returns
+        -------
+        list of str
+            Outputs recorded for the forgotten inputs, so the caller can remove
+            stale derived files.
+        """
+
+        keep = set(existing_inputs)
+        stale_outputs = []
+        for input_path in [p for p in self.entries if p not in keep]:
+            stale_outputs.extend(self.entries.pop(input_path)['outputs'])
+
+        return stale_outputs
+
+    def save(self) -> None:
+
+        """Write the manifest atomically."""
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'stage': self.stage, 'entries': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
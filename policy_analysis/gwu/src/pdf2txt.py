@@ -26,33 +26,79 @@
 
 ### imports
 
-from logging_utils import get_logger
+import config
+
+from logging_utils import counters, get_logger
 logger = get_logger(__name__)
 
+from extract import extract_pdfs, summarize
+from manifest import Manifest
 import os
-import tika
-from tika import parser
-tika.TikaClientOnly = True
+import pandas as pd
+import time
+
+### utility functions #########################################################
+
+def txt_path(in_file_):
+
+    return out_dir + os.sep + os.path.splitext(os.path.basename(in_file_))[0] + '.txt'
 
 ### establish i/o locations ###################################################
 
 dat_dir = f'dat{os.sep}pdf'
 out_dir = f'dat{os.sep}txt'
+report_fname = f'out{os.sep}pdf2txt_report.csv'
+
+### extract pdfs concurrently to create text files ############################
+
+tic = time.time()
+
+# only re-extract pdfs that changed since the last run
+manifest = Manifest('pdf2txt')
+all_files = [dat_dir + os.sep + file for file in os.listdir(dat_dir)]
+for stale in manifest.prune(all_files):
+    if os.path.exists(stale):
+        os.remove(stale)
+        logger.info(f'Removed {stale}; its source pdf is gone.')
+in_files = [f for f in all_files if not manifest.is_current(f, [txt_path(f)])]
+logger.info(f'Skipping {len(all_files) - len(in_files)} unchanged files.')
 
-### cycle through pdfs to create text files ###################################
+logger.info(f'Parsing {len(in_files)} files with {config.PDF_WORKERS} workers '
+            f'across {len(config.TIKA_SERVER_ENDPOINTS)} Tika server(s) ...')
 
-for file in os.listdir(dat_dir):
+results = []
+for result in extract_pdfs(in_files):
 
+    results.append(result)
+    file = os.path.basename(result.path)
     logger.info('----------- -----------')
-    logger.info(f'Parsing {file} ...')
-    [stem, ext] = os.path.splitext(file)
-    in_file = dat_dir + os.sep + file
-    pdf_contents = parser.from_file(in_file, requestOptions={'timeout': 120})
-    preview = pdf_contents['content'][:100].replace('\n', ' ').strip()
+
+    counters.incr('pdfs_parsed' if result.ok else 'pdfs_failed')
+    if not result.ok:
+        logger.error(f'Failed to parse {file} after {result.seconds:.2f} s.: {result.error}')
+        continue
+
+    logger.info(f'Parsed {file} in {result.seconds:.2f} s.')
+    preview = result.text[:100].replace('\n', ' ').strip()
     logger.info(f'Preview: {preview} ...')
 
-    out_file = out_dir + os.sep + stem + '.txt'
+    out_file = txt_path(result.path)
 
     with open(out_file, 'w') as txt_file:
-        txt_file.write(pdf_contents['content'])
+        txt_file.write(result.text)
         logger.info(f'Wrote: {out_file}.')
+
+    manifest.record(result.path, [out_file])
+
+manifest.save()
+
+### summary report ############################################################
+
+summary = summarize(results, time.time() - tic)
+logger.info('----------- -----------')
+logger.info(f'Extraction summary: {summary}.')
+
+report = pd.DataFrame([{'File': os.path.basename(r.path), 'OK': r.ok, 'Seconds': round(r.seconds, 2),
+                        'Endpoint': r.endpoint, 'Error': r.error} for r in results])
+report.to_csv(report_fname, index=False)
+logger.info(f'Saved: {report_fname}.')
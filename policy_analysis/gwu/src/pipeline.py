@@ -0,0 +1,507 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+pipeline.py
+===========
+
+Run the policy-analysis scripts as one dependency graph.
+
+Every script is a :class:`Stage` that declares the files it reads
+(``inputs``), the modules it runs on (``code``) and the files it writes
+(``outputs``), as glob patterns relative to the project directory
+(``policy_analysis/gwu``). A stage depends on every stage whose outputs
+match one of its inputs, so the graph follows from the declarations in
+:data:`STAGES`.
+
+Before a stage runs, the digest of its inputs and code is compared with the
+one recorded after its last successful run; when both that digest and the
+digest of its outputs are unchanged, the stage is skipped. Stages whose
+dependencies have finished run concurrently in a pool of worker processes.
+Every stage run appends a record of its wall and CPU time, peak RSS, tracked
+phases and API and cache counters to :data:`config.METRICS_PATH` (see
+:func:`logging_utils.run_metrics`); the records of one pipeline run share a
+``run_id``.
+
+Example
+-------
+
+.. code-block:: python
+
+    from pipeline import run_pipeline, run_stage
+
+    results = run_pipeline()                    # the whole graph
+    results = run_pipeline(['embed'])           # embed and everything upstream of it
+    result = run_stage('cluster_project', force=True)  # one stage, in this process
+
+From the shell, with ``policy_analysis/gwu`` as the working directory::
+
+    python src/pipeline.py [stage ...]
+
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from fnmatch import fnmatch
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import uuid
+
+import config
+from logging_utils import get_logger, run_metrics
+from manifest import file_digest
+
+logger = get_logger(__name__)
+
+MANIFEST_DIR = config.MANIFEST_DIR
+PIPELINE_WORKERS = config.PIPELINE_WORKERS
+METRICS_PATH = config.METRICS_PATH
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+
+__all__ = ['Stage', 'StageResult', 'STAGES', 'dependencies', 'run_stage', 'run_pipeline']
+
+
+class Stage(NamedTuple):
+
+    """
+    One script of the pipeline.
+
+    Attributes
+    ----------
+    name : str
+        Stage name; the script is ``src/<name>.py``.
+    inputs : tuple of str
+        Glob patterns of the data files the stage reads.
+    outputs : tuple of str
+        Glob patterns of the files the stage writes.
+    code : tuple of str
+        Glob patterns of the modules, other than the script and
+        :mod:`config`, whose changes should rerun the stage.
+    """
+
+    name: str
+    inputs: Tuple[str, ...]
+    outputs: Tuple[str, ...]
+    code: Tuple[str, ...] = ()
+
+    @property
+    def script(self) -> str:
+        return os.path.join('src', f'{self.name}.py')
+
+
+class StageResult(NamedTuple):
+
+    """
+    Outcome of one stage in a run.
+
+    Attributes
+    ----------
+    name : str
+        Stage name.
+    status : str
+        ``'ran'``, ``'skipped'`` (inputs and outputs unchanged), ``'failed'``
+        or ``'blocked'`` (an upstream stage failed).
+    seconds : float
+        Wall-clock time of the stage.
+    error : str or None
+        Error description when the stage failed.
+    """
+
+    name: str
+    status: str
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+def _p(*parts: str) -> str:
+    return os.path.join(*parts)
+
+
+STAGES: Dict[str, Stage] = {s.name: s for s in [
+    Stage('pdf2txt',
+          inputs=(_p('dat', 'pdf', '*.pdf'),),
+          outputs=(_p('dat', 'txt', '*.txt'), _p('out', 'pdf2txt_report.csv')),
+          code=(_p('src', 'extract.py'), _p('src', 'manifest.py'))),
+    Stage('txt2chunk',
+          inputs=(_p('dat', 'txt', '*.txt'),),
+          outputs=(_p('dat', 'chunk', '*.csv'),),
+          code=(_p('src', 'chunking.py'), _p('src', 'manifest.py'))),
+    Stage('concat_csv',
+          inputs=(_p('dat', 'chunk', '*.csv'),),
+          outputs=(_p('dat', 'chunk', 'existing_policy_combined.csv'), _p('dat', 'chunk_parquet', '*')),
+          code=(_p('src', 'chunking.py'), _p('src', 'manifest.py'))),
+    Stage('lemmatize',
+          inputs=(_p('dat', 'chunk', 'existing_policy_combined.csv'),),
+          outputs=(_p('dat', 'existing_policy_lemmas.csv'),),
+          code=(_p('src', 'lemmatizer.py'), _p('src', 'keywords.py'))),
+    Stage('apply_keywords',
+          inputs=(_p('dat', 'chunk', 'existing_policy_combined.csv'),
+                  _p('dat', 'existing_policy_lemmas.csv')),
+          outputs=(_p('dat', 'existing_policy_keyword.csv'),
+                   _p('dat', 'existing_policy_keyword_incidence.npz'),
+                   _p('dat', 'existing_policy_keyword_incidence_vocab.txt'),
+                   _p('out', 'res', 'existing_policy_key_word_counts.csv')),
+          code=(_p('src', 'keywords.py'), _p('src', 'profiling.py'))),
+    Stage('embed',
+          inputs=(_p('dat', 'existing_policy_keyword.csv'),),
+          outputs=(_p('dat', 'existing_policy_keyword_embed.npy'),
+                   _p('dat', 'existing_policy_keyword_embed_meta.csv')),
+          code=(_p('src', 'embed_store.py'), _p('src', 'llms', '*.py'))),
+    Stage('reduce_embed',
+          inputs=(_p('dat', 'existing_policy_keyword_embed.npy'),
+                  _p('dat', 'existing_policy_keyword_embed_meta.csv')),
+          outputs=(_p('dat', 'existing_policy_keyword_embed_reduced.npy'),
+                   _p('dat', 'existing_policy_keyword_embed_reduced_meta.csv'),
+                   _p('dat', 'existing_policy_keyword_embed_projection.npz'),
+                   _p('out', 'res', 'reduction_report.csv')),
+          code=(_p('src', 'projection.py'), _p('src', 'embed_store.py'))),
+    Stage('cluster_project',
+          inputs=(_p('dat', 'existing_policy_keyword_embed.npy'),
+                  _p('dat', 'existing_policy_keyword_embed_meta.csv'),
+                  _p('dat', 'existing_policy_keyword_embed_reduced.npy')),
+          outputs=(_p('dat', 'existing_policy_keyword_embed_umap.csv'),
+                   _p('dat', 'existing_policy_keyword_embed_umap.joblib'),
+                   _p('out', 'res', 'doc_clus_legend.png'),
+                   _p('out', 'res', '*_unique_counts.csv')),
+          code=(_p('src', 'embed_store.py'), _p('src', 'umap_model.py'), _p('src', 'profiling.py'))),
+    Stage('render_clouds',
+          inputs=(_p('out', 'res', 'existing_policy_key_word_counts.csv'),
+                  _p('out', 'res', '*_unique_counts.csv')),
+          outputs=(_p('out', 'res', '*_key_word_cloud_hi_4k.png'),),
+          code=(_p('src', 'wordclouds.py'), _p('src', 'manifest.py'))),
+    Stage('similar_chunks',
+          inputs=(_p('dat', 'existing_policy_keyword_embed.npy'),
+                  _p('dat', 'existing_policy_keyword_embed_meta.csv'),
+                  _p('dat', 'existing_policy_keyword_embed_reduced.npy')),
+          outputs=(_p('dat', 'existing_policy_keyword_ann', '*'),
+                   _p('out', 'res', 'cross_policy_neighbors.csv'),
+                   _p('out', 'res', 'near_duplicate_chunks.csv')),
+          code=(_p('src', 'ann_index.py'), _p('src', 'embed_store.py'))),
+]}
+
+
+def _overlaps(a: str, b: str) -> bool:
+    return a == b or fnmatch(a, b) or fnmatch(b, a)
+
+
+def dependencies(stages: Dict[str, Stage] = STAGES) -> Dict[str, List[str]]:
+
+    """
+    Derive the dependency graph from the declared inputs and outputs.
+
+    Returns
+    -------
+    dict
+        Stage name -> names of the stages producing one of its inputs.
+    """
+
+    def feeds(t: Stage, i: str) -> bool:
+        # a file declared literally by one stage is not claimed by another stage's glob
+        return any(_overlaps(i, o) and (i == o or i not in _claimed(t, stages)) for o in t.outputs)
+
+    return {s.name: [t.name for t in stages.values() if t.name != s.name and any(feeds(t, i) for i in s.inputs)]
+            for s in stages.values()}
+
+
+def _upstream(targets: Iterable[str], deps: Dict[str, List[str]]) -> List[str]:
+
+    """Return ``targets`` and all their ancestors, in declaration order."""
+
+    keep, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in deps:
+            raise KeyError(f'Unknown stage {name!r}; expected one of {list(deps)}.')
+        if name not in keep:
+            keep.add(name)
+            todo.extend(deps[name])
+
+    return [name for name in deps if name in keep]
+
+
+def _expand(patterns: Iterable[str], exclude: Iterable[str] = ()) -> List[str]:
+
+    """Files matching ``patterns``, minus the files matching ``exclude``."""
+
+    excluded = {f for pattern in exclude for f in glob.glob(pattern)}
+
+    return sorted({f for pattern in patterns for f in glob.glob(pattern) if os.path.isfile(f)} - excluded)
+
+
+def _claimed(stage: Stage, stages: Dict[str, Stage]) -> List[str]:
+
+    """Literal outputs of other stages, which a glob of ``stage`` must not claim."""
+
+    return [o for t in stages.values() if t.name != stage.name for o in t.outputs if not glob.has_magic(o)]
+
+
+class _State:
+
+    """
+    Digests of each stage's inputs and outputs after its last successful run,
+    stored in ``<MANIFEST_DIR>/pipeline.json``. File hashes are memoized by
+    size and modification time, so unchanged files are not re-read.
+    """
+
+    def __init__(self, path: str):
+
+        self.path = path
+        self.stages, self.files = {}, {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.stages, self.files = saved.get('stages', {}), saved.get('files', {})
+
+    def digest(self, paths: Sequence[str]) -> str:
+
+        digest = hashlib.sha256()
+        for path in paths:
+            st = os.stat(path)
+            known = self.files.get(path)
+            if known is None or known[:2] != [st.st_size, st.st_mtime]:
+                known = self.files[path] = [st.st_size, st.st_mtime, file_digest(path)]
+            digest.update(f'{path}\0{known[2]}\0'.encode('utf-8'))
+
+        return digest.hexdigest()
+
+    def save(self) -> None:
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'stages': self.stages, 'files': self.files}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def _digests(stage: Stage, state: _State, stages: Dict[str, Stage]) -> Tuple[str, str]:
+
+    """Return the (inputs and code, outputs) digests of ``stage`` as the files are now."""
+
+    claimed = _claimed(stage, stages)
+    inputs = _expand(stage.inputs, exclude=stage.outputs)
+    code = _expand((stage.script, _p('src', 'config.py')) + stage.code)
+    outputs = _expand(stage.outputs, exclude=claimed)
+
+    return state.digest(inputs + code), state.digest(outputs)
+
+
+@contextmanager
+def _working_dir(path: str):
+
+    """Run the scripts from the project directory, with ``src`` importable."""
+
+    previous = os.getcwd()
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _run_script(script: str, root: str, name: str, run_id: str) -> float:
+
+    """
+    Execute one stage script as ``__main__``; runs in a worker process or in-process.
+
+    Appends the run's timings, peak RSS and counters to :data:`config.METRICS_PATH`.
+    """
+
+    tic = time.perf_counter()
+    with _working_dir(root), run_metrics(name, path=METRICS_PATH, run_id=run_id):
+        runpy.run_path(script, run_name='__main__')
+
+    return time.perf_counter() - tic
+
+
+def run_stage(name: str, *, force: bool = False, root: str = ROOT_DIR,
+              stages: Dict[str, Stage] = STAGES) -> StageResult:
+
+    """
+    Run one stage in the current process, unless it is up to date.
+
+    The script runs with the project directory as the working directory, so
+    this changes the process-wide working directory while the stage runs.
+
+    Parameters
+    ----------
+    name : str
+        Stage name, a key of ``stages``.
+    force : bool, optional
+        Run even if inputs and outputs are unchanged.
+    root : str, optional
+        Project directory. Defaults to the parent of ``src``.
+    stages : dict, optional
+        Stage declarations. Defaults to :data:`STAGES`.
+
+    Returns
+    -------
+    StageResult
+        ``'ran'`` or ``'skipped'``; an exception raised by the script is
+        propagated.
+    """
+
+    stage = stages[name]
+
+    with _working_dir(root):
+        state = _State(_p(MANIFEST_DIR, 'pipeline.json'))
+        inputs_digest, outputs_digest = _digests(stage, state, stages)
+        if not force and state.stages.get(name) == {'inputs': inputs_digest, 'outputs': outputs_digest}:
+            logger.info(f'{name}: inputs and outputs unchanged; skipped.')
+            return StageResult(name, 'skipped')
+
+    logger.info(f'{name}: running {stage.script} ...')
+    seconds = _run_script(stage.script, root, name, uuid.uuid4().hex[:12])
+
+    with _working_dir(root):
+        state = _State(_p(MANIFEST_DIR, 'pipeline.json'))  # another stage may have saved meanwhile
+        state.stages[name] = {'inputs': inputs_digest, 'outputs': _digests(stage, state, stages)[1]}
+        state.save()
+    logger.info(f'{name}: done in {seconds:.2f} s.')
+
+    return StageResult(name, 'ran', seconds)
+
+
+def run_pipeline(targets: Optional[Sequence[str]] = None, *, force: bool = False,
+                 max_workers: int = PIPELINE_WORKERS, root: str = ROOT_DIR,
+                 stages: Dict[str, Stage] = STAGES) -> Dict[str, StageResult]:
+
+    """
+    Run the stage graph, skipping up-to-date stages and running independent
+    stages concurrently.
+
+    Each stage runs in a worker process once all of its dependencies have
+    finished, so a stage sees the outputs its dependencies just wrote. When a
+    stage fails, the stages downstream of it are not run, but independent
+    branches still finish. Workers are started with the ``spawn`` method, so
+    a calling script needs the usual ``if __name__ == '__main__':`` guard.
+    A worker may run several stages one after another; each script is
+    re-executed by :mod:`runpy`, but the peak RSS in its metrics record is
+    the worker's high-water mark so far.
+
+    Parameters
+    ----------
+    targets : sequence of str, optional
+        Stages to bring up to date, together with everything upstream of
+        them. Defaults to every stage.
+    force : bool, optional
+        Run every selected stage even if it is up to date.
+    max_workers : int, optional
+        Stages run at the same time. Defaults to
+        :data:`config.PIPELINE_WORKERS`.
+    root : str, optional
+        Project directory. Defaults to the parent of ``src``.
+    stages : dict, optional
+        Stage declarations. Defaults to :data:`STAGES`.
+
+    Returns
+    -------
+    dict
+        Stage name -> :class:`StageResult`, in declaration order.
+
+    Raises
+    ------
+    RuntimeError
+        If any stage failed, after every runnable stage has finished.
+    """
+
+    tic = time.perf_counter()
+    run_id = uuid.uuid4().hex[:12]  # shared by the metrics records of this run
+    deps = dependencies(stages)
+    selected = _upstream(targets or list(stages), deps)
+    results: Dict[str, StageResult] = {}
+
+    with _working_dir(root):
+        state = _State(_p(MANIFEST_DIR, 'pipeline.json'))
+
+    with ProcessPoolExecutor(max_workers=max(max_workers, 1), mp_context=multiprocessing.get_context('spawn')) as pool:
+
+        running = {}  # future -> (stage name, inputs digest)
+
+        while len(results) < len(selected):
+
+            settled = len(results)
+            for name in selected:
+
+                busy = {n for n, _ in running.values()}
+                if name in results or name in busy or any(d not in results for d in deps[name]):
+                    continue
+                if any(results[d].status in ('failed', 'blocked') for d in deps[name]):
+                    results[name] = StageResult(name, 'blocked')
+                    logger.warning(f'{name}: blocked by a failed upstream stage.')
+                    continue
+
+                with _working_dir(root):
+                    inputs_digest, outputs_digest = _digests(stages[name], state, stages)
+                if not force and state.stages.get(name) == {'inputs': inputs_digest, 'outputs': outputs_digest}:
+                    results[name] = StageResult(name, 'skipped')
+                    logger.info(f'{name}: inputs and outputs unchanged; skipped.')
+                    continue
+
+                logger.info(f'{name}: running {stages[name].script} ...')
+                running[pool.submit(_run_script, stages[name].script, root, name, run_id)] = (name, inputs_digest)
+
+            if not running:
+                if len(results) == settled:
+                    raise RuntimeError(f'Stage dependencies form a cycle: {deps}')
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, inputs_digest = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception as err:
+                    results[name] = StageResult(name, 'failed', error=f'{type(err).__name__}: {err}')
+                    logger.error(f'{name}: failed: {err}')
+                    continue
+                with _working_dir(root):
+                    state.stages[name] = {'inputs': inputs_digest, 'outputs': _digests(stages[name], state, stages)[1]}
+                    state.save()
+                results[name] = StageResult(name, 'ran', seconds)
+                logger.info(f'{name}: done in {seconds:.2f} s.')
+
+    results = {name: results[name] for name in selected}
+    counts = {status: sum(r.status == status for r in results.values())
+              for status in ('ran', 'skipped', 'failed', 'blocked')}
+    logger.info(f'Pipeline finished in {time.perf_counter() - tic:.2f} s.: '
+                + ', '.join(f'{n} {status}' for status, n in counts.items()) + '.')
+
+    failed = [r for r in results.values() if r.status == 'failed']
+    if failed:
+        raise RuntimeError('Pipeline stages failed: ' + '; '.join(f'{r.name} ({r.error})' for r in failed))
+
+    return results
+
+
+if __name__ == '__main__':
+    run_pipeline(sys.argv[1:] or None)
@@ -0,0 +1,136 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+profiling.py
+============
+
+Keyword profiles of groups of policy documents, used by
+:mod:`cluster_project`.
+
+:func:`keyword_table` explodes the comma-separated ``Keywords`` column once
+and counts every (label, keyword) pair with one groupby, giving a label ×
+keyword count table. :func:`group_profiles` sums the rows of that table for
+each group declared in :data:`config.PROFILE_GROUPS`, so a group is a list of
+labels rather than code, and :func:`counts_frame` turns one profile into the
+``item,count`` table saved as ``<group>_unique_counts.csv``.
+
+Example
+-------
+
+.. code-block:: python
+
+    from profiling import counts_frame, group_profiles, keyword_table
+
+    table = keyword_table(meta)                  # label x keyword counts
+    for name, counts in group_profiles(table).items():
+        counts_frame(counts).to_csv(f'out/res/{name}_unique_counts.csv', index=False)
+
+"""
+
+from typing import Dict, Mapping, Sequence
+
+import pandas as pd
+
+import config
+
+PROFILE_GROUPS = config.PROFILE_GROUPS
+
+__all__ = ['keyword_table', 'group_profiles', 'counts_frame']
+
+
+def keyword_table(meta: pd.DataFrame, *, label_col: str = 'Type', keywords_col: str = 'Keywords') -> pd.DataFrame:
+
+    """
+    Count keyword occurrences per label in one pass.
+
+    Parameters
+    ----------
+    meta : pandas.DataFrame
+        One row per chunk. ``keywords_col`` holds either comma-separated
+        strings or lists of keywords; blanks and missing values are ignored.
+    label_col : str, optional
+        Column grouping the chunks, for example the document ``Type``.
+    keywords_col : str, optional
+        Column of chunk keywords.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Label × keyword counts, labels in order of first appearance and
+        keywords sorted.
+    """
+
+    keywords = meta[keywords_col]
+    if not keywords.map(lambda v: isinstance(v, list)).all():
+        keywords = keywords.fillna('').astype(str).str.split(',')
+
+    long = pd.DataFrame({'label': meta[label_col].to_numpy(), 'keyword': keywords.to_numpy()}).explode('keyword')
+    long['keyword'] = long['keyword'].astype(str).str.strip()
+    long = long[(long['keyword'] != '') & (long['keyword'] != 'nan')]
+
+    table = long.groupby(['label', 'keyword'], sort=False).size().unstack(fill_value=0)
+
+    return table.reindex(index=pd.unique(meta[label_col]), fill_value=0).sort_index(axis=1).astype(int)
+
+
+def group_profiles(table: pd.DataFrame, groups: Mapping[str, Sequence[str]] = PROFILE_GROUPS) -> Dict[str, pd.Series]:
+
+    """
+    Sum the keyword counts of the labels in each group.
+
+    Parameters
+    ----------
+    table : pandas.DataFrame
+        Label × keyword counts from :func:`keyword_table`.
+    groups : mapping, optional
+        Group name -> labels. Defaults to :data:`config.PROFILE_GROUPS`.
+
+    Returns
+    -------
+    dict
+        Group name -> keyword counts of the group, without zero counts.
+
+    Raises
+    ------
+    KeyError
+        If a group names a label missing from ``table``.
+    """
+
+    profiles = {}
+    for name, labels in groups.items():
+        missing = [label for label in labels if label not in table.index]
+        if missing:
+            raise KeyError(f'Profile group {name!r} names unknown labels: {missing}.')
+        counts = table.loc[list(labels)].sum(axis=0)
+        profiles[name] = counts[counts > 0]
+
+    return profiles
+
+
+def counts_frame(counts: pd.Series) -> pd.DataFrame:
+
+    """``item,count`` table of one profile, most frequent keywords first."""
+
+    frame = counts.rename_axis('item').reset_index(name='count')
+
+    return frame.sort_values(['count', 'item'], ascending=[False, True], kind='stable', ignore_index=True)
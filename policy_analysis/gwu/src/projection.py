@@ -0,0 +1,286 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+projection.py
+=============
+
+Dimensionality reduction of chunk embeddings for faster downstream work.
+
+:class:`Projection` maps ``p``-dimensional embeddings to ``dims`` dimensions
+in one of two ways:
+
+``'pca'``
+    Principal components fitted (randomized SVD) on a sample of rows. Works
+    for any embedding model, including ``text-embedding-ada-002``.
+``'truncate'``
+    Keep the leading ``dims`` coordinates. Only meaningful for models trained
+    with Matryoshka representation learning (``text-embedding-3-*``), whose
+    shortened vectors are themselves valid embeddings.
+
+``'auto'`` picks ``'truncate'`` for those models and ``'pca'`` otherwise.
+Projected rows are L2-normalized for cosine similarity, and all-zero rows
+(chunks without keywords) stay zero. :meth:`Projection.retained_variance`
+and :func:`knn_recall` measure what the reduction costs.
+
+The projection is saved as one ``.npz`` file, so new chunks can be mapped
+into the same space later.
+
+Example
+-------
+
+.. code-block:: python
+
+    from projection import Projection, knn_recall
+
+    proj = Projection(dims=256).fit(X)
+    Z = proj.transform(X)
+    print(proj.retained_variance, knn_recall(X, Z, k=10))
+    proj.save('dat/existing_policy_keyword_embed_projection.npz')
+
+"""
+
+import json
+
+import numpy as np
+from sklearn.decomposition import PCA
+
+import config
+
+SEED = config.SEED
+EMBEDDING_MODEL = config.EMBEDDING_MODEL
+REDUCE_METHOD = config.REDUCE_METHOD
+REDUCE_DIMS = config.REDUCE_DIMS
+REDUCE_FIT_ROWS = config.REDUCE_FIT_ROWS
+ANN_K = config.ANN_K
+
+MATRYOSHKA_MODELS = ('text-embedding-3-small', 'text-embedding-3-large')
+
+__all__ = ['Projection', 'knn_recall', 'MATRYOSHKA_MODELS']
+
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+
+    """L2-normalize rows as float32, leaving all-zero rows at zero."""
+
+    X = np.asarray(X, dtype=np.float32)
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+
+    return X / np.where(norms == 0, 1, norms)
+
+
+class Projection:
+
+    """
+    Fitted linear map from full to reduced embeddings.
+
+    Parameters
+    ----------
+    dims : int, optional
+        Output dimensions. Defaults to :data:`config.REDUCE_DIMS`.
+    method : str, optional
+        ``'pca'``, ``'truncate'`` or ``'auto'``. Defaults to
+        :data:`config.REDUCE_METHOD`.
+    model : str, optional
+        Embedding model, used by ``'auto'``. Defaults to
+        :data:`config.EMBEDDING_MODEL`.
+    seed : int, optional
+        Random state of row sampling and the randomized SVD. Defaults to
+        :data:`config.SEED`.
+
+    Attributes
+    ----------
+    mean : numpy.ndarray
+        ``(p,)`` mean removed before projecting (zeros for truncation).
+    components : numpy.ndarray or None
+        ``(dims, p)`` principal axes; ``None`` for truncation.
+    variance_ratio : numpy.ndarray
+        Share of the total variance of the fitted sample captured by each
+        output dimension.
+    """
+
+    def __init__(self, dims: int = REDUCE_DIMS, method: str = REDUCE_METHOD, *,
+                 model: str = EMBEDDING_MODEL, seed: int = SEED):
+
+        if method == 'auto':
+            method = 'truncate' if model in MATRYOSHKA_MODELS else 'pca'
+        if method not in ('pca', 'truncate'):
+            raise ValueError(f"method must be 'pca', 'truncate' or 'auto', not {method!r}.")
+
+        self.dims = dims
+        self.method = method
+        self.seed = seed
+        self.mean = self.components = self.variance_ratio = None
+
+    @property
+    def retained_variance(self) -> float:
+
+        """Share of the variance kept by the reduction, in ``[0, 1]``."""
+
+        return float(np.sum(self.variance_ratio))
+
+    def fit(self, X: np.ndarray, *, max_rows: int = REDUCE_FIT_ROWS) -> 'Projection':
+
+        """
+        Fit on ``X``, or on a random sample of ``max_rows`` of its nonzero rows.
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            ``(N, p)`` embeddings; may be a memory map.
+        max_rows : int, optional
+            Rows used for fitting. Defaults to :data:`config.REDUCE_FIT_ROWS`.
+
+        Returns
+        -------
+        Projection
+            ``self``.
+        """
+
+        if not 0 < self.dims < X.shape[1]:
+            raise ValueError(f'dims must be between 1 and {X.shape[1] - 1}, not {self.dims}.')
+
+        rows = np.flatnonzero(np.abs(np.asarray(X)).sum(axis=1) > 0)
+        if len(rows) > max_rows:
+            rows = np.sort(np.random.default_rng(self.seed).choice(rows, max_rows, replace=False))
+        sample = _normalize(X[rows])
+
+        if self.method == 'pca':
+            pca = PCA(n_components=min(self.dims, len(rows)), svd_solver='randomized', random_state=self.seed)
+            pca.fit(sample)
+            self.mean = pca.mean_.astype(np.float32)
+            self.components = pca.components_.astype(np.float32)
+            self.variance_ratio = pca.explained_variance_ratio_
+        else:
+            variance = sample.var(axis=0)
+            self.mean = np.zeros(X.shape[1], dtype=np.float32)
+            self.components = None
+            self.variance_ratio = variance[:self.dims] / variance.sum()
+
+        return self
+
+    def transform(self, X: np.ndarray, *, block_rows: int = 65536) -> np.ndarray:
+
+        """
+        Project and L2-normalize rows, ``block_rows`` at a time.
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            ``(N, p)`` embeddings with the ``p`` the projection was fitted on.
+
+        Returns
+        -------
+        numpy.ndarray
+            ``(N, dims)`` float32 matrix; all-zero input rows stay zero.
+        """
+
+        out = np.zeros((X.shape[0], self.dims), dtype=np.float32)
+
+        for start in range(0, X.shape[0], block_rows):
+            block = _normalize(X[start:start + block_rows])
+            if self.components is None:
+                Z = block[:, :self.dims]
+            else:
+                Z = (block - self.mean) @ self.components.T
+            Z[~block.any(axis=1)] = 0
+            out[start:start + len(block), :Z.shape[1]] = _normalize(Z)
+
+        return out
+
+    def save(self, fname: str) -> None:
+
+        """Write the projection to one ``.npz`` file."""
+
+        params = {'dims': self.dims, 'method': self.method, 'seed': self.seed}
+        arrays = {'mean': self.mean, 'variance_ratio': self.variance_ratio}
+        if self.components is not None:
+            arrays['components'] = self.components
+        np.savez(fname, params=np.array(json.dumps(params)), **arrays)
+
+    @classmethod
+    def load(cls, fname: str) -> 'Projection':
+
+        """Open a projection written by :meth:`save`."""
+
+        with np.load(fname) as f:
+            params = json.loads(str(f['params']))
+            proj = cls(params['dims'], params['method'], seed=params['seed'])
+            proj.mean = f['mean']
+            proj.variance_ratio = f['variance_ratio']
+            proj.components = f['components'] if 'components' in f.files else None
+
+        return proj
+
+
+def knn_recall(X: np.ndarray, Z: np.ndarray, *, k: int = ANN_K, n_queries: int = 1000,
+               seed: int = SEED, block_rows: int = 65536) -> float:
+
+    """
+    Measure how well the reduced space preserves cosine nearest neighbours.
+
+    For a sample of query rows, the exact ``k`` nearest neighbours are found
+    in both spaces and the average overlap is returned.
+
+    Parameters
+    ----------
+    X, Z : numpy.ndarray
+        Full and reduced embeddings of the same rows.
+    k : int, optional
+        Neighbours compared per query. Defaults to :data:`config.ANN_K`.
+    n_queries : int, optional
+        Query rows sampled among the nonzero rows.
+    seed : int, optional
+        Random state of the query sample.
+    block_rows : int, optional
+        Rows compared per matrix product.
+
+    Returns
+    -------
+    float
+        Mean recall@k of the reduced neighbours, in ``[0, 1]``.
+    """
+
+    rows = np.flatnonzero(np.abs(np.asarray(Z)).sum(axis=1) > 0)
+    if len(rows) > n_queries:
+        rows = np.sort(np.random.default_rng(seed).choice(rows, n_queries, replace=False))
+    k = min(k, X.shape[0] - 1)
+    if not len(rows) or k < 1:
+        return float('nan')
+
+    def neighbours(M: np.ndarray) -> np.ndarray:
+        Q = _normalize(M[rows])
+        best = np.full((len(rows), k), -np.inf, dtype=np.float32)
+        ids = np.zeros((len(rows), k), dtype=np.int64)
+        for start in range(0, M.shape[0], block_rows):
+            sims = Q @ _normalize(M[start:start + block_rows]).T
+            block_ids = np.arange(start, start + sims.shape[1])
+            sims[block_ids[None, :] == rows[:, None]] = -np.inf  # a row is not its own neighbour
+            sims = np.concatenate([best, sims], axis=1)
+            cand = np.concatenate([ids, np.broadcast_to(block_ids, (len(rows), len(block_ids)))], axis=1)
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+            best, ids = np.take_along_axis(sims, top, axis=1), np.take_along_axis(cand, top, axis=1)
+        return ids
+
+    full, reduced = neighbours(X), neighbours(Z)
+
+    return float(np.mean([len(set(a) & set(b)) / k for a, b in zip(full, reduced)]))
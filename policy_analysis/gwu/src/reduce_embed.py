@@ -0,0 +1,110 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Python 3.10
+# (.venv) patrickh@patrickh-lambda-workstation:~/Workspace/gwsb_caio/policy_analysis/gwu$ 
+# /home/patrickh/Workspace/gwsb_caio/.venv/bin/python 
+# /home/patrickh/Workspace/gwsb_caio/policy_analysis/gwu/src/reduce_embed.py
+
+### imports and configs #######################################################
+
+import config
+
+from logging_utils import get_logger, track
+logger = get_logger(__name__)
+
+from embed_store import load_embeddings
+import numpy as np
+import os
+import pandas as pd
+from projection import Projection, knn_recall
+import time
+
+REDUCE_DIMS = config.REDUCE_DIMS
+K = config.ANN_K
+
+all_prefix = f'dat{os.sep}existing_policy_keyword_embed'
+reduced_prefix = f'{all_prefix}_reduced'
+proj_fname = f'{all_prefix}_projection.npz'
+report_fname = f'out{os.sep}res{os.sep}reduction_report.csv'
+
+tic = time.time()
+
+if not REDUCE_DIMS:
+
+    # disabled: drop stale outputs so downstream stages read the full matrix
+    logger.info('REDUCE_DIMS is 0; embeddings are not reduced.')
+    for fname in (f'{reduced_prefix}.npy', f'{reduced_prefix}_meta.csv', proj_fname):
+        if os.path.exists(fname):
+            os.remove(fname)
+            logger.info(f'Removed: {fname}.')
+
+else:
+
+    ### load data #############################################################
+
+    meta, X = load_embeddings(all_prefix)
+    logger.info(f'Loaded: {all_prefix} ({X.shape[0]} x {X.shape[1]}).')
+
+    ### fit and apply projection ##############################################
+
+    logger.info('----------- -----------')
+    with track('fit'):
+        proj = Projection(REDUCE_DIMS).fit(X)
+    logger.info(f'Fitted {proj.method} projection to {proj.dims} dims; '
+                f'retained variance: {proj.retained_variance:.4f}.')
+    proj.save(proj_fname)
+    logger.info(f'Saved: {proj_fname}.')
+
+    with track('transform'):
+        Z = proj.transform(X)
+
+    # same layout as the full embeddings, so load_embeddings() reads both
+    tmp_fname = f'{reduced_prefix}.npy.tmp'
+    with open(tmp_fname, 'wb') as f:
+        np.save(f, Z)
+    os.replace(tmp_fname, f'{reduced_prefix}.npy')
+    meta.to_csv(f'{reduced_prefix}_meta.csv', index=False)
+    logger.info(f'Saved: {reduced_prefix} ({Z.shape[0]} x {Z.shape[1]}).')
+
+    ### measure quality loss ##################################################
+
+    logger.info('----------- -----------')
+    logger.info(f'Comparing {K} nearest neighbours in full and reduced space ...')
+
+    with track('recall'):
+        recall = knn_recall(X, Z, k=K)
+    logger.info(f'Recall@{K} of reduced neighbours: {recall:.4f}.')
+
+    report = pd.DataFrame([{
+        'Method': proj.method,
+        'Input_Dims': X.shape[1],
+        'Dims': proj.dims,
+        'Retained_Variance': proj.retained_variance,
+        f'Recall_at_{K}': recall,
+    }])
+    report.to_csv(report_fname, index=False)
+    logger.info(f'Saved: {report_fname}.')
+
+# end timer
+toc = time.time() - tic
+logger.info(f'All tasks performed in {toc:.2f} s.')
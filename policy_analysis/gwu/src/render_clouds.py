@@ -0,0 +1,74 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Python 3.10
+# (.venv) patrickh@patrickh-lambda-workstation:~/Workspace/gwsb_caio/policy_analysis/gwu$ 
+# /home/patrickh/Workspace/gwsb_caio/.venv/bin/python 
+# /home/patrickh/Workspace/gwsb_caio/policy_analysis/gwu/src/render_clouds.py
+
+### imports and configs #######################################################
+
+import config
+
+from logging_utils import get_logger, track
+logger = get_logger(__name__)
+
+import os
+import time
+from wordclouds import CloudJob, render_clouds
+
+PROFILE_GROUPS = config.PROFILE_GROUPS
+WORDCLOUD_WORKERS = config.WORDCLOUD_WORKERS
+
+if __name__ == '__main__':  # worker processes re-import this script under spawn
+
+    tic = time.time()
+
+    ### list clouds ###########################################################
+
+    res_dir = f'out{os.sep}res'
+
+    # all keywords (apply_keywords.py) and each profile group (cluster_project.py)
+    jobs = [CloudJob(f'{res_dir}{os.sep}existing_policy_key_word_counts.csv',
+                     f'{res_dir}{os.sep}existing_policy_key_word_cloud_hi_4k.png', max_words=100)]
+    jobs += [CloudJob(f'{res_dir}{os.sep}{name}_unique_counts.csv',
+                      f'{res_dir}{os.sep}{name}_unique_key_word_cloud_hi_4k.png', max_words=200)
+             for name in PROFILE_GROUPS]
+
+    missing = [job.counts for job in jobs if not os.path.exists(job.counts)]
+    if missing:
+        logger.warning(f'No count table for {len(missing)} clouds; run apply_keywords.py and '
+                       f'cluster_project.py first: {missing}.')
+        jobs = [job for job in jobs if job.counts not in missing]
+
+    ### render ################################################################
+
+    logger.info(f'Rendering {len(jobs)} word clouds with {WORDCLOUD_WORKERS} workers ...')
+
+    with track('render'):
+        statuses = render_clouds(jobs)
+    for image, status in statuses:
+        logger.info(f'{status.capitalize()}: {image}.')
+
+    # end timer
+    toc = time.time() - tic
+    logger.info(f'All tasks performed in {toc:.2f} s.')
@@ -0,0 +1,106 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Python 3.10
+# (.venv) patrickh@patrickh-lambda-workstation:~/Workspace/gwsb_caio/policy_analysis/gwu$ 
+# /home/patrickh/Workspace/gwsb_caio/.venv/bin/python 
+# /home/patrickh/Workspace/gwsb_caio/policy_analysis/gwu/src/similar_chunks.py
+
+### imports and configs #######################################################
+
+import config
+
+from logging_utils import get_logger, track
+logger = get_logger(__name__)
+
+from ann_index import IVFIndex
+from embed_store import load_embeddings
+import numpy as np
+import os
+import pandas as pd
+import time
+
+K = config.ANN_K
+DUPLICATE_SIMILARITY = config.DUPLICATE_SIMILARITY
+
+tic = time.time()
+
+### load data #################################################################
+
+all_prefix = f'dat{os.sep}existing_policy_keyword_embed' + ('_reduced' if config.REDUCE_DIMS else '')
+meta, X = load_embeddings(all_prefix)
+logger.info(f'Loaded: {all_prefix} ({X.shape[0]} x {X.shape[1]}).')
+
+### build and save index ######################################################
+
+logger.info('----------- -----------')
+logger.info('Building nearest-neighbour index ...')
+
+with track('index'):
+    index = IVFIndex().build(X)
+index_dir = f'dat{os.sep}existing_policy_keyword_ann'
+index.save(index_dir)
+logger.info(f'Indexed {len(index)} chunks in {index.n_lists} lists; probing {index.n_probe}.')
+logger.info(f'Saved: {index_dir}.')
+
+### neighbours of every chunk #################################################
+
+logger.info('----------- -----------')
+logger.info(f'Finding {K} nearest neighbours of every chunk ...')
+
+with track('self_join'):
+    nbr_ids, nbr_sims = index.self_join(k=K)
+types = meta['Type'].to_numpy()
+has_embedding = np.abs(np.asarray(X)).sum(axis=1) > 0  # empty keyword strings were embedded as zeros
+
+# closest chunk from a different policy document
+other = (nbr_ids >= 0) & (types[np.maximum(nbr_ids, 0)] != types[:, None]) & has_embedding[:, None]
+first = np.where(other.any(axis=1), other.argmax(axis=1), -1)
+rows = np.flatnonzero(first >= 0)
+best = nbr_ids[rows, first[rows]]
+cross = pd.DataFrame({
+    'Type': types[rows],
+    'ID': meta['ID'].to_numpy()[rows],
+    'Neighbor_Type': types[best],
+    'Neighbor_ID': meta['ID'].to_numpy()[best],
+    'Similarity': nbr_sims[rows, first[rows]],
+}).sort_values('Similarity', ascending=False)
+
+cross_fname = f'out{os.sep}res{os.sep}cross_policy_neighbors.csv'
+cross.to_csv(cross_fname, index=False)
+logger.info(f'Saved: {cross_fname}.')
+
+# near-duplicate pairs, each reported once
+i, j = np.nonzero((nbr_sims >= DUPLICATE_SIMILARITY) & has_embedding[:, None])
+pairs = {(min(a, b), max(a, b)): s for a, b, s in zip(i, nbr_ids[i, j], nbr_sims[i, j]) if has_embedding[b]}
+dupes = pd.DataFrame([(types[a], meta['ID'].iat[a], types[b], meta['ID'].iat[b], s) for (a, b), s in pairs.items()],
+                     columns=['Type', 'ID', 'Neighbor_Type', 'Neighbor_ID', 'Similarity'])
+
+dupes_fname = f'out{os.sep}res{os.sep}near_duplicate_chunks.csv'
+dupes.sort_values('Similarity', ascending=False).to_csv(dupes_fname, index=False)
+logger.info(f'{len(dupes)} chunk pairs with similarity >= {DUPLICATE_SIMILARITY}, '
+            f'{(dupes["Type"] != dupes["Neighbor_Type"]).sum()} across policies.')
+logger.info(f'Saved: {dupes_fname}.')
+
+# end timer
+toc = time.time() - tic
+logger.info(f'All tasks performed in {toc:.2f} s.')
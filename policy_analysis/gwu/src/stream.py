@@ -0,0 +1,415 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+stream.py
+=========
+
+Streaming mode: PDF to tagged chunk records without intermediate files.
+
+Each step is a generator over records, so documents flow through one at a
+time and memory stays bounded by the number of documents in flight, not by
+the corpus:
+
+``extract_documents`` / ``read_documents``
+    Yield ``(name, text)`` per PDF (through Tika, with at most ``workers +
+    ahead`` files in flight) or per text file, in input order.
+``chunk_documents``
+    Clean and chunk each document with :mod:`chunking` into ``Type, ID,
+    Text`` records, by words or model tokens as :data:`config.CHUNK_MODE`
+    selects.
+``lemmatize_records``
+    Add a ``Lemmas`` field with a pluggable ``text -> text`` function such
+    as :func:`lemmatizer.normalize`.
+``tag_records``
+    Add a ``Keywords`` field with a :class:`keywords.KeywordTagger`.
+``prefetch``
+    Run an upstream generator in a background thread behind a bounded
+    queue, so the next document is extracted while the current one is
+    chunked and tagged.
+
+Records only materialize at a sink: :func:`to_csv` appends them to a CSV in
+blocks of rows and :func:`to_list` collects them. :func:`stream_keywords`
+chains the steps in the order of the batch scripts :mod:`pdf2txt`,
+:mod:`txt2chunk`, :mod:`concat_csv` and :mod:`apply_keywords`.
+
+Example
+-------
+
+.. code-block:: python
+
+    from lemmatizer import normalize
+    import stream
+
+    records = stream.stream_keywords(stream.extract_documents(pdf_paths), lemmatize=normalize)
+    stream.to_csv(records, 'dat/existing_policy_keyword.csv')
+
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+import config
+from chunking import COLS, chunk_words, clean_lines, token_windows
+from extract import extract_pdf
+from keywords import KEYWORD_LIST, KeywordTagger
+from logging_utils import get_logger
+
+logger = get_logger(__name__)
+
+CHUNK_MODE = config.CHUNK_MODE
+MODEL = config.REMOTE_MODEL
+PDF_WORKERS = config.PDF_WORKERS
+TIKA_SERVER_ENDPOINTS = config.TIKA_SERVER_ENDPOINTS
+TIKA_TIMEOUT = config.TIKA_TIMEOUT
+STREAM_PREFETCH = config.STREAM_PREFETCH
+STREAM_SINK_ROWS = config.STREAM_SINK_ROWS
+
+KEYWORD_COLS = COLS + ['Keywords']
+
+Record = Dict[str, object]
+
+__all__ = ['KEYWORD_COLS', 'extract_documents', 'read_documents', 'chunk_documents', 'lemmatize_records',
+           'tag_records', 'prefetch', 'stream_keywords', 'to_csv', 'to_list']
+
+_DONE = object()
+
+
+def _stem(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def extract_documents(paths: Sequence[str], *, workers: int = PDF_WORKERS, ahead: int = STREAM_PREFETCH,
+                      endpoints: Sequence[str] = TIKA_SERVER_ENDPOINTS,
+                      timeout: float = TIKA_TIMEOUT) -> Iterator[Tuple[str, str]]:
+
+    """
+    Extract PDFs through Tika and yield their text in input order.
+
+    Unlike :func:`extract.extract_pdfs`, only ``workers + ahead`` files are
+    submitted at a time, so extracted texts do not pile up when downstream
+    steps are slower than extraction. Failed files are logged and skipped.
+
+    Parameters
+    ----------
+    paths : sequence of str
+        PDFs to parse.
+    workers : int, optional
+        Concurrent extractions. Defaults to :data:`config.PDF_WORKERS`.
+    ahead : int, optional
+        Extra files submitted beyond ``workers``. Defaults to
+        :data:`config.STREAM_PREFETCH`.
+    endpoints, timeout
+        As for :func:`extract.extract_pdfs`.
+
+    Yields
+    ------
+    tuple of (str, str)
+        Document name (file stem) and extracted text.
+    """
+
+    workers = max(1, min(workers, len(paths) or 1))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+
+        pending = deque()
+        for i, path in enumerate(paths):
+
+            pending.append(pool.submit(extract_pdf, path, endpoint=endpoints[i % len(endpoints)], timeout=timeout))
+            if len(pending) < workers + ahead:
+                continue
+
+            result = pending.popleft().result()
+            if result.ok:
+                yield _stem(result.path), result.text
+            else:
+                logger.error(f'Failed to parse {result.path}: {result.error}')
+
+        while pending:
+            result = pending.popleft().result()
+            if result.ok:
+                yield _stem(result.path), result.text
+            else:
+                logger.error(f'Failed to parse {result.path}: {result.error}')
+
+
+def read_documents(paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+
+    """Yield ``(name, text)`` for UTF-8 text files, for example ``dat/txt/*.txt``."""
+
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield _stem(path), f.read()
+
+
+def chunk_documents(documents: Iterable[Tuple[str, str]], *, mode: str = CHUNK_MODE,
+                    length: Optional[int] = None, overlap: Optional[int] = None,
+                    encoding=None) -> Iterator[Record]:
+
+    """
+    Chunk documents into ``Type, ID, Text`` records.
+
+    Text is cleaned with :func:`chunking.clean_lines` and chunked exactly as
+    :mod:`txt2chunk` chunks files, so streaming and batch runs produce the
+    same chunks.
+
+    Parameters
+    ----------
+    documents : iterable of (str, str)
+        Document names and texts.
+    mode : str, optional
+        ``'words'`` or ``'tokens'``. Defaults to :data:`config.CHUNK_MODE`.
+    length, overlap : int, optional
+        Chunk size and overlap in words or tokens; default to the
+        :mod:`chunking` settings of ``mode``.
+    encoding : tiktoken.Encoding, optional
+        Encoding for ``'tokens'`` mode. Defaults to that of
+        :data:`config.REMOTE_MODEL`, as in :mod:`txt2chunk`.
+
+    Yields
+    ------
+    dict
+        One record per chunk.
+    """
+
+    if mode == 'tokens' and encoding is None:
+        import tiktoken
+        encoding = tiktoken.encoding_for_model(MODEL)
+
+    kwargs = {k: v for k, v in (('length', length), ('overlap', overlap)) if v is not None}
+
+    for name, text in documents:
+
+        words = clean_lines(io.StringIO(text, newline=None))  # lines as a text file would yield them
+
+        if mode == 'tokens':
+            windows = token_windows(encoding.encode_ordinary(' '.join(words)), **kwargs)
+            texts = [t.strip() for t in encoding.decode_batch(windows)]
+        else:
+            texts = chunk_words(words, **kwargs)
+
+        for i, chunk in enumerate(texts, start=1):
+            yield {'Type': name, 'ID': i, 'Text': chunk}
+
+
+def lemmatize_records(records: Iterable[Record],
+                      lemmatize: Optional[Callable[[str], str]] = None) -> Iterator[Record]:
+
+    """
+    Add a ``Lemmas`` field to each record.
+
+    Parameters
+    ----------
+    records : iterable of dict
+        Records with a ``Text`` field.
+    lemmatize : callable, optional
+        Maps a chunk text to the normalized text that keywords are matched
+        against. When omitted, ``Lemmas`` is a copy of ``Text``.
+
+    Yields
+    ------
+    dict
+        The input records, updated in place.
+    """
+
+    for record in records:
+        record['Lemmas'] = record['Text'] if lemmatize is None else lemmatize(record['Text'])
+        yield record
+
+
+def tag_records(records: Iterable[Record], tagger: Optional[KeywordTagger] = None) -> Iterator[Record]:
+
+    """
+    Add a ``Keywords`` field, the comma-separated keywords found in ``Lemmas``
+    (or ``Text`` when there is no ``Lemmas`` field), as :mod:`apply_keywords`
+    writes it.
+
+    Parameters
+    ----------
+    records : iterable of dict
+        Chunk records.
+    tagger : KeywordTagger, optional
+        Defaults to a tagger over :data:`keywords.KEYWORD_LIST`.
+
+    Yields
+    ------
+    dict
+        The input records, updated in place.
+    """
+
+    tagger = tagger or KeywordTagger(KEYWORD_LIST)
+
+    for record in records:
+        record['Keywords'] = ', '.join(tagger.tag(record.get('Lemmas', record['Text'])))
+        yield record
+
+
+def prefetch(iterable: Iterable, size: int = STREAM_PREFETCH) -> Iterator:
+
+    """
+    Consume ``iterable`` in a background thread, at most ``size`` items ahead.
+
+    Exceptions raised upstream are re-raised in the consumer. If the consumer
+    stops early, the producer thread stops at its next item.
+
+    Parameters
+    ----------
+    iterable : iterable
+        Upstream generator, typically :func:`extract_documents`.
+    size : int, optional
+        Queue capacity. Defaults to :data:`config.STREAM_PREFETCH`.
+
+    Yields
+    ------
+    object
+        Items of ``iterable``, in order.
+    """
+
+    items = queue.Queue(maxsize=max(size, 1))
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as err:  # hand the error to the consumer
+            put((_DONE, err))
+
+    thread = threading.Thread(target=produce, name='stream-prefetch', daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item, err = items.get()
+            if item is _DONE:
+                if err is not None:
+                    raise err
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def stream_keywords(documents: Iterable[Tuple[str, str]], *, lemmatize: Optional[Callable[[str], str]] = None,
+                    tagger: Optional[KeywordTagger] = None, ahead: int = STREAM_PREFETCH,
+                    **chunk_kwargs) -> Iterator[Record]:
+
+    """
+    Chain chunking, lemmatization and keyword tagging over ``documents``.
+
+    Parameters
+    ----------
+    documents : iterable of (str, str)
+        Usually :func:`extract_documents` or :func:`read_documents`; they are
+        read in a background thread, up to ``ahead`` documents ahead.
+    lemmatize : callable, optional
+        Passed to :func:`lemmatize_records`.
+    tagger : KeywordTagger, optional
+        Passed to :func:`tag_records`.
+    ahead : int, optional
+        Documents buffered by :func:`prefetch`; ``0`` reads them in the
+        calling thread. Defaults to :data:`config.STREAM_PREFETCH`.
+    **chunk_kwargs
+        Passed to :func:`chunk_documents`.
+
+    Yields
+    ------
+    dict
+        Records with ``Type``, ``ID``, ``Text``, ``Lemmas`` and ``Keywords``.
+    """
+
+    if ahead > 0:
+        documents = prefetch(documents, ahead)
+
+    return tag_records(lemmatize_records(chunk_documents(documents, **chunk_kwargs), lemmatize), tagger)
+
+
+def to_csv(records: Iterable[Record], path: str, *, columns: Sequence[str] = KEYWORD_COLS,
+           rows: int = STREAM_SINK_ROWS) -> int:
+
+    """
+    Write records to a CSV, ``rows`` at a time.
+
+    The file is written to ``<path>.tmp`` and moved into place when the stream
+    ends, so readers never see a partial file.
+
+    Parameters
+    ----------
+    records : iterable of dict
+        Records to write; fields outside ``columns`` are dropped.
+    path : str
+        Output CSV.
+    columns : sequence of str, optional
+        Columns to write, in order. Defaults to :data:`KEYWORD_COLS`, the
+        layout of ``dat/existing_policy_keyword.csv``.
+    rows : int, optional
+        Records buffered per write. Defaults to :data:`config.STREAM_SINK_ROWS`.
+
+    Returns
+    -------
+    int
+        Number of records written.
+    """
+
+    tmp_path = path + '.tmp'
+    n, block = 0, []
+
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+
+        pd.DataFrame(columns=list(columns)).to_csv(f, index=False)
+        for record in records:
+            block.append(record)
+            if len(block) >= rows:
+                pd.DataFrame(block, columns=list(columns)).to_csv(f, index=False, header=False)
+                n, block = n + len(block), []
+        if block:
+            pd.DataFrame(block, columns=list(columns)).to_csv(f, index=False, header=False)
+            n += len(block)
+
+    os.replace(tmp_path, path)
+
+    return n
+
+
+def to_list(records: Iterable[Record]) -> List[Record]:
+
+    """Collect records in memory, for tests and small corpora."""
+
+    return list(records)
@@ -0,0 +1,69 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+# Python 3.10
+# (.venv) patrickh@patrickh-lambda-workstation:~/Workspace/gwsb_caio/policy_analysis/gwu$ 
+# /home/patrickh/Workspace/gwsb_caio/.venv/bin/python 
+# /home/patrickh/Workspace/gwsb_caio/policy_analysis/gwu/src/stream_pdf2keyword.py
+
+# Streaming alternative to pdf2txt -> txt2chunk -> concat_csv -> apply_keywords:
+# documents flow from Tika straight to dat/existing_policy_keyword.csv without
+# writing dat/txt, dat/chunk or the combined chunk file.
+
+### imports and configs #######################################################
+
+import config
+
+from logging_utils import get_logger
+logger = get_logger(__name__)
+
+from lemmatizer import normalize
+import os
+import stream
+import time
+
+STREAM_SOURCE = config.STREAM_SOURCE
+
+tic = time.time()
+
+### establish i/o locations ###################################################
+
+dat_dir = f'dat{os.sep}pdf' if STREAM_SOURCE == 'pdf' else f'dat{os.sep}txt'
+in_files = sorted(dat_dir + os.sep + file for file in os.listdir(dat_dir))
+out_fname = f'dat{os.sep}existing_policy_keyword.csv'
+
+### stream documents to tagged chunks #########################################
+
+logger.info(f'Streaming {len(in_files)} files from {dat_dir} ...')
+
+if STREAM_SOURCE == 'pdf':
+    documents = stream.extract_documents(in_files)
+else:
+    documents = stream.read_documents(in_files)
+
+n_rows = stream.to_csv(stream.stream_keywords(documents, lemmatize=normalize), out_fname)
+logger.info(f'Saved: {out_fname} ({n_rows} chunks).')
+
+# end timer
+toc = time.time() - tic
+logger.info(f'All tasks performed in {toc:.2f} s.')
@@ -30,28 +30,23 @@ import config
 from logging_utils import get_logger
 logger = get_logger(__name__)
 
+from chunking import chunk_file, chunk_token_files
+from manifest import Manifest
 import os
-import pandas as pd
-import re
 import tiktoken
 
 MODEL = config.REMOTE_MODEL
+MODE = config.CHUNK_MODE
 LENGTH = config.CHUNK_LENGTH
-OVERLAP = 16
-MIN_TOKEN_LEN = 1
-MAX_TOKEN_LEN = 24
+OVERLAP = config.CHUNK_OVERLAP
+TOKEN_LENGTH = config.CHUNK_TOKENS
+TOKEN_OVERLAP = config.CHUNK_TOKEN_OVERLAP
+FILES_PER_BATCH = 32  # documents encoded per encode_ordinary_batch call in token mode
 
 encoding = tiktoken.encoding_for_model(MODEL)
 
 ### utility functions #########################################################
 
-def is_non_alpha(line_):
-
-    total_chars = len(line_)
-    non_alpha_chars = len(re.findall(r'[^a-zA-Z]', line))
-
-    return non_alpha_chars > (total_chars/2)
-
 def estimate_word_count(file_):
 
     with open(file_, 'r', encoding='utf-8') as f:
@@ -59,75 +54,67 @@ def estimate_word_count(file_):
         words = text.split()  # splits on any whitespace (spaces, newlines, tabs)
         return len(words)
 
-### establish i/o locations ###################################################
-
-dat_dir = f'dat{os.sep}txt'
-out_dir = f'dat{os.sep}chunk'
-
-### loop through text files and chunk them ####################################
-
-cols = ['Type', 'ID', 'Text']
-
-for file in os.listdir(dat_dir):
+def chunk_batch(in_files_, stems_):
 
-    logger.info('----------- -----------')
-    logger.info(f'Parsing {file} ...')
-    [stem, ext] = os.path.splitext(file)
-    in_file = dat_dir + os.sep + file
+    """ Chunk a group of text files; token mode encodes the group in one call. """
 
-    chunks = pd.DataFrame(columns=cols)
-    cache = []  # init cache for storing tokens
-    cache_count = 1
-    word_count = estimate_word_count(in_file)
+    if MODE == 'tokens':
+        return chunk_token_files(in_files_, stems_, encoding, TOKEN_LENGTH, TOKEN_OVERLAP)
 
-    with open(in_file, 'r') as f:
+    return [chunk_file(f, s, LENGTH, OVERLAP) for f, s in zip(in_files_, stems_)]
 
-        for line in f:
+def chunk_path(file_):
 
-            if re.match(r'^\s*$', line): # skip blank lines
-                continue
+    return out_dir + os.sep + os.path.splitext(file_)[0] + '.csv'
 
-            if is_non_alpha(line): # skip lines of numbers or symbols
-                continue
-
-            line = line.rstrip()
-            line = line.lower()
-            line = re.sub(r'http\:\/\/[^\s]*?(\s|$)', r' ', line, flags=re.I) # remove urls
-            line = re.sub(r'https\:\/\/[^\s]*?(\s|$)', r' ', line, flags=re.I) # remove urls
-
-            tokens = re.split(r'\s', line)
-
-            for token in tokens:  # cycle through tokens in line
-
-                token = re.sub(r"'", '', token, flags=re.I)
-
-                if token not in ['', ' ', 's'] and\
-                    not token.startswith('www') and \
-                        MIN_TOKEN_LEN < len(token) < MAX_TOKEN_LEN:
+### establish i/o locations ###################################################
 
-                    if len(cache) <= LENGTH:  # accumulate tokens
-                        cache.append(token)
-                    else:  # save tokens
-                        if not ''.join(cache).isspace():
-                            vals = list([stem, cache_count, ' '.join(cache)])
-                            row_dict = dict(zip(cols, vals))
-                            chunks = pd.concat([chunks, pd.DataFrame(row_dict, index=[0])], ignore_index=True)
-                            cache_count += 1
-                            cache = cache[-OVERLAP:]
-                            cache.append(token)
+dat_dir = f'dat{os.sep}txt'
+out_dir = f'dat{os.sep}chunk'
 
-        else:  # last line of file
-            if not ''.join(cache).isspace():
-                vals = list([stem, cache_count, ' '.join(cache)])
-                row_dict = dict(zip(cols, vals))
-                cache_count += 1
-                chunks = pd.concat([chunks, pd.DataFrame(row_dict, index=[0])], ignore_index=True)
+### loop through text files and chunk them ####################################
 
-        logger.info(f'{file} processed into {cache_count} chunks of {LENGTH} tokens.')
-        logger.info(f'Approximate token count = {str(cache_count * (LENGTH - OVERLAP))}.')
+if MODE not in ('words', 'tokens'):
+    raise ValueError(f"CHUNK_MODE must be 'words' or 'tokens', not {MODE!r}.")
+
+# only re-chunk text files that changed since the last run
+params = {'mode': MODE, 'length': LENGTH, 'overlap': OVERLAP, 'model': MODEL,
+          'token_length': TOKEN_LENGTH, 'token_overlap': TOKEN_OVERLAP}
+manifest = Manifest('txt2chunk', params=params)
+all_files = os.listdir(dat_dir)
+for stale in manifest.prune([dat_dir + os.sep + file for file in all_files]):
+    if os.path.exists(stale):
+        os.remove(stale)
+        logger.info(f'Removed {stale}; its source text file is gone.')
+files = [file for file in all_files if not manifest.is_current(dat_dir + os.sep + file, [chunk_path(file)])]
+logger.info(f'Skipping {len(all_files) - len(files)} unchanged files.')
+
+for batch_start in range(0, len(files), FILES_PER_BATCH):
+
+    batch_files = files[batch_start:batch_start + FILES_PER_BATCH]
+    stems = [os.path.splitext(file)[0] for file in batch_files]
+    in_files = [dat_dir + os.sep + file for file in batch_files]
+
+    for file, stem, in_file, chunks in zip(batch_files, stems, in_files, chunk_batch(in_files, stems)):
+
+        logger.info('----------- -----------')
+        logger.info(f'Parsed {file}.')
+        word_count = estimate_word_count(in_file)
+
+        if MODE == 'tokens':
+            logger.info(f'{file} processed into {chunks.shape[0]} chunks of up to {TOKEN_LENGTH} {MODEL} tokens.')
+            logger.info(f'Approximate token count = {str(chunks.shape[0] * (TOKEN_LENGTH - TOKEN_OVERLAP))}.')
+        else:
+            logger.info(f'{file} processed into {chunks.shape[0]} chunks of {LENGTH} tokens.')
+            logger.info(f'Approximate token count = {str(chunks.shape[0] * (LENGTH - OVERLAP))}.')
         logger.info(f'Approximate word count = {word_count}.')
 
-        out_fname = out_dir + os.sep + stem + '.csv'
+        out_fname = chunk_path(file)
         chunks.to_csv(out_fname, index=False)
+        manifest.record(in_file, [out_fname])
 
         logger.info(f'Saved: {out_fname}.')
+
+    manifest.save()  # keep progress if a later batch fails
+
+manifest.save()
@@ -0,0 +1,376 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+umap_model.py
+=============
+
+Persistent UMAP map of policy chunk embeddings.
+
+:class:`UMAPModel` wraps a fitted :class:`umap.UMAP` reducer together with the
+``(Type, ID)`` keys of the chunks it was fitted on. The reducer carries its
+fuzzy nearest-neighbour graph, the neighbour search index and the fitted
+layout, so the whole model is saved with :mod:`joblib` and later reloaded to
+place new chunks with :meth:`UMAPModel.place`: chunks already in the map with
+the same embedding keep their coordinates, and only new or changed ones go
+through :meth:`umap.UMAP.transform`.
+This keeps the layout stable when a policy document is added, at the cost of
+new chunks not influencing the positions of old ones; refit when a large share
+of the corpus is new (:data:`config.UMAP_REFIT_FRACTION`).
+
+Fitting is split into its three phases, each timed in
+:attr:`UMAPModel.timings`: the cosine k-nearest-neighbour graph is built by
+:func:`knn_graph` on all cores and cached on disk, keyed by the content of the
+embedding matrix (only the newest graph per parameter set is kept), and passed to UMAP as ``precomputed_knn``; UMAP then builds
+the fuzzy simplicial set and optimizes the layout. A fixed ``random_state``
+makes the layout reproducible but single-threaded, so with
+``deterministic=False`` (:data:`config.UMAP_DETERMINISTIC`) the seed is
+dropped and the layout runs on ``n_jobs`` threads.
+
+Example
+-------
+
+.. code-block:: python
+
+    from umap_model import UMAPModel
+
+    model = UMAPModel().fit(X, meta)
+    model.save('dat/existing_policy_keyword_embed_umap.joblib')
+
+    model = UMAPModel.load('dat/existing_policy_keyword_embed_umap.joblib')
+    X_2d, is_new = model.place(X_now, meta_now)
+
+"""
+
+from contextlib import contextmanager
+import hashlib
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import umap
+import umap.umap_
+from sklearn.utils import check_random_state
+
+import config
+
+UMAP_N_NEIGHBORS = config.UMAP_N_NEIGHBORS
+UMAP_MIN_DIST = config.UMAP_MIN_DIST
+UMAP_DETERMINISTIC = config.UMAP_DETERMINISTIC
+UMAP_N_JOBS = config.UMAP_N_JOBS
+UMAP_KNN_CACHE_DIR = config.UMAP_KNN_CACHE_DIR
+
+KEY_COLS = ['Type', 'ID']
+
+__all__ = ['UMAPModel', 'knn_graph', 'KEY_COLS']
+
+
+def _keys(meta: pd.DataFrame) -> pd.MultiIndex:
+
+    """``(Type, ID)`` index of the chunks in ``meta``."""
+
+    return pd.MultiIndex.from_frame(meta[KEY_COLS].astype(str))
+
+
+def _array_digest(X: np.ndarray, *, block_rows: int = 65536) -> str:
+
+    """Return the hex SHA-256 digest of the shape and float32 content of ``X``."""
+
+    digest = hashlib.sha256(repr(X.shape).encode('utf-8'))
+    for start in range(0, X.shape[0], block_rows):
+        digest.update(np.ascontiguousarray(X[start:start + block_rows], dtype=np.float32).tobytes())
+
+    return digest.hexdigest()
+
+
+def knn_graph(X: np.ndarray, n_neighbors: int = UMAP_N_NEIGHBORS, *, n_jobs: int = UMAP_N_JOBS,
+              random_state: Optional[int] = 0, cache_dir: Optional[str] = UMAP_KNN_CACHE_DIR) -> Tuple:
+
+    """
+    Cosine k-nearest-neighbour graph of ``X`` in UMAP's ``precomputed_knn`` form.
+
+    The graph is built with NN-descent on ``n_jobs`` threads. When
+    ``cache_dir`` is set, it is stored there under a digest of ``X`` and the
+    parameters, and later calls with the same matrix load it instead. An entry
+    holds about three times the size of ``X`` and any change to the corpus
+    gives a new digest, so writing a graph deletes the older ones cached for
+    the same ``n_neighbors`` and ``random_state``.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        ``(N, p)`` embeddings.
+    n_neighbors : int, optional
+        Neighbours per row, including the row itself. Defaults to
+        :data:`config.UMAP_N_NEIGHBORS`.
+    n_jobs : int, optional
+        Threads; ``-1`` uses all cores. Defaults to :data:`config.UMAP_N_JOBS`.
+    random_state : int or None, optional
+        Seed of the random projection trees. Defaults to ``0``.
+    cache_dir : str or None, optional
+        Directory of cached graphs; ``None`` disables the cache. Defaults to
+        :data:`config.UMAP_KNN_CACHE_DIR`.
+
+    Returns
+    -------
+    tuple
+        ``(indices, distances, search_index)``; the search index lets the
+        fitted reducer ``transform`` new rows.
+    """
+
+    fname = None
+    if cache_dir:
+        prefix = f'{n_neighbors}-{random_state}-'
+        fname = os.path.join(cache_dir, prefix + _array_digest(X)[:32] + '.joblib')
+        if os.path.exists(fname):
+            return joblib.load(fname)
+
+    graph = umap.umap_.nearest_neighbors(X, n_neighbors, 'cosine', {}, False, check_random_state(random_state),
+                                         n_jobs=n_jobs)
+
+    if fname:
+        os.makedirs(cache_dir, exist_ok=True)
+        joblib.dump(graph, fname + '.tmp')
+        os.replace(fname + '.tmp', fname)
+        for name in os.listdir(cache_dir):
+            path = os.path.join(cache_dir, name)
+            if name.startswith(prefix) and name.endswith('.joblib') and path != fname:
+                os.remove(path)
+
+    return graph
+
+
+@contextmanager
+def _phase_timer(timings: Dict[str, float]):
+
+    """Time the fuzzy set and layout phases of :meth:`umap.UMAP.fit` into ``timings``."""
+
+    def timed(name, func):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        return wrapper
+
+    phases = {'fuzzy_set': 'fuzzy_simplicial_set', 'layout': 'simplicial_set_embedding'}
+    originals = {attr: getattr(umap.umap_, attr) for attr in phases.values()}
+    for name, attr in phases.items():
+        setattr(umap.umap_, attr, timed(name, originals[attr]))
+    try:
+        yield timings
+    finally:
+        for attr, func in originals.items():
+            setattr(umap.umap_, attr, func)
+
+
+class UMAPModel:
+
+    """
+    Fitted 2-d UMAP map and the chunks it was fitted on.
+
+    Parameters
+    ----------
+    n_neighbors : int, optional
+        Defaults to :data:`config.UMAP_N_NEIGHBORS`.
+    min_dist : float, optional
+        Defaults to :data:`config.UMAP_MIN_DIST`.
+    deterministic : bool, optional
+        Seed the layout with ``random_state`` and run it on one thread, or
+        leave it unseeded on ``n_jobs`` threads. Defaults to
+        :data:`config.UMAP_DETERMINISTIC`.
+    n_jobs : int, optional
+        Threads of the kNN graph, and of the layout when not deterministic.
+        Defaults to :data:`config.UMAP_N_JOBS`.
+    random_state : int, optional
+        Seed used when deterministic. Defaults to ``0``.
+
+    Attributes
+    ----------
+    reducer : umap.UMAP or None
+        Fitted reducer, including ``graph_`` and the neighbour search index.
+    keys : pandas.MultiIndex or None
+        ``(Type, ID)`` of the rows of ``reducer.embedding_``.
+    timings : dict
+        Seconds spent in the ``'knn'``, ``'fuzzy_set'`` and ``'layout'``
+        phases of the last :meth:`fit`.
+    """
+
+    def __init__(self, n_neighbors: int = UMAP_N_NEIGHBORS, min_dist: float = UMAP_MIN_DIST, *,
+                 deterministic: bool = UMAP_DETERMINISTIC, n_jobs: int = UMAP_N_JOBS, random_state: int = 0):
+
+        self.params = {'n_neighbors': n_neighbors, 'min_dist': min_dist, 'metric': 'cosine',
+                       'random_state': random_state if deterministic else None,
+                       'n_jobs': 1 if deterministic else n_jobs}
+        self.knn_jobs = n_jobs
+        self.reducer = self.keys = None
+        self.timings = {}
+
+    @property
+    def n_features(self) -> int:
+
+        """Embedding dimension the map was fitted on."""
+
+        return self.reducer._raw_data.shape[1]
+
+    def fit(self, X: np.ndarray, meta: pd.DataFrame, *,
+            knn_cache_dir: Optional[str] = UMAP_KNN_CACHE_DIR) -> 'UMAPModel':
+
+        """
+        Fit the map on all rows of ``X``.
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            ``(N, p)`` normalized embeddings.
+        meta : pandas.DataFrame
+            Metadata of the same rows, with ``Type`` and ``ID`` columns.
+        knn_cache_dir : str or None, optional
+            Passed to :func:`knn_graph`. Defaults to
+            :data:`config.UMAP_KNN_CACHE_DIR`.
+
+        Returns
+        -------
+        UMAPModel
+            ``self``.
+        """
+
+        self.timings = {}
+        start = time.perf_counter()
+        knn = knn_graph(X, self.params['n_neighbors'], n_jobs=self.knn_jobs,
+                        random_state=self.params['random_state'], cache_dir=knn_cache_dir)
+        self.timings['knn'] = time.perf_counter() - start
+
+        with _phase_timer(self.timings):
+            self.reducer = umap.UMAP(**self.params, precomputed_knn=knn).fit(X)
+        self.keys = _keys(meta)
+
+        return self
+
+    @property
+    def embedding(self) -> np.ndarray:
+
+        """``(N, 2)`` fitted coordinates, in the order of :attr:`keys`."""
+
+        return self.reducer.embedding_
+
+    def new_rows(self, X: np.ndarray, meta: pd.DataFrame, *, block_rows: int = 65536) -> np.ndarray:
+
+        """
+        Boolean mask of the rows that are not in the map as they are now.
+
+        A row is new if its ``(Type, ID)`` key is not in the map, or if its
+        embedding differs from the one the map was fitted on, for example
+        because the document was edited and re-embedded.
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            ``(M, p)`` normalized embeddings of the current chunks.
+        meta : pandas.DataFrame
+            Metadata of the same rows, with ``Type`` and ``ID`` columns.
+        block_rows : int, optional
+            Rows compared at a time.
+
+        Returns
+        -------
+        numpy.ndarray
+            ``(M,)`` boolean mask.
+
+        Raises
+        ------
+        ValueError
+            If ``X`` does not have the dimension the map was fitted on.
+        """
+
+        if X.shape[1] != self.n_features:
+            raise ValueError(f'Map was fitted on {self.n_features}-d embeddings, not {X.shape[1]}-d.')
+
+        positions = self.keys.get_indexer(_keys(meta))  # -1 for unknown keys
+        is_new = positions < 0
+        known = np.flatnonzero(~is_new)
+        for start in range(0, len(known), block_rows):
+            rows = known[start:start + block_rows]
+            fitted = self.reducer._raw_data[positions[rows]]
+            is_new[rows] = ~np.isclose(np.asarray(X[rows]), fitted, rtol=0, atol=1e-6).all(axis=1)
+
+        return is_new
+
+    def place(self, X: np.ndarray, meta: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+
+        """
+        Coordinates of the current chunks, transforming only the new ones.
+
+        New rows are those reported by :meth:`new_rows`: unknown chunks and
+        chunks whose embedding changed since the fit.
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            ``(M, p)`` normalized embeddings of the current chunks.
+        meta : pandas.DataFrame
+            Metadata of the same rows, with ``Type`` and ``ID`` columns.
+
+        Returns
+        -------
+        tuple of (numpy.ndarray, numpy.ndarray)
+            ``(M, 2)`` coordinates and the boolean mask of new rows.
+
+        Raises
+        ------
+        ValueError
+            If ``X`` does not have the dimension the map was fitted on.
+        """
+
+        is_new = self.new_rows(X, meta)
+        X_2d = np.empty((len(meta), 2), dtype=np.float32)
+        X_2d[~is_new] = self.embedding[self.keys.get_indexer(_keys(meta)[~is_new])]
+        if is_new.any():
+            X_2d[is_new] = self.reducer.transform(X[is_new])
+
+        return X_2d, is_new
+
+    def save(self, fname: str) -> None:
+
+        """Write the model to one :mod:`joblib` file, replacing it atomically."""
+
+        tmp_fname = fname + '.tmp'
+        joblib.dump({'params': self.params, 'reducer': self.reducer, 'keys': self.keys.to_frame(index=False)},
+                    tmp_fname)
+        os.replace(tmp_fname, fname)
+
+    @classmethod
+    def load(cls, fname: str) -> 'UMAPModel':
+
+        """Open a model written by :meth:`save`."""
+
+        saved = joblib.load(fname)
+        model = cls(saved['params']['n_neighbors'], saved['params']['min_dist'])
+        model.params = saved['params']
+        model.reducer = saved['reducer']
+        model.keys = pd.MultiIndex.from_frame(saved['keys'])
+
+        return model
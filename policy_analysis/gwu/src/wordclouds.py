@@ -0,0 +1,165 @@
+# Copyright (c) 2025 ph@hallresearch.ai
+# SPDX-License-Identifier: MIT
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+"""
+wordclouds.py
+=============
+
+Word-cloud rendering from keyword count tables, used by :mod:`render_clouds`.
+
+Each :class:`CloudJob` names an ``item,count`` table, such as those written by
+:mod:`apply_keywords` and :mod:`cluster_project`, and the image rendered from
+it. :func:`render_clouds` feeds the counts straight to
+:meth:`wordcloud.WordCloud.generate_from_frequencies`, so no text is joined
+and re-tokenized and multi-word keywords stay whole. Images are rendered in a
+process pool, since each 4000 × 2000 layout is CPU bound. A job is skipped when
+its table and the rendering parameters are unchanged since the image was last
+written, as recorded in the ``wordclouds`` :class:`manifest.Manifest`.
+
+Example
+-------
+
+.. code-block:: python
+
+    from wordclouds import CloudJob, render_clouds
+
+    jobs = [CloudJob('out/res/provost_unique_counts.csv',
+                     'out/res/provost_unique_key_word_cloud_hi_4k.png', max_words=200)]
+    for image, status in render_clouds(jobs):
+        print(image, status)  # 'rendered' or 'skipped'
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+import pandas as pd
+from wordcloud import WordCloud
+
+import config
+from manifest import Manifest
+
+SEED = config.SEED
+WORDCLOUD_WORKERS = config.WORDCLOUD_WORKERS
+
+STYLE = {
+    'width': 4000,
+    'height': 2000,
+    'min_font_size': 7,           # minimum font size
+    'background_color': 'white',
+    'colormap': 'Set2',           # pastel colormap
+    'random_state': SEED,
+}
+
+__all__ = ['CloudJob', 'STYLE', 'read_frequencies', 'render', 'render_clouds']
+
+
+class CloudJob(NamedTuple):
+
+    """One image to render from one ``item,count`` table."""
+
+    counts: str
+    image: str
+    max_words: int = 200  # maximum number of words shown
+
+
+def read_frequencies(fname: str) -> Dict[str, int]:
+
+    """Keyword -> count mapping of an ``item,count`` table, without zero counts."""
+
+    table = pd.read_csv(fname, keep_default_na=False)
+
+    return {str(item): int(count) for item, count in zip(table['item'], table['count']) if count > 0}
+
+
+def render(job: CloudJob) -> str:
+
+    """
+    Render one cloud and write it atomically.
+
+    Parameters
+    ----------
+    job : CloudJob
+        Count table, image path and word limit.
+
+    Returns
+    -------
+    str
+        ``job.image``.
+    """
+
+    frequencies = read_frequencies(job.counts)
+    image = WordCloud(max_words=job.max_words, **STYLE).generate_from_frequencies(frequencies).to_image()
+
+    root, ext = os.path.splitext(job.image)
+    tmp_fname = f'{root}.tmp{ext}'
+    image.save(tmp_fname)
+    os.replace(tmp_fname, job.image)
+
+    return job.image
+
+
+def render_clouds(jobs: Sequence[CloudJob], *, workers: int = WORDCLOUD_WORKERS,
+                  force: bool = False) -> List[Tuple[str, str]]:
+
+    """
+    Render the clouds whose count tables changed, in parallel.
+
+    Parameters
+    ----------
+    jobs : sequence of CloudJob
+        Images to bring up to date.
+    workers : int, optional
+        Worker processes. Defaults to :data:`config.WORDCLOUD_WORKERS`.
+    force : bool, optional
+        Render every job even if its image is current.
+
+    Returns
+    -------
+    list of (str, str)
+        Image path and ``'rendered'`` or ``'skipped'``, in the order of
+        ``jobs``.
+    """
+
+    manifest = Manifest('wordclouds')
+    params = {job: {**STYLE, 'max_words': job.max_words} for job in jobs}
+
+    def current(job: CloudJob) -> bool:
+        manifest.params = params[job]  # the word limit differs between jobs
+        return manifest.is_current(job.counts, [job.image])
+
+    todo = [job for job in jobs if force or not current(job)]
+
+    if len(todo) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            list(pool.map(render, todo))
+    else:
+        for job in todo:
+            render(job)
+
+    for job in todo:
+        manifest.params = params[job]
+        manifest.record(job.counts, [job.image])
+    manifest.save()
+
+    return [(job.image, 'rendered' if job in todo else 'skipped') for job in jobs]